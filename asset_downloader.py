@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Asset Downloader
+----------------
+Fetches the assets listed in temp_assets_list.json ([{url, filename,
+component, type}, ...]) into public/assets/.
+
+- Entries are deduplicated by URL (HTML entities such as `&amp;` in the
+  list are unescaped first), so a repeated `navigation-bar.png` is fetched
+  once.
+- Downloads run concurrently over one pooled keep-alive session (see
+  fetch_engine.py), with a per-host cap and jittered retries.
+- Bodies are streamed to `.asset_store/partial/`; an interrupted download
+  resumes with an HTTP Range request (guarded by If-Range), falling back to
+  a full download when the server ignores it. A partial whose response had
+  no ETag or Last-Modified is downloaded again from the start.
+- Each body is stored once under its SHA-256 in `.asset_store/objects/`, so
+  two URLs serving the same bytes share one object. It is then hard-linked
+  (copied when linking is not possible) under every requested filename.
+- `.asset_store/manifest.json` maps URL -> hash: a re-run only downloads
+  URLs it has never stored, and a target already holding the right bytes is
+  left alone.
+
+Usage:
+    python asset_downloader.py [temp_assets_list.json] [--dest public/assets]
+    python asset_downloader.py --concurrency 8 --per-host 4 --dry-run
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+import fetch_engine
+from http_cache import USER_AGENT, atomic_write_bytes
+
+# --- Configuration ---
+REPO_ROOT = Path(__file__).resolve().parent
+DEFAULT_LIST = REPO_ROOT / "temp_assets_list.json"
+DEFAULT_DEST = REPO_ROOT / "public" / "assets"
+DEFAULT_STORE = REPO_ROOT / ".asset_store"
+CHUNK_SIZE = 64 * 1024
+
+
+@dataclass
+class AssetRequest:
+    url: str
+    filenames: List[str] = field(default_factory=list)
+    components: List[str] = field(default_factory=list)
+
+
+@dataclass
+class DownloadResult:
+    url: str
+    sha256: Optional[str] = None
+    size: int = 0
+    resumed_from: int = 0
+    attempts: int = 0
+    error: Optional[str] = None
+
+
+def load_asset_list(path) -> Tuple[List[AssetRequest], int]:
+    """Unique assets (first-seen order) and the number of raw entries."""
+    with open(path, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+
+    by_url: Dict[str, AssetRequest] = {}
+    owner: Dict[str, str] = {}  # filename -> url that claimed it
+    for entry in entries:
+        url = html.unescape(entry['url'])
+        filename = os.path.basename(entry['filename'])
+        asset = by_url.setdefault(url, AssetRequest(url=url))
+        if owner.setdefault(filename, url) != url:
+            print(f"⚠️  {filename} is requested for two URLs; keeping {owner[filename]}")
+            continue
+        if filename not in asset.filenames:
+            asset.filenames.append(filename)
+        component = entry.get('component')
+        if component and component not in asset.components:
+            asset.components.append(component)
+    return [a for a in by_url.values() if a.filenames], len(entries)
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class AssetStore:
+    """Content-addressed bodies plus the URL -> hash manifest."""
+
+    def __init__(self, root=DEFAULT_STORE):
+        self.root = Path(root)
+        self.manifest_path = self.root / "manifest.json"
+        self.entries: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        if self.manifest_path.exists():
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f).get('urls', {})
+
+    def object_path(self, sha: str) -> Path:
+        return self.root / "objects" / sha[:2] / sha
+
+    def partial_path(self, url: str) -> Path:
+        return self.root / "partial" / hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def has(self, url: str) -> bool:
+        entry = self.entries.get(url)
+        return entry is not None and self.object_path(entry['sha256']).exists()
+
+    def commit_partial(self, url: str, part: Path) -> Tuple[str, int]:
+        """Move a finished download into the object store; returns (sha256, size)."""
+        sha = file_sha256(part)
+        size = part.stat().st_size
+        target = self.object_path(sha)
+        if target.exists():
+            part.unlink()  # Same bytes already stored under another URL
+        else:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(part, target)
+        part.with_suffix('.json').unlink(missing_ok=True)
+        with self._lock:
+            self.entries[url] = {'sha256': sha, 'size': size,
+                                 'fetched_at': time.strftime('%Y-%m-%dT%H:%M:%S')}
+        return sha, size
+
+    def save(self):
+        data = json.dumps({'urls': dict(sorted(self.entries.items()))}, indent=2, ensure_ascii=False)
+        atomic_write_bytes(self.manifest_path, data.encode('utf-8'))
+
+
+def download(session: requests.Session, url: str, store: AssetStore,
+             retries: int = fetch_engine.DEFAULT_RETRIES,
+             backoff: float = fetch_engine.DEFAULT_BACKOFF,
+             timeout: float = fetch_engine.DEFAULT_TIMEOUT) -> DownloadResult:
+    """Stream `url` into the store, resuming a partial file left by an earlier run."""
+    result = DownloadResult(url=url)
+    part = store.partial_path(url)
+    meta_path = part.with_suffix('.json')
+    part.parent.mkdir(parents=True, exist_ok=True)
+
+    attempt = 0
+    while attempt <= retries:
+        result.attempts = attempt + 1
+        offset = part.stat().st_size if part.exists() else 0
+        headers = {}
+        validator = None
+        if offset and meta_path.exists():
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                validator = json.load(f).get('validator')
+        if validator:
+            headers['Range'] = f"bytes={offset}-"
+            headers['If-Range'] = validator  # Resume only if the resource is unchanged
+        elif offset:
+            # Nothing to tell a changed resource from the partial by: start over
+            part.unlink()
+        try:
+            with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+                if response.status_code == 416 and 'Range' in headers:
+                    # Stale partial: start over, without counting it as a failed attempt
+                    part.unlink(missing_ok=True)
+                    continue
+                if response.status_code in fetch_engine.RETRY_STATUSES and attempt < retries:
+                    time.sleep(fetch_engine.backoff_delay(attempt, backoff))
+                    attempt += 1
+                    continue
+                response.raise_for_status()
+
+                resuming = response.status_code == 206 and 'Range' in headers
+                if not resuming:
+                    validator = response.headers.get('ETag') or response.headers.get('Last-Modified')
+                    atomic_write_bytes(meta_path, json.dumps({'url': url, 'validator': validator}).encode('utf-8'))
+                else:
+                    result.resumed_from = offset
+                with open(part, 'ab' if resuming else 'wb') as f:
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        f.write(chunk)
+            result.sha256, result.size = store.commit_partial(url, part)
+            result.error = None
+            return result
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+            # The partial file is kept: the next attempt (or run) resumes it
+            result.error = f"{type(e).__name__}: {e}"
+            if attempt < retries:
+                time.sleep(fetch_engine.backoff_delay(attempt, backoff))
+            attempt += 1
+        except requests.RequestException as e:
+            result.error = str(e)
+            return result
+    result.error = result.error or "retries exhausted"
+    return result
+
+
+def link_object(source: Path, target: Path) -> str:
+    """Place `source` at `target`; returns 'linked', 'copied' or 'present'."""
+    if target.exists():
+        if os.path.samefile(source, target) or file_sha256(target) == source.name:
+            return 'present'
+        target.unlink()
+    target.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.link(source, target)
+        return 'linked'
+    except OSError:
+        # Different filesystem, or links not supported
+        shutil.copy2(source, target)
+        return 'copied'
+
+
+def download_assets(list_file=DEFAULT_LIST, dest=DEFAULT_DEST, store_dir=DEFAULT_STORE,
+                    concurrency: int = fetch_engine.DEFAULT_CONCURRENCY,
+                    per_host: int = fetch_engine.DEFAULT_PER_HOST,
+                    retries: int = fetch_engine.DEFAULT_RETRIES,
+                    timeout: float = fetch_engine.DEFAULT_TIMEOUT,
+                    dry_run: bool = False) -> List[DownloadResult]:
+    assets, entry_count = load_asset_list(list_file)
+    store = AssetStore(store_dir)
+    todo = [asset for asset in assets if not store.has(asset.url)]
+    print(f"📦 {entry_count} entries -> {len(assets)} unique URLs, "
+          f"{len(assets) - len(todo)} already stored, {len(todo)} to download")
+    if dry_run:
+        for asset in todo:
+            print(f"   ⬇️  {asset.url} -> {', '.join(asset.filenames)}")
+        return []
+
+    session = fetch_engine.build_session(pool_size=concurrency, user_agent=USER_AGENT)
+    # One semaphore per host, made up front: pool threads only ever read the dict
+    host_slots = {host: threading.Semaphore(per_host)
+                  for host in {fetch_engine.host_of(asset.url) for asset in todo}}
+
+    def fetch(asset: AssetRequest) -> DownloadResult:
+        with host_slots[fetch_engine.host_of(asset.url)]:
+            return download(session, asset.url, store, retries=retries, timeout=timeout)
+
+    results = []
+    downloaded_bytes = 0
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            futures = [pool.submit(fetch, asset) for asset in todo]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                if result.error:
+                    print(f"❌ {result.url}: {result.error}")
+                    continue
+                downloaded_bytes += result.size - result.resumed_from
+                resumed = f", resumed at {result.resumed_from} bytes" if result.resumed_from else ""
+                print(f"⬇️  {result.url} ({result.size} bytes{resumed})")
+    finally:
+        store.save()  # Keep what finished even if the run is interrupted
+
+    outcomes = defaultdict(int)
+    for asset in assets:
+        entry = store.entries.get(asset.url)
+        if entry is None:
+            continue
+        source = store.object_path(entry['sha256'])
+        for filename in asset.filenames:
+            outcomes[link_object(source, Path(dest) / filename)] += 1
+
+    stored = [store.entries[a.url]['sha256'] for a in assets if a.url in store.entries]
+    failed = sum(1 for r in results if r.error)
+    print(f"✅ {len(results) - failed}/{len(todo)} downloaded ({downloaded_bytes} bytes), {failed} failed.")
+    print(f"🗂️  {len(stored)} URLs stored as {len(set(stored))} unique objects; "
+          f"{outcomes['linked']} linked, {outcomes['copied']} copied, {outcomes['present']} already up to date in {dest}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download the assets listed in temp_assets_list.json.")
+    parser.add_argument('list_file', nargs='?', default=str(DEFAULT_LIST))
+    parser.add_argument('--dest', default=str(DEFAULT_DEST), help="Directory the requested filenames are placed in")
+    parser.add_argument('--store', default=str(DEFAULT_STORE), help="Content-addressed object store and manifest")
+    parser.add_argument('--concurrency', type=int, default=fetch_engine.DEFAULT_CONCURRENCY, help="Max parallel downloads")
+    parser.add_argument('--per-host', type=int, default=fetch_engine.DEFAULT_PER_HOST, help="Max parallel downloads per host")
+    parser.add_argument('--retries', type=int, default=fetch_engine.DEFAULT_RETRIES)
+    parser.add_argument('--timeout', type=float, default=fetch_engine.DEFAULT_TIMEOUT)
+    parser.add_argument('--dry-run', action='store_true', help="Only list what would be downloaded")
+    args = parser.parse_args()
+
+    results = download_assets(args.list_file, args.dest, args.store, concurrency=args.concurrency,
+                              per_host=args.per_host, retries=args.retries, timeout=args.timeout,
+                              dry_run=args.dry_run)
+    sys.exit(1 if any(r.error for r in results) else 0)
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Extraction Benchmarks
+---------------------
+Offline benchmarks for the webpage_to_markdown extraction path, run on the
+saved HTML corpus in benchmarks/fixtures/ (see make_fixtures.py).
+
+Per fixture, each stage runs on a freshly parsed page `--repeat` times:
+    parse                 parse_html (BeautifulSoup tree build)
+    clean_soup            nav / footer / script / hidden element removal
+    extract_hero          H1 + intro lookup
+    get_section_content   the reference per-heading extractor, every heading
+    extract_blocks        the production path (clean + single-pass sections)
+and reports the median time, pages/sec and the peak traced memory of one
+full parse + extract_blocks.
+
+End to end, `process_urls` scrapes every fixture from a local HTTP stand-in
+(serial, --async, with parser workers, and --large-docs), with no HTTP
+cache, and its merged JSON is compared with benchmarks/golden.json, which
+stores, per tree builder, a hash of the canonical output (plus block
+counts, to see where a change landed). Run --update-golden once per
+--parser to refresh both.
+Source URLs are rewritten to http://fixtures.local/ so the golden file does
+not depend on the stand-in's port.
+
+Usage:
+    python benchmarks/bench_extraction.py [--repeat 5] [--only typical many_headings]
+    python benchmarks/bench_extraction.py --parser html.parser --json results.json
+    python benchmarks/bench_extraction.py --update-golden
+"""
+
+import argparse
+import contextlib
+import glob
+import hashlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+import webpage_to_markdown as scraper  # noqa: E402
+
+# --- Configuration ---
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+GOLDEN_FILE = os.path.join(BENCH_DIR, "golden.json")
+GOLDEN_BASE = "http://fixtures.local/"
+DEFAULT_REPEAT = 5
+STAGE_NAMES = ('parse', 'clean_soup', 'extract_hero', 'get_section_content', 'extract_blocks')
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+@contextlib.contextmanager
+def fixture_server(directory: str = FIXTURES_DIR):
+    """Serve the fixtures on 127.0.0.1 (free port); yields the base URL."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), partial(QuietHandler, directory=directory))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def load_fixtures(only: Optional[List[str]] = None) -> Dict[str, bytes]:
+    fixtures = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html"))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        if only and name not in only:
+            continue
+        with open(path, 'rb') as f:
+            fixtures[name] = f.read()
+    return fixtures
+
+
+def section_headings(soup) -> list:
+    # Same heading choice as extract_blocks
+    return soup.find_all('h2') or soup.find_all('h3')
+
+
+def time_stage(content: bytes, stage: str) -> float:
+    """Seconds spent in `stage` alone, on a fresh tree prepared up to it."""
+    url = GOLDEN_BASE + "page.html"
+    start = time.perf_counter()
+    soup = scraper.parse_html(content)
+    if stage == 'parse':
+        return time.perf_counter() - start
+    if stage == 'extract_blocks':
+        start = time.perf_counter()
+        scraper.extract_blocks(soup, url)
+        return time.perf_counter() - start
+    if stage == 'clean_soup':
+        start = time.perf_counter()
+        scraper.clean_soup(soup)
+        return time.perf_counter() - start
+
+    scraper.clean_soup(soup)
+    start = time.perf_counter()
+    if stage == 'extract_hero':
+        scraper.extract_hero(soup, url)
+    else:
+        for heading in section_headings(soup):
+            scraper.get_section_content(heading, url)
+    return time.perf_counter() - start
+
+
+def peak_memory(func: Callable[[], Any]) -> int:
+    """Peak bytes allocated by Python while running `func`."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_stages(fixtures: Dict[str, bytes], repeat: int) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    for name, content in fixtures.items():
+        stages = {}
+        for stage in STAGE_NAMES:
+            samples = [time_stage(content, stage) for _ in range(repeat)]
+            median = statistics.median(samples)
+            stages[stage] = {'median': median, 'best': min(samples),
+                             'pages_per_sec': 1 / median if median else float('inf')}
+        peak = peak_memory(lambda: scraper.extract_blocks(scraper.parse_html(content), GOLDEN_BASE))
+        results[name] = {'bytes': len(content), 'stages': stages, 'peak_memory': peak}
+    return results
+
+
+def normalized_output(path: str, base_url: str) -> Dict[str, Any]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.loads(f.read().replace(base_url, GOLDEN_BASE))
+
+
+def bench_end_to_end(names: List[str], repeat: int) -> Dict[str, Dict[str, Any]]:
+    modes = {
+        'serial': {},
+        'async': {'use_async': True},
+        'async+workers': {'use_async': True, 'parse_workers': 2},
+        'large-docs': {'large_docs': True},
+    }
+    results = {}
+    with fixture_server() as base_url, tempfile.TemporaryDirectory() as tmp:
+        urls = [f"{base_url}{name}.html" for name in names]
+        output = os.path.join(tmp, "out.json")
+        for mode, kwargs in modes.items():
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    scraper.process_urls(urls, output, cache=None, **kwargs)
+                samples.append(time.perf_counter() - start)
+            with contextlib.redirect_stdout(io.StringIO()):
+                peak = peak_memory(lambda: scraper.process_urls(urls, output, cache=None, **kwargs))
+            median = statistics.median(samples)
+            results[mode] = {'median': median, 'pages_per_sec': len(urls) / median,
+                             'peak_memory': peak, 'output': normalized_output(output, base_url)}
+    return results
+
+
+def output_digest(output: Dict[str, Any]) -> Dict[str, Any]:
+    canonical = json.dumps(output, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    blocks_per_page: Dict[str, int] = {}
+    for block in output['blocks']:
+        page = block['source_url'].rsplit('/', 1)[-1]
+        blocks_per_page[page] = blocks_per_page.get(page, 0) + 1
+    return {'sha256': hashlib.sha256(canonical).hexdigest(), 'total_blocks': output['total_blocks'],
+            'blocks_per_page': blocks_per_page}
+
+
+def check_golden(output: Dict[str, Any], names: List[str]) -> str:
+    if not os.path.exists(GOLDEN_FILE):
+        return "no golden file (run with --update-golden)"
+    with open(GOLDEN_FILE, 'r', encoding='utf-8') as f:
+        golden = json.load(f).get(scraper.HTML_PARSER)
+    if golden is None:
+        return f"no golden for {scraper.HTML_PARSER} (run with --update-golden)"
+    if golden['fixtures'] != names:
+        return "skipped (golden covers other fixtures)"
+    digest = output_digest(output)
+    if digest['sha256'] == golden['sha256']:
+        return "✅ equal"
+    before, now = golden['blocks_per_page'], digest['blocks_per_page']
+    changed = {page: (before.get(page, 0), now.get(page, 0))
+               for page in sorted(before.keys() | now.keys()) if before.get(page) != now.get(page)}
+    return f"❌ DIFFERS (block counts golden -> now: {changed or 'same'})"
+
+
+def print_results(stages: Dict[str, Dict[str, Any]], end_to_end: Dict[str, Dict[str, Any]],
+                  names: List[str]):
+    print(f"\n📏 Stage timings (median ms, parser: {scraper.HTML_PARSER})")
+    print(f"{'fixture':<16}{'KB':>7}" + "".join(f"{s:>21}" for s in STAGE_NAMES) + f"{'peak MB':>10}")
+    for name, result in stages.items():
+        cells = "".join(f"{1000 * result['stages'][s]['median']:>21.2f}" for s in STAGE_NAMES)
+        print(f"{name:<16}{result['bytes'] / 1024:>7.0f}{cells}{result['peak_memory'] / 2**20:>10.1f}")
+
+    print("\n📏 extract_blocks throughput (pages/sec)")
+    for name, result in stages.items():
+        print(f"   {name:<16}{result['stages']['extract_blocks']['pages_per_sec']:>10.1f}")
+
+    if end_to_end:
+        print(f"\n🚀 process_urls end to end ({len(names)} pages, local HTTP stand-in, no cache)")
+        for mode, result in end_to_end.items():
+            print(f"   {mode:<14}{1000 * result['median']:>9.1f} ms {result['pages_per_sec']:>8.1f} pages/sec "
+                  f"{result['peak_memory'] / 2**20:>7.1f} MB peak   golden: {check_golden(result['output'], names)}")
+
+
+def write_golden(output: Dict[str, Any], names: List[str]):
+    golden = {}
+    if os.path.exists(GOLDEN_FILE):
+        with open(GOLDEN_FILE, 'r', encoding='utf-8') as f:
+            golden = json.load(f)
+    golden[scraper.HTML_PARSER] = {'fixtures': names, **output_digest(output)}
+    with open(GOLDEN_FILE, 'w', encoding='utf-8') as f:
+        json.dump(golden, f, indent=2, ensure_ascii=False, sort_keys=True)
+    print(f"📄 Golden output saved to: {GOLDEN_FILE}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the webpage_to_markdown extraction path.")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="Runs per measurement (median reported)")
+    parser.add_argument('--only', nargs='+', metavar='FIXTURE', help="Benchmark only these fixtures")
+    parser.add_argument('--parser', choices=['lxml', 'html.parser'], default=None, help="Force a BeautifulSoup tree builder")
+    parser.add_argument('--skip-end-to-end', action='store_true', help="Only time the individual stages")
+    parser.add_argument('--json', default=None, metavar='FILE', help="Also save the raw results as JSON")
+    parser.add_argument('--update-golden', action='store_true', help="Store the current process_urls output as golden.json")
+    args = parser.parse_args()
+
+    if args.parser:
+        scraper.HTML_PARSER = args.parser
+
+    fixtures = load_fixtures(args.only)
+    if not fixtures:
+        print(f"❌ No fixtures found in {FIXTURES_DIR} (run benchmarks/make_fixtures.py)")
+        sys.exit(1)
+    names = list(fixtures)
+
+    stage_results = bench_stages(fixtures, args.repeat)
+    e2e_results = {} if args.skip_end_to_end and not args.update_golden else bench_end_to_end(names, args.repeat)
+
+    if args.update_golden:
+        write_golden(e2e_results['serial']['output'], names)
+    print_results(stage_results, e2e_results, names)
+
+    if args.json:
+        for result in e2e_results.values():
+            result.pop('output')
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'parser': scraper.HTML_PARSER, 'repeat': args.repeat,
+                       'stages': stage_results, 'end_to_end': e2e_results}, f, indent=2)
+        print(f"📄 Results saved to: {args.json}")
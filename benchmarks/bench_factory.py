@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Content Factory Load Test
+-------------------------
+Drives N synthetic slugs through the full content_factory pipeline (fetch,
+extract, analyze, build, validate, write) with no network and no API key:
+source pages are generated with make_fixtures.py's helpers and served by a
+local HTTP stand-in, and the LM is content_factory/stand_in_lm.py, either
+synthetic or replaying a cassette recorded with
+`factory.py --record-cassette`, with optional latency and injected errors.
+
+Reports slugs/minute, p50/p95 of each stage per slug, LM calls, retries,
+rate-limiter waits and peak RSS, so scheduler and caching work can be
+compared offline. Pages, manifest, HTTP cache, LLM cache and block index all
+live in a temp dir: nothing in the repo is read or written besides the code.
+
+With --runs 2 the same slugs are rebuilt (forced) a second time, against the
+warm HTTP cache and, with --llm-cache, the warm LLM cache.
+
+With --cascade [analyze|all] a second stand-in plays the fast model
+(--fast-latency, --fast-invalid-rate), so the wall time per slug and the
+escalations of `factory.py --cascade` can be compared with the strong-only
+run.
+
+Usage:
+    python benchmarks/bench_factory.py --slugs 50 --concurrency 6 --latency 2 --jitter 0.3
+    python benchmarks/bench_factory.py --slugs 20 --error-rate 0.1 --rpm 60
+    python benchmarks/bench_factory.py --replay cassette.jsonl --recorded-latency
+    python benchmarks/bench_factory.py --slugs 30 --llm-cache --runs 2 --json load.json
+    python benchmarks/bench_factory.py --latency 8 --cascade all --fast-latency 2 --fast-invalid-rate 0.2
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "content_factory"))
+sys.path.insert(0, REPO_DIR)
+import dspy  # noqa: E402
+
+from bench_extraction import fixture_server  # noqa: E402
+from make_fixtures import FOOTER, NAV, hero, page, section  # noqa: E402
+from block_index import BlockIndex  # noqa: E402
+from build_manifest import BuildManifest  # noqa: E402
+from factory import FACTORY_STAGES, MODEL_ROUTES, run_content_factory  # noqa: E402
+from http_cache import HTTPCache  # noqa: E402
+from llm_cache import LLMCache  # noqa: E402
+from run_metrics import RunMetrics, peak_rss_mb, reset_peak_rss  # noqa: E402
+from scheduler import DEFAULT_CONCURRENCY, RateLimiter  # noqa: E402
+from source_compaction import DEFAULT_TOKEN_BUDGET  # noqa: E402
+from stand_in_lm import StandInEngine, add_stand_in_arguments, stand_in_lm, stand_in_options  # noqa: E402
+
+# --- Configuration ---
+SEED = 2024
+DEFAULT_SLUGS = 20
+DEFAULT_SOURCES = 2       # Source pages per slug
+SECTIONS_PER_PAGE = 8
+UNLIMITED_RPM = 1_000_000  # The stand-in has no quota unless --rpm / --tpm ask for one
+
+
+def write_sources(directory: str, slugs: int, sources: int) -> Dict[str, List[str]]:
+    """One page per (slug, source); returns slug -> page file names."""
+    pages = {}
+    for i in range(slugs):
+        names = []
+        for j in range(sources):
+            rng = random.Random(f"{SEED}-{i}-{j}")
+            sections = [section(rng, k, with_image=k % 3 == 0, items=rng.choice([0, 0, 4]))
+                        for k in range(SECTIONS_PER_PAGE)]
+            body = NAV + "<main>" + hero(rng, f"Service {i}, source {j}") + "\n".join(sections) + "</main>" + FOOTER
+            name = f"s{i:03d}-{j}.html"
+            with open(os.path.join(directory, name), 'w', encoding='utf-8') as f:
+                f.write(page(f"Service {i}", body))
+            names.append(name)
+        pages[f"load/service-{i:03d}"] = names
+    return pages
+
+
+def percentile(values: List[float], q: float) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method='inclusive')[q - 1]
+
+
+def summarize(metrics: RunMetrics, wall: float, engine: StandInEngine, limiter: RateLimiter,
+              fast: Optional[StandInEngine] = None) -> Dict[str, Any]:
+    report = metrics.report()
+    items = report['items']
+    built = [item for item in items.values() if item.get('status') == 'built']
+    stages = {}
+    for stage in FACTORY_STAGES:
+        values = [item['stages'][stage] for item in items.values() if stage in item['stages']]
+        if values:
+            stages[stage] = {'p50': round(percentile(values, 50), 4), 'p95': round(percentile(values, 95), 4),
+                             'max': round(max(values), 4)}
+    totals = report['totals']['counters']
+    return {
+        'slugs': len(items),
+        'built': len(built),
+        'failed': sum(1 for item in items.values() if item.get('status') == 'failed'),
+        'wall_time': round(wall, 3),
+        'slugs_per_minute': round(len(built) / wall * 60, 2) if wall else 0.0,
+        'stages': stages,
+        'seconds_per_slug': round(statistics.mean(sum(item['stages'].values()) for item in items.values()), 3)
+                            if items else 0.0,
+        'lm_calls': int(totals.get('lm_calls', 0)),
+        'escalations': int(totals.get('escalations', 0)),
+        'retries': int(totals.get('retries', 0)),
+        'rate_wait': round(limiter.waited, 3),
+        'prompt_tokens': int(totals.get('prompt_tokens', 0)),
+        'completion_tokens': int(totals.get('completion_tokens', 0)),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'stand_in': dict(engine.stats),
+        'fast_stand_in': dict(fast.stats) if fast is not None else None,
+    }
+
+
+def load_test(args: argparse.Namespace, workdir: str, base_url: str, files: Dict[str, List[str]]) -> List[Dict[str, Any]]:
+    pages = {slug: [base_url + name for name in names] for slug, names in files.items()}
+    engine = StandInEngine(**stand_in_options(args))
+    dspy.configure(lm=stand_in_lm(engine), track_usage=True)
+    fast, models = None, None
+    if args.cascade:
+        options = stand_in_options(args)
+        options['latency'] = args.latency / 4 if args.fast_latency is None else args.fast_latency
+        if args.fast_invalid_rate is not None:
+            options['invalid_rate'] = args.fast_invalid_rate
+        fast = StandInEngine(**options)
+        models = {'fast': stand_in_lm(fast, model=f"stand-in/{fast.mode}-fast")}
+    cache = HTTPCache(cache_dir=os.path.join(workdir, "http_cache"))
+    llm_cache = LLMCache(cache_dir=os.path.join(workdir, "llm_cache")) if args.llm_cache else None
+    manifest = BuildManifest(os.path.join(workdir, "manifest.json"))
+    index = BlockIndex(os.path.join(workdir, "block_index")) if args.ground else None
+
+    results = []
+    for run in range(args.runs):
+        metrics = RunMetrics('bench_factory', stages=FACTORY_STAGES)
+        limiter = RateLimiter(args.rpm, args.tpm)
+        reset_peak_rss()
+        log = io.StringIO()
+        start = time.perf_counter()
+        # The factory's per-slug progress lines would drown the results
+        with contextlib.redirect_stdout(log if not args.verbose else sys.stdout):
+            run_content_factory(cache=cache, llm_cache=llm_cache, force=True, manifest=manifest,
+                                concurrency=args.concurrency, limiter=limiter,
+                                token_budget=args.token_budget, map_reduce=args.map_reduce,
+                                metrics=metrics, ground=args.ground, index=index,
+                                pages=pages, output_dir=os.path.join(workdir, "pages"),
+                                cascade=args.cascade, models=models)
+        wall = time.perf_counter() - start
+        result = summarize(metrics, wall, engine, limiter, fast)
+        result['run'] = run + 1
+        results.append(result)
+        for stand_in in (engine, fast):
+            if stand_in is not None:
+                stand_in.stats = dict.fromkeys(stand_in.stats, 0)
+    return results
+
+
+def print_results(results: List[Dict[str, Any]], args: argparse.Namespace):
+    mode = f"replay {args.replay}" if args.replay else "synthetic"
+    print(f"🏭 content_factory load test: {args.slugs} slugs x {args.sources} sources, "
+          f"{args.concurrency} at a time, stand-in LM {mode}, latency {args.latency}s "
+          f"(+/-{args.jitter:.0%}), {args.error_rate:.0%} 429s, {args.invalid_rate:.0%} invalid")
+    if args.cascade:
+        fast_latency = args.latency / 4 if args.fast_latency is None else args.fast_latency
+        fast_invalid = args.invalid_rate if args.fast_invalid_rate is None else args.fast_invalid_rate
+        print(f"🧭 Model cascade ({args.cascade}): fast stand-in first (latency {fast_latency}s, {fast_invalid:.0%} invalid)")
+    for result in results:
+        print(f"\n▶️  Run {result['run']}: {result['built']}/{result['slugs']} built, {result['failed']} failed "
+              f"in {result['wall_time']:.2f}s -> {result['slugs_per_minute']:.1f} slugs/min, "
+              f"{result['seconds_per_slug']:.2f}s per slug")
+        print(f"   {'stage':<10} {'p50':>9} {'p95':>9} {'max':>9}")
+        for stage, values in result['stages'].items():
+            print(f"   {stage:<10} {values['p50']:>8.3f}s {values['p95']:>8.3f}s {values['max']:>8.3f}s")
+        stats = result['stand_in']
+        print(f"   🧠 {result['lm_calls']} LM calls ({stats['calls']} reached the stand-in: {stats['errors']} 429s, "
+              f"{stats['invalid']} invalid), {result['retries']} retries, rate limiter waits {result['rate_wait']:.1f}s")
+        fast = result['fast_stand_in']
+        if fast is not None:
+            print(f"   🧭 {fast['calls']} calls reached the fast stand-in ({fast['invalid']} invalid), "
+                  f"{result['escalations']} escalated to the strong one")
+        print(f"   🔢 {result['prompt_tokens']:,} prompt + {result['completion_tokens']:,} completion tokens, "
+              f"peak RSS {result['peak_rss_mb']:.0f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test content_factory offline with the LM stand-in.")
+    parser.add_argument('--slugs', type=int, default=DEFAULT_SLUGS, help="Synthetic slugs to build")
+    parser.add_argument('--sources', type=int, default=DEFAULT_SOURCES, help="Source pages per slug")
+    parser.add_argument('--runs', type=int, default=1, help="Build the same slugs this many times (warm caches after the first)")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help="Slugs processed at the same time")
+    parser.add_argument('--rpm', type=float, default=UNLIMITED_RPM, help="Max LM requests per minute")
+    parser.add_argument('--tpm', type=float, default=UNLIMITED_RPM * 1000, help="Max estimated LM tokens per minute")
+    parser.add_argument('--token-budget', type=int, default=DEFAULT_TOKEN_BUDGET, help="Compacted source tokens per slug (0 is not supported: raw pages need Attachments)")
+    parser.add_argument('--map-reduce', action='store_true', help="Analyze each source separately and merge")
+    parser.add_argument('--ground', type=int, default=0, metavar='K', help="Ground PageBuilder on the top-K blocks per section")
+    parser.add_argument('--llm-cache', action='store_true', help="Memoize LM results (in the temp dir) across --runs")
+    parser.add_argument('--cascade', nargs='?', const='analyze', default="", choices=sorted(MODEL_ROUTES),
+                        help="Run a factory.py model cascade mode with a fast stand-in as the fast model")
+    parser.add_argument('--fast-latency', type=float, default=None, help="Seconds per fast LM call (default: --latency / 4)")
+    parser.add_argument('--fast-invalid-rate', type=float, default=None, help="Share of invalid fast pages (default: --invalid-rate)")
+    parser.add_argument('--verbose', action='store_true', help="Show the factory's own progress output")
+    parser.add_argument('--json', default=None, metavar='FILE', help="Also save the results as JSON")
+    add_stand_in_arguments(parser)
+    args = parser.parse_args()
+    if args.token_budget <= 0:
+        parser.error("--token-budget must be positive")
+    if not args.verbose:
+        logging.getLogger('dspy').setLevel(logging.ERROR)
+
+    with tempfile.TemporaryDirectory(prefix="bench_factory_") as workdir:
+        site = os.path.join(workdir, "site")
+        os.makedirs(site)
+        files = write_sources(site, args.slugs, args.sources)
+        with fixture_server(site) as base_url:
+            results = load_test(args, workdir, base_url, files)
+
+    print_results(results, args)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'options': vars(args), 'runs': results}, f, indent=2)
+        print(f"📄 Results saved to: {args.json}")
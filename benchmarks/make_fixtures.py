@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark Fixture Generator
+---------------------------
+Writes the HTML corpus used by bench_extraction.py to benchmarks/fixtures/.
+Pages are generated from a fixed seed, so regenerating gives byte-identical
+files; they are checked in so every benchmark run parses the same bytes.
+
+Fixtures:
+    small.html               A short page: hero + 3 sections
+    typical.html             A consulting service page: nav, hero, ~15
+                             sections with images, card lists and a footer
+    many_headings.html       500 <h2> sections back to back
+    deep_nesting.html        Content wrapped in 200 levels of <div>
+    wide_lists.html          A few sections holding 2,000-item lists
+    inline_noise.html        Scripts, styles, hidden elements and inline tags
+    unclosed_hidden.html     Hidden <p> / <li> left unclosed, content after them
+
+Usage:
+    python benchmarks/make_fixtures.py
+"""
+
+import os
+import random
+
+# --- Configuration ---
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+SEED = 2024
+
+WORDS = ("transformation performance stratégie opérations conseil croissance équipe "
+         "méthodologie diagnostic pilotage excellence organisation efficacité données "
+         "clients marché valeur accompagnement projet résultats durable innovation").split()
+
+
+def sentence(rng: random.Random, words: int = 14) -> str:
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+
+def paragraph(rng: random.Random, sentences: int = 3) -> str:
+    return " ".join(sentence(rng) for _ in range(sentences))
+
+
+def page(title: str, body: str, head: str = "") -> str:
+    return (f"<!DOCTYPE html>\n<html lang=\"fr\"><head><meta charset=\"utf-8\"><title>{title}</title>{head}</head>\n"
+            f"<body>\n{body}\n</body></html>\n")
+
+
+NAV = ('<header><nav><ul>' + ''.join(f'<li><a href="/p{i}/">Menu {i}</a></li>' for i in range(12))
+       + '</ul></nav></header>')
+FOOTER = ('<footer><div><p>Cogesto Consulting — 12 rue de la Paix, 75002 Paris</p>'
+          '<ul>' + ''.join(f'<li><a href="/legal/{i}">Mentions {i}</a></li>' for i in range(8)) + '</ul></div></footer>')
+
+
+def hero(rng: random.Random, title: str) -> str:
+    return f'<section class="hero"><h1>{title}</h1><p>{paragraph(rng, 2)}</p></section>'
+
+
+def section(rng: random.Random, index: int, with_image: bool = False, items: int = 0) -> str:
+    parts = [f'<h2>Section {index}: {sentence(rng, 4)}</h2>', f'<p>{paragraph(rng)}</p>']
+    if with_image:
+        parts.append(f'<div class="media"><img src="/images/visual-{index}.jpg" alt="Visuel {index}"></div>')
+    if items:
+        parts.append('<ul>' + ''.join(f'<li>{sentence(rng, 6)}</li>' for _ in range(items)) + '</ul>')
+    return "\n".join(parts)
+
+
+def small(rng: random.Random) -> str:
+    body = hero(rng, "Notre expertise") + "".join(section(rng, i) for i in range(3))
+    return page("Small", f"<main>{body}</main>")
+
+
+def typical(rng: random.Random) -> str:
+    sections = [section(rng, i, with_image=i % 3 == 0, items=rng.choice([0, 0, 4, 6])) for i in range(15)]
+    body = NAV + '<main>' + hero(rng, "Transformation & Performance") + "\n".join(sections) + '</main>' + FOOTER
+    return page("Typical", body, head="<style>body{font-family:sans-serif}</style>")
+
+
+def many_headings(rng: random.Random) -> str:
+    return page("Many headings", "<main>" + "".join(section(rng, i) for i in range(500)) + "</main>")
+
+
+def deep_nesting(rng: random.Random, depth: int = 200) -> str:
+    inner = "".join(section(rng, i, with_image=True) for i in range(10))
+    return page("Deep nesting", "<div>" * depth + inner + "</div>" * depth)
+
+
+def wide_lists(rng: random.Random) -> str:
+    return page("Wide lists", "<main>" + "".join(section(rng, i, items=2000) for i in range(3)) + "</main>")
+
+
+def inline_noise(rng: random.Random) -> str:
+    blocks = []
+    for i in range(60):
+        blocks.append(f'<script>var tracking{i} = {{"id": {i}}};</script><style>.c{i}{{color:red}}</style>')
+        blocks.append(f'<div style="display: none"><p>{paragraph(rng, 1)}</p></div>')
+        words = [f'<span>{w}</span>' if j % 2 else f'<b>{w}</b>' for j, w in enumerate(sentence(rng, 40).split())]
+        blocks.append(f'<h2>Bloc {i}</h2><p>{" ".join(words)}</p><noscript>Activez JavaScript</noscript>')
+    return page("Inline noise", NAV + "<main>" + "".join(blocks) + "</main>" + FOOTER)
+
+
+def unclosed_hidden(rng: random.Random) -> str:
+    """Hidden elements relying on implied end tags, which html.parser never supplies."""
+    blocks = []
+    for i in range(20):
+        items = "".join(f"<li>{sentence(rng, 6)}" for _ in range(4))
+        blocks.append(f'<h2>Partie {i}</h2><div><p style="display:none">{sentence(rng)}<p>{paragraph(rng)}</div>'
+                      f'<p>{paragraph(rng, 2)}</p><ul><li style="display: none">{sentence(rng, 6)}{items}</ul>'
+                      f'<p>{paragraph(rng, 2)}</p>')
+    return page("Unclosed hidden", "<main>" + "".join(blocks) + "</main>")
+
+
+FIXTURES = {
+    "small": small,
+    "typical": typical,
+    "many_headings": many_headings,
+    "deep_nesting": deep_nesting,
+    "wide_lists": wide_lists,
+    "inline_noise": inline_noise,
+    "unclosed_hidden": unclosed_hidden,
+}
+
+
+def write_fixtures(directory: str = FIXTURES_DIR):
+    os.makedirs(directory, exist_ok=True)
+    for name, build in FIXTURES.items():
+        html = build(random.Random(f"{SEED}-{name}"))
+        path = os.path.join(directory, f"{name}.html")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(html)
+        print(f"📄 {path} ({len(html.encode('utf-8')) / 1024:.0f} KB)")
+
+
+if __name__ == "__main__":
+    write_fixtures()
@@ -0,0 +1,197 @@
+"""
+Cross-Page Block Deduplication
+------------------------------
+Collapses the CTA / cookie / newsletter / "contact us" sections that come
+back on every page of a site into one canonical block.
+
+1. Exact duplicates: blocks whose normalized heading + text hash the same.
+2. Near duplicates: MinHash signatures over word shingles, bucketed with
+   LSH banding, so only blocks that share a bucket are compared (no
+   all-pairs pass). A candidate pair is merged when its estimated Jaccard
+   similarity reaches `threshold`.
+
+Duplicates are clustered (union-find). The first block of each cluster, in
+input order, is kept and gains `source_urls` (every page the block was seen
+on) and `duplicate_count`; the others are dropped.
+
+Usage:
+    python block_dedupe.py <merged.json> [deduped.json] [--threshold 0.8]
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Tuple
+
+# --- Configuration ---
+DEFAULT_THRESHOLD = 0.8   # Estimated Jaccard similarity for near-duplicates
+NUM_PERM = 64             # MinHash signature length
+BANDS = 16                # LSH bands (NUM_PERM / BANDS rows each)
+SHINGLE_SIZE = 3          # Words per shingle
+_PRIME = (1 << 31) - 1    # Keeps a * h + b inside machine-word-sized ints
+
+_rng = random.Random(1337)  # Fixed seed: signatures are stable across runs
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+
+def normalize_text(text: str) -> str:
+    """Casefold, strip accents and punctuation, collapse whitespace."""
+    text = unicodedata.normalize('NFKD', text.casefold())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(re.findall(r'\w+', text))
+
+
+def block_text(block: Dict[str, Any]) -> str:
+    return normalize_text(' '.join([block.get('heading') or ''] + list(block.get('content') or [])))
+
+
+def exact_fingerprint(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set:
+    words = text.split()
+    if len(words) <= size:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _hash31(s: str) -> int:
+    return int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=4).digest(), 'big') % _PRIME
+
+
+def minhash(shingle_set: set) -> Tuple[int, ...]:
+    hashes = [_hash31(s) for s in shingle_set]
+    if not hashes:
+        return tuple([_PRIME] * NUM_PERM)
+    return tuple(min([(a * h + b) % _PRIME for h in hashes]) for a, b in _PERMS)
+
+
+def estimated_jaccard(sig_a: Tuple[int, ...], sig_b: Tuple[int, ...]) -> float:
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def lsh_keys(signature: Tuple[int, ...], bands: int = BANDS) -> Iterable[Tuple[int, Tuple[int, ...]]]:
+    rows = NUM_PERM // bands
+    for band in range(bands):
+        yield band, signature[band * rows:(band + 1) * rows]
+
+
+class _UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, a: int, b: int):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            # Lowest index wins, so the earliest block is the canonical one
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+def dedupe_blocks(blocks: List[Dict[str, Any]], threshold: float = DEFAULT_THRESHOLD,
+                  near: bool = True) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Return (kept blocks, stats). Input order is preserved; canonical blocks
+    are copies with `source_urls` and `duplicate_count` added.
+    """
+    texts = [block_text(b) for b in blocks]
+    uf = _UnionFind(len(blocks))
+
+    # 1. Exact duplicates
+    first_by_hash: Dict[str, int] = {}
+    exact_merged = 0
+    for i, text in enumerate(texts):
+        key = exact_fingerprint(text)
+        if key in first_by_hash:
+            uf.union(first_by_hash[key], i)
+            exact_merged += 1
+        else:
+            first_by_hash[key] = i
+
+    # 2. Near duplicates: one representative per exact cluster goes through LSH
+    near_merged = 0
+    if near:
+        signatures: Dict[int, Tuple[int, ...]] = {}
+        buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = defaultdict(list)
+        for i in first_by_hash.values():
+            signatures[i] = minhash(shingles(texts[i]))
+            for key in lsh_keys(signatures[i]):
+                buckets[key].append(i)
+
+        for members in buckets.values():
+            # Compare against one representative per cluster already in the bucket
+            representatives: List[int] = []
+            for m in members:
+                for r in representatives:
+                    if uf.find(r) == uf.find(m):
+                        break
+                    if estimated_jaccard(signatures[r], signatures[m]) >= threshold:
+                        uf.union(r, m)
+                        near_merged += 1
+                        break
+                else:
+                    representatives.append(m)
+
+    # 3. Collapse clusters onto their first block
+    clusters: Dict[int, List[int]] = defaultdict(list)
+    for i in range(len(blocks)):
+        clusters[uf.find(i)].append(i)
+
+    kept = []
+    for i, block in enumerate(blocks):
+        members = clusters.get(i)
+        if members is None:
+            continue  # Not a cluster root: merged into an earlier block
+        canonical = dict(block)
+        urls = []
+        for m in members:
+            url = blocks[m].get('source_url')
+            if url and url not in urls:
+                urls.append(url)
+        canonical['source_urls'] = urls
+        canonical['duplicate_count'] = len(members)
+        kept.append(canonical)
+
+    stats = {
+        'input_blocks': len(blocks),
+        'output_blocks': len(kept),
+        'exact_duplicates': exact_merged,
+        'near_duplicates': near_merged,
+    }
+    return kept, stats
+
+
+def dedupe_document(result: Dict[str, Any], threshold: float = DEFAULT_THRESHOLD) -> Dict[str, Any]:
+    """Dedupe a merged {"source_urls", "total_blocks", "blocks"} document in place."""
+    blocks, stats = dedupe_blocks(result['blocks'], threshold)
+    result['blocks'] = blocks
+    result['total_blocks'] = len(blocks)
+    print(f"🧹 Dedupe: {stats['input_blocks']} -> {stats['output_blocks']} blocks "
+          f"({stats['exact_duplicates']} exact, {stats['near_duplicates']} near-duplicate merges)")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Collapse repeated blocks in a merged scrape JSON.")
+    parser.add_argument('input')
+    parser.add_argument('output', nargs='?', default=None)
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        document = json.load(f)
+    dedupe_document(document, args.threshold)
+    output = args.output or args.input.replace('.json', '') + '.deduped.json'
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2, ensure_ascii=False)
+    print(f"📄 Saved to: {output}")
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+BM25 Block Index
+----------------
+Local full-text index over scraped ContentBlock records (webpage_to_markdown.py
+output) and the Cogesto brand corpus (corpus_store.py). The content factory
+uses it to hand PageBuilder only the blocks relevant to each section it has
+to write (see content_factory/grounding.py).
+
+Tokenization is French-aware: text is casefolded and accent-folded
+(block_dedupe.normalize_text, so "Stratégie" -> "strategie"), elided
+articles fall away with the apostrophe ("l'entreprise" -> "entreprise"),
+French and English stopwords are dropped and a minimal French stemmer
+merges plural and feminine forms ("stratégies" and "stratégie").
+
+Layout (under `.block_index/` at the repo root by default):
+    manifest.json              source -> live version, segment list
+    segments/000001.json.gz    documents added by one flush, with their postings
+
+- Documents are grouped by source (a page URL, or `brand:<url>` for corpus
+  pages) and version (hash of the page body or of its text). Adding a
+  source again with a new version supersedes its older documents; adding an
+  unchanged one is a no-op.
+- `flush()` writes only the documents added since the last flush, as a new
+  segment. Past MAX_SEGMENTS, the live documents are merged into one
+  segment and superseded ones are dropped.
+- Postings are delta-encoded (doc number gaps, term frequencies) and each
+  segment is gzipped.
+
+Usage:
+    python block_index.py add merged.json [blocks.jsonl ...]
+    python block_index.py add-corpus [--store .cogesto_corpus]
+    python block_index.py search "pilotage de la performance" [-k 5] [--kind brand]
+    python block_index.py stats
+    python block_index.py compact
+"""
+
+import argparse
+import gzip
+import heapq
+import json
+import math
+import re
+import sys
+import threading
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from block_dedupe import normalize_text
+from http_cache import atomic_write_bytes, sha256_hex
+
+# --- Configuration ---
+DEFAULT_INDEX_DIR = Path(__file__).resolve().parent / ".block_index"
+ANALYZER_VERSION = 1     # Bump when tokenization changes: the index is rebuilt
+BM25_K1 = 1.2
+BM25_B = 0.75
+MAX_SEGMENTS = 8         # Merge segments beyond this many
+PASSAGE_WORDS = 180      # Corpus pages are split into passages of about this size
+BRAND_PREFIX = "brand:"
+MARKDOWN_HEADING = re.compile(r'^#{1,6}\s+(.*)$')
+
+STOPWORDS = frozenset("""
+    a ai au aux avec c ce ces cet cette comme d dans de des du elle elles en est et etre eu
+    il ils j l la le les leur leurs lui m ma mais me meme mes moi mon n ne nos notre nous on ou
+    par pas plus pour qu que qui s sa se ses si son sont sur t ta te tes toi ton tous tout
+    tres tu un une vos votre vous y
+    an and are as at be by for from has have in is it its of on or our that the this to
+    was we were which will with you your
+""".split())
+
+
+def stem(word: str) -> str:
+    """Minimal French stemmer (plurals, feminine and -er endings); short words are left alone."""
+    if len(word) < 6 or not word.isalpha():
+        return word
+    if word.endswith('x'):
+        return word[:-3] + 'al' if word.endswith('aux') else word[:-1]
+    for suffix in ('s', 'r', 'e'):
+        if word.endswith(suffix):
+            word = word[:-1]
+    if word[-1] == word[-2]:
+        word = word[:-1]
+    return word
+
+
+def analyze(text: str) -> List[str]:
+    """Index terms of `text`, in order (query and documents go through the same path)."""
+    return [stem(word) for word in normalize_text(text).split()
+            if len(word) > 1 and word not in STOPWORDS]
+
+
+def block_body(block: Dict[str, Any]) -> str:
+    return "\n".join([block.get('heading') or ''] + list(block.get('content') or []))
+
+
+def doc_text(doc: Dict[str, Any]) -> str:
+    """What a document is indexed (and matched) on."""
+    if doc.get('block') is not None:
+        return block_body(doc['block'])
+    return f"{doc.get('heading') or ''}\n{doc.get('text') or ''}"
+
+
+def split_passages(text: str, max_words: int = PASSAGE_WORDS) -> List[Dict[str, Any]]:
+    """Markdown -> passages under their nearest heading, each at most about `max_words` words."""
+    passages = []
+    heading, words = None, []
+
+    def close():
+        for start in range(0, len(words), max_words):
+            passages.append({'heading': heading, 'text': ' '.join(words[start:start + max_words])})
+
+    for line in text.splitlines():
+        match = MARKDOWN_HEADING.match(line.strip())
+        if match:
+            close()
+            heading, words = match.group(1).strip() or None, []
+        else:
+            words.extend(line.split())
+    close()
+    return passages
+
+
+@dataclass
+class SearchHit:
+    doc_id: int
+    doc: Dict[str, Any]
+    score: float
+
+    @property
+    def source_url(self) -> str:
+        return self.doc['source'][len(BRAND_PREFIX):] if self.doc['kind'] == 'brand' else self.doc['source']
+
+
+class BlockIndex:
+    def __init__(self, root=DEFAULT_INDEX_DIR):
+        self.root = Path(root)
+        self.manifest_path = self.root / "manifest.json"
+        self._lock = threading.Lock()
+        self.sources: Dict[str, str] = {}   # source -> live version
+        self.segments: List[str] = []
+        self.next_segment = 1
+        # In memory, documents of every loaded segment (live or superseded)
+        self.docs: List[Dict[str, Any]] = []
+        self.doc_terms: List[Dict[str, int]] = []
+        self.lengths: List[int] = []
+        self.postings: Dict[str, List[tuple]] = defaultdict(list)  # term -> [(doc id, tf)]
+        # Statistics over live documents only
+        self.df: Counter = Counter()
+        self.live_docs = 0
+        self.live_length = 0
+        self._by_source: Dict[str, List[int]] = defaultdict(list)
+        self._pending: List[int] = []
+        self._dirty = False
+        self._load()
+
+    # --- Persistence -----------------------------------------------------
+
+    def _load(self):
+        if not self.manifest_path.exists():
+            return
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('analyzer') != ANALYZER_VERSION:
+            print(f"♻️  {self.root}: built with another tokenizer, starting a fresh index")
+            return
+        self.sources = manifest['sources']
+        self.segments = manifest['segments']
+        self.next_segment = manifest['next_segment']
+        for name in self.segments:
+            docs, doc_terms = decode_segment(gzip.decompress((self.root / "segments" / name).read_bytes()))
+            for doc, terms in zip(docs, doc_terms):
+                self._add_doc(doc, terms)
+
+    def _save_manifest(self):
+        manifest = {'analyzer': ANALYZER_VERSION, 'segments': self.segments,
+                    'next_segment': self.next_segment, 'sources': self.sources}
+        atomic_write_bytes(self.manifest_path, json.dumps(manifest, indent=2, ensure_ascii=False).encode('utf-8'))
+
+    def _write_segment(self, doc_ids: List[int]) -> str:
+        name = f"{self.next_segment:06d}.json.gz"
+        self.next_segment += 1
+        data = encode_segment([self.docs[i] for i in doc_ids], [self.doc_terms[i] for i in doc_ids])
+        atomic_write_bytes(self.root / "segments" / name, gzip.compress(data))
+        return name
+
+    def flush(self):
+        """Persist documents added since the last flush (one new segment)."""
+        with self._lock:
+            if not self._dirty:
+                return
+            pending = [i for i in self._pending if self.is_live(i)]
+            if pending:
+                self.segments.append(self._write_segment(pending))
+            self._pending = []
+            self._dirty = False
+            if len(self.segments) > MAX_SEGMENTS:
+                self._compact_locked()
+            self._save_manifest()
+
+    def compact(self):
+        """Merge every segment into one, dropping superseded documents."""
+        self.flush()
+        with self._lock:
+            self._compact_locked()
+            self._save_manifest()
+
+    def _compact_locked(self):
+        old = self.segments
+        live = [i for i in range(len(self.docs)) if self.is_live(i)]
+        self.segments = [self._write_segment(live)] if live else []
+        for name in old:
+            (self.root / "segments" / name).unlink(missing_ok=True)
+
+    # --- Adding ----------------------------------------------------------
+
+    def is_live(self, doc_id: int) -> bool:
+        doc = self.docs[doc_id]
+        return self.sources.get(doc['source']) == doc['version']
+
+    def has(self, source: str, version: str) -> bool:
+        return self.sources.get(source) == version
+
+    def _add_doc(self, doc: Dict[str, Any], terms: Dict[str, int]) -> int:
+        doc_id = len(self.docs)
+        self.docs.append(doc)
+        self.doc_terms.append(terms)
+        self.lengths.append(sum(terms.values()))
+        for term, tf in terms.items():
+            self.postings[term].append((doc_id, tf))
+        if self.is_live(doc_id):
+            self._by_source[doc['source']].append(doc_id)
+            self.df.update(terms.keys())
+            self.live_docs += 1
+            self.live_length += self.lengths[doc_id]
+        return doc_id
+
+    def add_source(self, source: str, version: str, docs: Iterable[Dict[str, Any]]) -> bool:
+        """Index `docs` as the current content of `source`; returns False if that version is already in."""
+        with self._lock:
+            if self.sources.get(source) == version:
+                return False
+            for doc_id in self._by_source.pop(source, []):
+                self.df.subtract(self.doc_terms[doc_id].keys())
+                self.live_docs -= 1
+                self.live_length -= self.lengths[doc_id]
+            self.sources[source] = version
+            self._dirty = True
+            for doc in docs:
+                doc = dict(doc, source=source, version=version)
+                terms = dict(Counter(analyze(doc_text(doc))))
+                if terms:
+                    self._pending.append(self._add_doc(doc, terms))
+            return True
+
+    def add_blocks(self, url: str, blocks: List[Dict[str, Any]], version: Optional[str] = None) -> bool:
+        """Scraped blocks of one page (ContentBlock.to_dict() form)."""
+        if version is None:
+            version = sha256_hex(json.dumps(blocks, sort_keys=True, ensure_ascii=False).encode('utf-8'))[:16]
+        return self.add_source(url, version, ({'kind': 'block', 'heading': b.get('heading'), 'block': b}
+                                              for b in blocks))
+
+    def add_passages(self, url: str, text: str, version: Optional[str] = None) -> bool:
+        """A brand corpus page, split into heading-scoped passages."""
+        version = version or sha256_hex(text.encode('utf-8'))[:16]
+        return self.add_source(BRAND_PREFIX + url, version,
+                               (dict(passage, kind='brand') for passage in split_passages(text)))
+
+    # --- Search ----------------------------------------------------------
+
+    def search(self, query: str, k: int = 5, kind: Optional[str] = None,
+               sources: Optional[Set[str]] = None, exclude: Optional[Set[int]] = None) -> List[SearchHit]:
+        """Top `k` live documents by BM25, optionally limited to one kind and to some sources."""
+        with self._lock:
+            return [SearchHit(doc_id=i, doc=self.docs[i], score=score)
+                    for i, score in self._search_locked(query, k, kind, sources, exclude)]
+
+    def _search_locked(self, query, k, kind, sources, exclude) -> List[tuple]:
+        if not self.live_docs:
+            return []
+        avgdl = self.live_length / self.live_docs
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(analyze(query)):
+            df = self.df.get(term, 0)
+            if df <= 0:
+                continue
+            idf = math.log(1 + (self.live_docs - df + 0.5) / (df + 0.5))
+            for doc_id, tf in self.postings[term]:
+                doc = self.docs[doc_id]
+                if ((kind and doc['kind'] != kind) or (sources is not None and doc['source'] not in sources)
+                        or (exclude and doc_id in exclude) or not self.is_live(doc_id)):
+                    continue
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[doc_id] / avgdl)
+                scores[doc_id] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+        # Ties go to the earlier document (page order)
+        return heapq.nsmallest(k, ((doc_id, score) for doc_id, score in scores.items()),
+                               key=lambda item: (-item[1], item[0]))
+
+    def summary(self) -> str:
+        pages = sum(1 for s in self.sources if not s.startswith(BRAND_PREFIX))
+        return (f"index: {self.live_docs} documents from {pages} pages and {len(self.sources) - pages} "
+                f"corpus pages, {sum(1 for n in self.df.values() if n > 0)} terms, {len(self.segments)} segment(s)")
+
+
+def encode_segment(docs: List[Dict[str, Any]], doc_terms: List[Dict[str, int]]) -> bytes:
+    postings: Dict[str, List[int]] = defaultdict(list)
+    previous: Dict[str, int] = {}
+    for local, terms in enumerate(doc_terms):
+        for term, tf in terms.items():
+            postings[term].extend((local - previous.get(term, 0), tf))
+            previous[term] = local
+    data = {'docs': docs, 'postings': postings}
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def decode_segment(data: bytes):
+    segment = json.loads(data)
+    docs = segment['docs']
+    doc_terms: List[Dict[str, int]] = [{} for _ in docs]
+    for term, flat in segment['postings'].items():
+        local = 0
+        for i in range(0, len(flat), 2):
+            local += flat[i]
+            doc_terms[local][term] = flat[i + 1]
+    return docs, doc_terms
+
+
+def load_blocks_file(path: str) -> Dict[str, Any]:
+    """webpage_to_markdown.py output: merged JSON, or the streamed JSONL form."""
+    if path.endswith('.jsonl'):
+        from block_stream import read_jsonl
+        return read_jsonl(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def add_blocks_file(index: BlockIndex, path: str) -> int:
+    """Index every page of a scraped blocks file; returns the number of pages (re)indexed."""
+    document = load_blocks_file(path)
+    if not isinstance(document, dict) or not isinstance(document.get('blocks'), list):
+        raise ValueError("no 'blocks' list: not webpage_to_markdown.py output")
+    by_url: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for block in document['blocks']:
+        # Single-page files (older format) carry the URL once, at the top
+        for url in block.get('source_urls') or [block.get('source_url') or document.get('source_url')]:
+            if url:
+                by_url[url].append(block)
+    return sum(index.add_blocks(url, blocks) for url, blocks in by_url.items())
+
+
+def add_corpus(index: BlockIndex, store_dir=None) -> int:
+    """Index the brand corpus; returns the number of corpus pages (re)indexed."""
+    from corpus_store import DEFAULT_STORE_DIR, CorpusReader
+    with CorpusReader(store_dir or DEFAULT_STORE_DIR) as reader:
+        return sum(index.add_passages(url, reader.page(url), version=reader.entries[url]['sha256'][:16])
+                   for url in reader.urls())
+
+
+def print_hits(hits: List[SearchHit]):
+    for rank, hit in enumerate(hits, 1):
+        heading = hit.doc.get('heading') or '(no heading)'
+        text = ' '.join(doc_text(hit.doc).split()[:30])
+        print(f"{rank:>2}. {hit.score:6.2f}  [{hit.doc['kind']}] {heading} — {hit.source_url}")
+        print(f"      {text}…")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="BM25 index over scraped blocks and the Cogesto corpus.")
+    parser.add_argument('--index', default=str(DEFAULT_INDEX_DIR), help="Index directory")
+    commands = parser.add_subparsers(dest='command', required=True)
+    add = commands.add_parser('add', help="Index webpage_to_markdown.py output files")
+    add.add_argument('files', nargs='+')
+    corpus = commands.add_parser('add-corpus', help="Index the Cogesto corpus store")
+    corpus.add_argument('--store', default=None, help="Corpus store directory (default: .cogesto_corpus)")
+    search = commands.add_parser('search', help="Print the best matches for a query")
+    search.add_argument('query')
+    search.add_argument('-k', type=int, default=5)
+    search.add_argument('--kind', choices=['block', 'brand'], default=None)
+    commands.add_parser('stats', help="Print index size")
+    commands.add_parser('compact', help="Merge segments and drop superseded documents")
+    args = parser.parse_args()
+
+    index = BlockIndex(args.index)
+    if args.command == 'add':
+        for path in args.files:
+            try:
+                print(f"📥 {path}: {add_blocks_file(index, path)} page(s) indexed")
+            except (OSError, ValueError) as e:
+                print(f"❌ {path}: {e}")
+        index.flush()
+    elif args.command == 'add-corpus':
+        try:
+            print(f"📥 Corpus: {add_corpus(index, args.store)} page(s) indexed")
+        except FileNotFoundError:
+            print("❌ No corpus store found (run get_cogesto_context.py first)")
+            sys.exit(1)
+        index.flush()
+    elif args.command == 'search':
+        print_hits(index.search(args.query, k=args.k, kind=args.kind))
+    elif args.command == 'compact':
+        index.compact()
+    print(f"🔎 {index.summary()}")
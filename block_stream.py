@@ -0,0 +1,174 @@
+"""
+Streaming JSONL Block Output
+----------------------------
+Append-only writer used by `webpage_to_markdown.py --jsonl`: each page's
+blocks are written (and flushed) as soon as they are extracted, so memory
+stays flat during a crawl and a crash keeps everything scraped so far.
+
+File layout, one JSON object per line:
+    {"_meta": {"source_urls": [...]}}          header, first line
+    {"_page": 3, "type": "section", ...}       one line per block
+
+Pages may land out of order (async fetching); `_page` is the index of the
+page's URL in `source_urls`, and `read_jsonl` sorts on it, so the merged
+document matches the one `process_urls` writes in JSON mode.
+
+Crawls (site_crawler.py) do not know their URLs up front: they append to
+the file across runs and announce each page with its own meta line,
+    {"_meta": {"page": 3, "url": "https://..."}}
+A re-crawled page is announced again under a new index; only its latest
+blocks are kept when the file is read back. Before appending, the writer
+cuts the file back to `truncate_at` (the size at the crawler's last
+checkpoint) or else to its last complete line, so a torn line left by a
+crash never swallows the next record.
+
+Usage:
+    python block_stream.py <blocks.jsonl> [merged.json] [--dedupe]
+"""
+
+import json
+import os
+import sys
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import orjson
+
+    def dumps_line(obj: Dict[str, Any]) -> bytes:
+        return orjson.dumps(obj) + b"\n"
+except ImportError:
+    _encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+    def dumps_line(obj: Dict[str, Any]) -> bytes:
+        return (_encoder.encode(obj) + "\n").encode('utf-8')
+
+META_KEY = "_meta"
+PAGE_KEY = "_page"
+TAIL_CHUNK_SIZE = 64 * 1024
+
+
+def complete_size(f, size: int) -> int:
+    """Offset just past the last newline of the first `size` bytes of `f` (0 if none)."""
+    end = size
+    while end > 0:
+        start = max(0, end - TAIL_CHUNK_SIZE)
+        f.seek(start)
+        newline = f.read(end - start).rfind(b"\n")
+        if newline >= 0:
+            return start + newline + 1
+        end = start
+    return 0
+
+
+class BlockStreamWriter:
+    def __init__(self, path: str, source_urls: Optional[List[str]] = None, append: bool = False,
+                 truncate_at: Optional[int] = None):
+        self.path = path
+        self.total_blocks = 0
+        if append and os.path.exists(path):
+            self._file = open(path, 'r+b')
+            size = os.path.getsize(path)
+            if truncate_at is not None:
+                size = min(size, truncate_at)
+            self._file.truncate(complete_size(self._file, size))
+            self._file.seek(0, os.SEEK_END)
+        else:
+            self._file = open(path, 'wb')
+        if source_urls is not None:
+            self._file.write(dumps_line({META_KEY: {"source_urls": list(source_urls)}}))
+        self._file.flush()
+
+    def write_page(self, page_index: int, blocks: List[Dict[str, Any]], url: Optional[str] = None):
+        """
+        Append one page's blocks (already plain dicts) and flush them to disk.
+        `url` announces the page for files written without a source_urls header.
+        """
+        lines = [dumps_line({META_KEY: {"page": page_index, "url": url}})] if url else []
+        lines.extend(dumps_line({PAGE_KEY: page_index, **block}) for block in blocks)
+        self._file.write(b"".join(lines))
+        self._file.flush()
+        self.total_blocks += len(blocks)
+
+    def tell(self) -> int:
+        """Bytes written so far, i.e. where the next append starts."""
+        return self._file.tell()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield raw records, skipping a torn last line left by a crash."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def read_jsonl(path: str) -> Dict[str, Any]:
+    """Rebuild the merged {"source_urls", "total_blocks", "blocks"} document."""
+    source_urls: List[str] = []
+    page_urls: Dict[int, str] = {}
+    records = []
+    for record in iter_jsonl(path):
+        if META_KEY in record:
+            meta = record[META_KEY]
+            if "source_urls" in meta:
+                source_urls = meta["source_urls"]
+            elif "page" in meta:
+                page_urls[meta["page"]] = meta["url"]
+            continue
+        records.append(record)
+
+    if not source_urls and page_urls:
+        latest = {url: page for page, url in sorted(page_urls.items())}
+        live_pages = set(latest.values())
+        records = [r for r in records if r.get(PAGE_KEY) in live_pages]
+        source_urls = [page_urls[i] for i in sorted(live_pages)]
+
+    # Stable sort: blocks of one page keep their extraction order
+    records.sort(key=lambda r: r.get(PAGE_KEY, 0))
+    blocks = []
+    for record in records:
+        record.pop(PAGE_KEY, None)
+        blocks.append(record)
+
+    return {
+        "source_urls": source_urls,
+        "total_blocks": len(blocks),
+        "blocks": blocks
+    }
+
+
+def merge_jsonl(path: str, output_file: Optional[str] = None, dedupe: bool = False) -> str:
+    result = read_jsonl(path)
+    if dedupe:
+        from block_dedupe import dedupe_document
+        dedupe_document(result)
+    if not output_file:
+        output_file = path[:-len('.jsonl')] + '.json' if path.endswith('.jsonl') else path + '.json'
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"📦 Merged {result['total_blocks']} blocks from {path}")
+    print(f"📄 Saved to: {output_file}")
+    return output_file
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if a != '--dedupe']
+    if not args:
+        print("Usage: python block_stream.py <blocks.jsonl> [merged.json] [--dedupe]")
+        sys.exit(1)
+    merge_jsonl(args[0], args[1] if len(args) > 1 else None, dedupe='--dedupe' in sys.argv)
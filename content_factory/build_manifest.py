@@ -0,0 +1,120 @@
+"""
+Incremental build manifest for `run_content_factory`.
+
+`build_manifest.json` records, for every slug that was generated:
+    - sources:        url -> sha256 of the fetched page body
+    - schema_version: hash of the NewPageStructure JSON schema
+    - prompt_version: hash of the ContentAnalyzer / PageBuilder signatures
+                      and the LM settings
+    - output:         path and sha256 of the written page JSON
+
+It also maps prompt fingerprints (a dspy-free hash of the prompt inputs, see
+factory.prompt_fingerprint) to the prompt_version they produced, so
+`python factory.py plan` can check prompts without loading dspy.
+
+A slug is rebuilt only when one of those inputs changed or its output file
+is missing; `--force` rebuilds everything and `--only` names slugs to
+rebuild regardless. Outputs are written atomically (temp file + rename),
+so an interrupted run never leaves a half-written page behind.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import requests
+
+import run_metrics
+from http_cache import USER_AGENT, atomic_write_bytes
+
+DEFAULT_MANIFEST = Path(__file__).resolve().parent / "build_manifest.json"
+
+
+def sha256_hex(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def text_version(text: str) -> str:
+    return sha256_hex(text.encode('utf-8'))[:16]
+
+
+def atomic_write_json(path: str, data: Any):
+    """Write JSON to a temp file next to `path`, then rename it into place."""
+    atomic_write_bytes(Path(path), json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8'))
+
+
+def source_hashes(urls: List[str], cache=None, timeout: float = 15) -> Dict[str, str]:
+    """Hash each source body, fetched through the HTTP cache when given."""
+    hashes = {}
+    for url in urls:
+        if cache is not None:
+            response = cache.get(url, timeout=timeout)
+        else:
+            response = requests.get(url, headers={'User-Agent': USER_AGENT}, timeout=timeout)
+        response.raise_for_status()
+        hashes[url] = sha256_hex(response.content)
+        run_metrics.record('bytes', len(response.content))
+    return hashes
+
+
+class BuildManifest:
+    def __init__(self, path=DEFAULT_MANIFEST):
+        self.path = Path(path)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.prompts: Dict[str, str] = {}  # prompt fingerprint -> prompt_version
+        self._lock = threading.Lock()  # Slugs may finish concurrently
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.entries = data.get('slugs', {})
+            self.prompts = data.get('prompts', {})
+
+    def stale_reason(self, slug: str, sources: Dict[str, Optional[str]], schema_version: str,
+                     prompt_version: Optional[str], output_path: str) -> Optional[str]:
+        """
+        Why `slug` needs a rebuild, or None when it is up to date. A None
+        prompt_version or source digest (unknown to a dry run) is not compared.
+        """
+        entry = self.entries.get(slug)
+        if entry is None:
+            return "never built"
+        if not os.path.exists(output_path):
+            return "output missing"
+        if entry.get('schema_version') != schema_version:
+            return "schema changed"
+        if prompt_version is not None and entry.get('prompt_version') != prompt_version:
+            return "prompt or model changed"
+        old_sources = entry.get('sources', {})
+        if set(old_sources) != set(sources):
+            return "source list changed"
+        changed = [url for url, digest in sources.items()
+                   if digest is not None and old_sources.get(url) != digest]
+        if changed:
+            return f"{len(changed)} source(s) changed"
+        return None
+
+    def record(self, slug: str, sources: Dict[str, str], schema_version: str,
+               prompt_version: str, output_path: str):
+        with open(output_path, 'rb') as f:
+            output_hash = sha256_hex(f.read())
+        with self._lock:
+            self.entries[slug] = {
+                'sources': sources,
+                'schema_version': schema_version,
+                'prompt_version': prompt_version,
+                'output': {'path': output_path, 'sha256': output_hash},
+                'built_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            }
+            self.save()
+
+    def remember_prompt(self, fingerprint: str, prompt_version: str):
+        with self._lock:
+            self.prompts[fingerprint] = prompt_version
+
+    def save(self):
+        atomic_write_json(str(self.path), {'slugs': dict(sorted(self.entries.items())),
+                                           'prompts': dict(sorted(self.prompts.items()))})
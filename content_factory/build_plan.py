@@ -0,0 +1,146 @@
+"""
+Dry-run plan for `run_content_factory` (`python factory.py plan`).
+
+For every slug, says whether a build would regenerate it and why, using
+only what is on disk: the build manifest, the HTTP cache (bodies are read
+whatever their age; nothing is fetched or revalidated) and the output
+files. Nothing here imports dspy, so a plan starts in a fraction of a
+second and needs no API key.
+
+A slug is:
+    stale     the manifest says it must be rebuilt (reason given)
+    fresh     up to date, as far as the cached sources show
+    unknown   nothing known to be stale, but a source is not cached or the
+              prompt inputs changed since the last build (a build will tell)
+
+Token costs are estimates: visible page text at 4 characters per token,
+capped by the compaction budget, plus the expected completion size for
+each LM call, before any LLM cache hit.
+"""
+
+import html
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from build_manifest import BuildManifest, sha256_hex
+from scheduler import CHARS_PER_TOKEN, DEFAULT_COMPLETION_TOKENS
+
+# --- Configuration ---
+INVISIBLE_RE = re.compile(rb'<(script|style|noscript|template)\b.*?</\1\s*>|<!--.*?-->', re.S | re.I)
+TAG_RE = re.compile(rb'<[^>]+>')
+SPACE_RE = re.compile(r'\s+')
+
+
+@dataclass
+class SourceStatus:
+    url: str
+    state: str                     # 'cached', 'expired' (would be revalidated) or 'missing'
+    digest: Optional[str] = None
+    tokens: Optional[int] = None   # Estimated tokens of visible text
+
+
+@dataclass
+class SlugPlan:
+    slug: str
+    status: str                    # 'stale', 'fresh' or 'unknown'
+    reason: str = ""
+    sources: List[SourceStatus] = field(default_factory=list)
+    tokens: Optional[int] = None   # Estimated LM tokens of a rebuild
+    calls: int = 0
+
+
+def visible_tokens(body: bytes) -> int:
+    """Rough token count of the text a reader would see (no HTML parse)."""
+    text = TAG_RE.sub(b' ', INVISIBLE_RE.sub(b' ', body)).decode('utf-8', errors='ignore')
+    return len(SPACE_RE.sub(' ', html.unescape(text)).strip()) // CHARS_PER_TOKEN
+
+
+def source_status(url: str, cache=None) -> SourceStatus:
+    entry = cache.lookup(url) if cache is not None else None
+    body = cache.peek(url) if entry else None
+    if body is None:
+        return SourceStatus(url=url, state='missing')
+    return SourceStatus(url=url, state='cached' if cache.is_fresh(entry) else 'expired',
+                        digest=sha256_hex(body), tokens=visible_tokens(body))
+
+
+def estimate_tokens(sources: List[SourceStatus], token_budget: int, map_reduce: bool,
+                    build_cap: Optional[int] = None):
+    """
+    (estimated tokens, LM calls) of one rebuild; tokens is None if a source is
+    not cached. `build_cap` bounds the build step's source material (--ground).
+    """
+    unique = list({s.url: s for s in sources}.values())
+    calls = len(unique) + 1 if map_reduce else 2
+    if any(s.tokens is None for s in unique):
+        return None, calls
+    context = sum(s.tokens for s in unique)
+    if token_budget:
+        context = min(context, token_budget)
+    build = min(context, build_cap) if build_cap else context
+    if map_reduce:
+        # One analysis per source, then one build over the whole context
+        analyses = sum(min(s.tokens, token_budget) if token_budget else s.tokens for s in unique)
+        return analyses + build + calls * DEFAULT_COMPLETION_TOKENS, calls
+    return context + build + calls * DEFAULT_COMPLETION_TOKENS, calls
+
+
+def plan_slugs(pages: Dict[str, List[str]], manifest: BuildManifest, cache, output_dir: str,
+               schema_version: str, prompt_version: Optional[str], token_budget: int = 0,
+               map_reduce: bool = False, force: bool = False,
+               build_cap: Optional[int] = None) -> List[SlugPlan]:
+    """`prompt_version` is None when it is not known without loading dspy."""
+    plans = []
+    for slug, urls in pages.items():
+        filepath = os.path.join(output_dir, f"{slug.replace('/', '-')}.json")
+        sources = [source_status(url, cache) for url in urls]
+        plan = SlugPlan(slug=slug, status='stale', sources=sources)
+        reason = "forced" if force else manifest.stale_reason(
+            slug, {s.url: s.digest for s in sources}, schema_version, prompt_version, filepath)
+        missing = sum(1 for s in sources if s.state == 'missing')
+        if reason is not None:
+            plan.reason = reason
+        elif prompt_version is None:
+            plan.status, plan.reason = 'unknown', "prompt inputs changed since the last build"
+        elif missing:
+            plan.status, plan.reason = 'unknown', f"{missing} source(s) not cached"
+        else:
+            plan.status = 'fresh'
+        if plan.status != 'fresh':
+            plan.tokens, plan.calls = estimate_tokens(sources, token_budget, map_reduce, build_cap)
+        plans.append(plan)
+    return plans
+
+
+SOURCE_ICONS = {'cached': '💾', 'expired': '♻️ ', 'missing': '⬇️ '}
+SOURCE_NOTES = {'cached': '', 'expired': ' (expired: would be revalidated)', 'missing': ' (not cached: would be downloaded)'}
+STATUS_ICONS = {'stale': '⚙️ ', 'fresh': '⏭️ ', 'unknown': '❔'}
+
+
+def print_plan(plans: List[SlugPlan], verbose: bool = False):
+    for plan in plans:
+        if plan.status == 'fresh':
+            if not verbose:
+                continue
+            print(f"{STATUS_ICONS['fresh']} {plan.slug}: up to date")
+        else:
+            tokens = f", ~{plan.tokens:,} tokens" if plan.tokens is not None else ""
+            print(f"{STATUS_ICONS[plan.status]} {plan.slug} ({plan.reason}): {plan.calls} LM call(s){tokens}")
+        for source in plan.sources:
+            size = f" ~{source.tokens:,} tokens" if source.tokens is not None else ""
+            print(f"      {SOURCE_ICONS[source.state]} {source.url}{size}{SOURCE_NOTES[source.state]}")
+
+    counts = {status: sum(1 for p in plans if p.status == status) for status in STATUS_ICONS}
+    todo = [p for p in plans if p.status != 'fresh']
+    known = [p.tokens for p in todo if p.tokens is not None]
+    downloads = {s.url for p in todo for s in p.sources if s.state == 'missing'}
+    print(f"\n🗺️  {len(plans)} slugs: {counts['stale']} stale, {counts['unknown']} unknown, {counts['fresh']} up to date.")
+    if known:
+        print(f"💰 ~{sum(known):,} estimated LM tokens over {sum(p.calls for p in todo if p.tokens is not None)} "
+              f"LM call(s), before LLM cache hits.")
+    if len(known) < len(todo):
+        print(f"❔ {len(todo) - len(known)} slug(s) not estimated: sources not cached.")
+    if downloads:
+        print(f"⬇️  {len(downloads)} source(s) to download.")
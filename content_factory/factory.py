@@ -1,315 +1,583 @@
+import argparse
+import hashlib
 import json
 import os
-import dspy
-from typing import Literal, List, Optional, Union
-from pydantic import BaseModel, Field, field_validator
-from attachments.dspy import Attachments
+import re
+import sys
+from importlib.metadata import PackageNotFoundError, version as package_version
+from typing import TYPE_CHECKING, Dict, List, Optional
 from migration_map import PAGE_MAPPING
+from page_schema import NewPageStructure, validate_page
+# dspy, attachments, llm_cache and signatures are imported when first needed:
+# loading them takes seconds, and `plan` never does
+if TYPE_CHECKING:
+    import dspy
+
+# Shared scraping helpers live at the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from http_cache import HTTPCache
+from fetch_engine import build_session
+from host_limiter import DEFAULT_MAX_LIMIT, HostLimiter
+from block_dedupe import normalize_text
+from run_metrics import RunMetrics, timed
+from build_manifest import BuildManifest, atomic_write_json, source_hashes, text_version
+from build_plan import plan_slugs, print_plan
+from block_index import BlockIndex
+from grounding import ground_sections, index_brand, index_sources, max_grounded_tokens
+from job_queue import DEFAULT_JOBS_DB, JobQueue, print_status
+from scheduler import (DEFAULT_CONCURRENCY, DEFAULT_RPM, DEFAULT_TPM, RateLimitedPredictor,
+                       RateLimiter, run_concurrently)
+from source_compaction import DEFAULT_TOKEN_BUDGET, compact_sources
 
 # -------------------------------------------------------------------------
 # 1. SETUP DSPy
 # -------------------------------------------------------------------------
 # Using OpenAI reasoning model parameters as requested/discovered
-lm = dspy.LM(
-    model='openai/gpt-5-mini', 
-    api_key=os.environ.get("OPENROUTER_API_KEY"),
-    api_base="https://openrouter.ai/api/v1",
-    max_tokens=16000,
-    temperature=1.0
-)
-dspy.configure(lm=lm)
+LM_SETTINGS = {
+    'model': 'openai/gpt-5-mini',
+    'api_base': "https://openrouter.ai/api/v1",
+    'max_tokens': 16000,
+    'temperature': 1.0,
+}
+
+# Per-signature model routing (--cascade MODE): each signature tries its
+# models in order and escalates to the next one when the answer does not
+# parse or (PageBuilder) fails validate_page. Without --cascade every
+# signature uses 'strong' only.
+FAST_LM_SETTINGS = {**LM_SETTINGS, 'model': 'openai/gpt-5-nano'}
+MODEL_ROUTES = {
+    # `--cascade` / `--cascade analyze`: the blueprint from the fast model, pages from the strong one
+    'analyze': {'ContentAnalyzer': ('fast', 'strong'), 'PageBuilder': ('strong',)},
+    # `--cascade all`: pages are tried on the fast model first too (cheapest, more escalations)
+    'all': {'ContentAnalyzer': ('fast', 'strong'), 'PageBuilder': ('fast', 'strong')},
+}
+
+def build_lm(settings: Dict = LM_SETTINGS):
+    import dspy
+    return dspy.LM(api_key=os.environ.get("OPENROUTER_API_KEY"), **settings)
+
+def configure_lm():
+    """Build the LM on first use rather than at import (no API key needed until then)."""
+    import dspy
+    lm = build_lm()
+    dspy.configure(lm=lm, track_usage=True)  # Token usage feeds the run report
+    return lm
 
 # -------------------------------------------------------------------------
-# 2. DEFINE YOUR ASTRO COMPONENT PROTOCOL (Strict Schema)
+# 2. THE ASTRO COMPONENT PROTOCOL (Strict Schema) lives in page_schema.py
 # -------------------------------------------------------------------------
 
-class BreadcrumbItem(BaseModel):
-    text: str
-    href: str
-
-class Breadcrumbs(BaseModel):
-    component: Literal["Breadcrumbs"] = "Breadcrumbs"
-    items: List[BreadcrumbItem]
-
-class NavItem(BaseModel):
-    text: str
-    href: str
-
-class SubNavigation(BaseModel):
-    component: Literal["SubNavigation"] = "SubNavigation"
-    items: List[NavItem]
-    currentPage: str = Field(description="The active path, e.g., '/operations/'")
-
-class BoxCardItem(BaseModel):
-    title: str
-    description: str
-    
-    @field_validator('title')
-    @classmethod
-    def check_title_length(cls, v: str) -> str:
-        words = v.split()
-        if len(words) > 5:
-             return " ".join(words[:5])
-        return v
-
-class BoxCards(BaseModel):
-    component: Literal["BoxCards"] = "BoxCards"
-    title: str
-    description: str
-    cards: List[BoxCardItem]
-
-class HeroMultiTemplate(BaseModel):
-    component: Literal["HeroMultiTemplate"] = "HeroMultiTemplate"
-    title: str
-    introduction: str = Field(description="Subheadline or intro text")
-    ctaText: Optional[str] = "Get in touch"
-    ctaHref: Optional[str] = "/contact/"
-    imageUrl: Optional[str] = Field(description="Background image URL")
-    backgroundColor: Optional[Literal["secondary-color", "cobalt"]] = "secondary-color"
-
-class BodyCopyImage(BaseModel):
-    component: Literal["BodyCopyImage"] = "BodyCopyImage"
-    title: str
-    description: str
-    imageUrl: Optional[str] = Field(description="URL of the image")
-    imageAlt: Optional[str] = Field(description="Alt text for image", default="")
-    buttonText: Optional[str]
-    buttonHref: Optional[str]
-    reverseLayout: bool = False
-
-class CardItem(BaseModel):
-    heading: str
-    text: str
-    link: Optional[str]
-    style: Literal["primary", "light", "image"] = "light"
-    imageUrl: Optional[str] = Field(description="Background image URL for image style cards")
-
-class CardGrid(BaseModel):
-    """Used for lists of services, features, or advantages."""
-    component: Literal["CardGrid"] = "CardGrid"
-    heading: Optional[str]
-    items: List[CardItem]
-
-class LeftTitledIntro(BaseModel):
-    component: Literal["LeftTitledIntro"] = "LeftTitledIntro"
-    title: str
-    content: str = Field(description="The intro text content")
-
-class CenteredTextSection(BaseModel):
-    component: Literal["CenteredTextSection"] = "CenteredTextSection"
-    title: str
-    content: str
-
-class TextOnlySection(BaseModel):
-    component: Literal["TextOnlySection"] = "TextOnlySection"
-    title: str
-    content: str
-
-class AccordionItem(BaseModel):
-    question: str = Field(alias="trigger") 
-    answer: str = Field(alias="content")
-
-class Accordion(BaseModel):
-    component: Literal["Accordion"] = "Accordion"
-    title: str
-    description: Optional[str]
-    items: List[AccordionItem]
-
-class QuoteImage(BaseModel):
-    src: str
-    alt: str
-
-class QuoteSection(BaseModel):
-    component: Literal["QuoteSection"] = "QuoteSection"
-    quote: str
-    attribution: str
-    image: QuoteImage
-
-class StatItem(BaseModel):
-    number: str
-    label: str
-
-class StatsSection(BaseModel):
-    component: Literal["StatsSection"] = "StatsSection"
-    intro: Optional[str]
-    stats: List[StatItem]
-
-class CardImageText(BaseModel):
-    component: Literal["CardImageText"] = "CardImageText"
-    title: str
-    description: str
-    buttonText: Optional[str]
-    buttonHref: Optional[str]
-    imageUrl: str = Field(description="URL of the image")
-    imageAlt: str
-    videoPosition: Literal["left", "right"] = "right"
-    backgroundColorClass: Optional[str] = "bg-secondary-color"
-
-class CardQuote(BaseModel):
-    component: Literal["CardQuote"] = "CardQuote"
-    quote: str
-    author: str
-    imageUrl: str = Field(description="URL of the image")
-    imageAlt: str
-    videoPosition: Literal["left", "right"] = "right"
-    backgroundColorClass: Optional[str] = "bg-primary-color"
-
-class TabItem(BaseModel):
-    id: str
-    title: str
-    content: str
-
-    @field_validator('title')
-    @classmethod
-    def check_title_length(cls, v: str) -> str:
-        words = v.split()
-        if len(words) > 3:
-            return " ".join(words[:3])
-        return v
-
-class ValuesTabs(BaseModel):
-    component: Literal["ValuesTabs"] = "ValuesTabs"
-    summaryTitle: str
-    summaryDescription: str
-    tabs: List[TabItem]
-
-class ImageObject(BaseModel):
-    src: str
-    alt: str
-    position: Optional[Literal['left', 'right']] = 'right'
-
-class CtaButton(BaseModel):
-    text: str
-    href: str
-    variant: Optional[Literal['primary', 'secondary']] = 'primary'
-
-class TwoColumnContent(BaseModel):
-    component: Literal["TwoColumnContent"] = "TwoColumnContent"
-    title: str
-    paragraphs: List[str]
-    image: Optional[ImageObject] = None
-    ctaButtons: Optional[List[CtaButton]] = None
-    backgroundColor: Optional[Literal['white', 'light']] = 'white'
-    imagePosition: Optional[Literal['left', 'right']] = 'right'
-
-# The Union of ALL allowed components in your system
-ComponentUnion = Union[
-    Breadcrumbs,
-    SubNavigation,
-    HeroMultiTemplate, 
-    LeftTitledIntro,
-    BoxCards,
-    ValuesTabs,
-    CardGrid,
-    BodyCopyImage,
-    CardImageText,
-    CardQuote,
-    TwoColumnContent,
-    CenteredTextSection,
-    TextOnlySection, 
-    Accordion,
-    QuoteSection,
-    StatsSection
-]
-
-class NewPageStructure(BaseModel):
-    title: str = Field(description="The SEO title for the new merged page")
-    description: str = Field(description="The SEO meta description")
-    breadcrumbs: Optional[Breadcrumbs] = Field(description="Breadcrumbs navigation")
-    subNavigation: Optional[SubNavigation] = Field(description="Sub-navigation for the section")
-    sections: List[ComponentUnion] = Field(description="The ordered list of content sections.")
+# -------------------------------------------------------------------------
+# 3. THE DSPy SIGNATURES (The Logic) live in signatures.py
+# -------------------------------------------------------------------------
 
 # -------------------------------------------------------------------------
-# 3. DEFINE THE DSPy SIGNATURES (The Logic)
+# 4. THE AUTOMATION LOOP
 # -------------------------------------------------------------------------
 
-class ContentAnalyzer(dspy.Signature):
+FACTORY_STAGES = ('fetch', 'extract', 'analyze', 'build', 'validate', 'write')
+
+def schema_version() -> str:
+    return text_version(json.dumps(NewPageStructure.model_json_schema(), sort_keys=True))
+
+def grounding_version(ground: int) -> str:
+    """The section queries and top-k decide which blocks PageBuilder sees."""
+    if not ground:
+        return ""
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'grounding.py'), 'rb') as f:
+        return f"ground:{ground}:{hashlib.sha256(f.read()).hexdigest()[:16]}"
+
+def cascade_version(cascade: str) -> str:
+    """Which model answers each signature is part of the prompt."""
+    if not cascade:
+        return ""
+    fast = {key: FAST_LM_SETTINGS[key] for key in ('model', 'temperature', 'max_tokens')}
+    return "cascade:" + json.dumps([MODEL_ROUTES[cascade], fast], sort_keys=True)
+
+def prompt_version(token_budget: int = 0, map_reduce: bool = False, ground: int = 0,
+                   cascade: str = "") -> str:
+    import dspy
+    from llm_cache import lm_identity, signature_text
+    from signatures import ContentAnalyzer, PageBuilder
+    # The compaction budget and analysis mode shape what the LM sees, so they are part of the prompt
+    compaction = f"compaction:{token_budget}" if token_budget else ""
+    mode = "map-reduce" if map_reduce else ""
+    return text_version(signature_text(ContentAnalyzer) + signature_text(PageBuilder)
+                        + json.dumps(lm_identity(dspy.settings.lm), sort_keys=True) + compaction + mode
+                        + grounding_version(ground) + cascade_version(cascade))
+
+# What prompt_version is computed from, minus dspy itself
+PROMPT_FILES = ('signatures.py', 'page_schema.py', 'llm_cache.py', 'model_cascade.py')
+
+def prompt_fingerprint(identity: Dict, token_budget: int = 0, map_reduce: bool = False, ground: int = 0,
+                       cascade: str = "") -> str:
     """
-    Analyze the provided source websites to extract their "Content DNA".
-    1. EXACT TERMINOLOGY: List the exact names of services, phases, and methodologies used in the source.
-    2. KEY THEMES: List the major consulting themes, methodologies, and service offerings found.
-    3. VOCABULARY: Extract specific industry terms used in French.
+    Cheap stand-in for prompt_version that needs no dspy import: the files the
+    prompts are built from, the dspy version and the LM settings. Each run
+    stores fingerprint -> prompt_version in the manifest for `plan` to look up.
     """
-    sources_context: Attachments = dspy.InputField(description="Raw content from source URLs")
-    exact_terminology: str = dspy.OutputField(description="List of specific terms/headers found in the source")
-    key_themes: str = dspy.OutputField(description="List of major themes to cover")
-
-class PageBuilder(dspy.Signature):
+    digest = hashlib.sha256()
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in PROMPT_FILES:
+        with open(os.path.join(here, name), 'rb') as f:
+            digest.update(f.read())
+    try:
+        dspy_version = package_version('dspy')
+    except PackageNotFoundError:
+        dspy_version = ""
+    digest.update(json.dumps([identity, dspy_version, token_budget, map_reduce], sort_keys=True).encode('utf-8'))
+    digest.update(grounding_version(ground).encode('utf-8'))
+    digest.update(cascade_version(cascade).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+def planned_lm_identity() -> Dict:
+    # Must match llm_cache.lm_identity() of the LM configure_lm() builds
+    return {key: LM_SETTINGS[key] for key in ('model', 'temperature', 'max_tokens')}
+
+def load_context(urls: List[str], token_budget: int, cache: Optional[HTTPCache] = None,
+                 label: str = "", calls: int = 1):
+    """Compacted Markdown for `urls`, or the raw pages as Attachments when token_budget is 0."""
+    if token_budget:
+        # Extracted blocks ranked and cut to the budget, instead of the raw pages
+        compacted = compact_sources(urls, token_budget, cache)
+        if label:
+            compacted.report(label, calls=calls)
+        return compacted.text
+    clean_urls = [f"{u}" for u in urls]
+    if cache is not None:
+        # Served from .http_cache/ (revalidated when stale)
+        clean_urls = cache.local_sources(clean_urls)
+    from attachments.dspy import Attachments
+    return Attachments(*clean_urls)
+
+def split_items(text: str) -> List[str]:
+    """Break an LM list answer (bullets, numbering, or commas) into items."""
+    lines = [line for line in (text or "").splitlines() if line.strip()]
+    if len(lines) == 1:
+        lines = re.split(r'[;,]\s*', lines[0])
+    items = [re.sub(r'^\s*(?:[-*•]|\d+[.)])\s*', '', line).strip() for line in lines]
+    return [item for item in items if item]
+
+def merge_analyses(analyses: List['dspy.Prediction']) -> 'dspy.Prediction':
+    """Reduce step: union of the per-source lists, first wording wins, source order kept."""
+    import dspy
+    merged = {}
+    for name in ('exact_terminology', 'key_themes'):
+        seen, items = set(), []
+        for analysis in analyses:
+            for item in split_items(getattr(analysis, name)):
+                key = normalize_text(item)
+                if key and key not in seen:
+                    seen.add(key)
+                    items.append(item)
+        merged[name] = "\n".join(f"- {item}" for item in items)
+    return dspy.Prediction(**merged)
+
+def analyze_per_source(analyze, urls: List[str], token_budget: int,
+                       cache: Optional[HTTPCache] = None, slug: str = "",
+                       metrics: Optional[RunMetrics] = None) -> 'dspy.Prediction':
     """
-    Act as a Senior Editor at 'Cogesto Consulting'. 
-    Synthesize a new, high-impact page using the provided Terminology and Key Themes.
-    
-    MANDATORY PAGE STRUCTURE (Service Page Blueprint):
-    1. **Hero:** `HeroMultiTemplate` (Title: 'Transformation & Performance', Theme: 'white').
-    2. **Intro:** `BodyCopyImage` (Heading: 'Notre Approche', Position: 'right').
-    3. **Services Overview:** `CardGrid` (Heading: 'Nos Expertises', Items: 4-6 key services).
-    4. **Value Proposition:** `TextOnlySection` (Title: 'Pourquoi nous choisir?', Content: centered).
-    5. **Benefits:** `CardGrid` (Heading: 'Les Bénéfices', Items: 6-8 benefits with icons/short text).
-    6. **Closing:** `BodyCopyImage` (Heading: 'Prêt à transformer?', Position: 'left').
-    7. **CTA:** `TwoColumnContent` (Left: 'Contact', Right: 'Newsletter').
-    
-    INSTRUCTIONS:
-    1. **Source Grounding:** Use the `exact_terminology` for headers and service names.
-    2. **Merge & Expand:** Combine insights from all sources. Do not summarize; expand into rich, detailed copy (600+ words total).
-    3. **Language:** WRITE ONLY IN FRENCH.
+    Map step: one ContentAnalyzer call per source, in parallel. Each call only
+    sees its own source, so the LLM cache serves it again for as long as that
+    page is unchanged, whichever slug it belongs to.
     """
-    sources_context: Attachments = dspy.InputField()
-    exact_terminology: str = dspy.InputField()
-    key_themes: str = dspy.InputField()
-    merged_page: NewPageStructure = dspy.OutputField(description="The structured JSON for the new Astro page")
-
-# -------------------------------------------------------------------------
-# 4. THE AUTOMATION LOOP
-# -------------------------------------------------------------------------
-
-def run_content_factory():
-    # Initialize Predictors
-    analyze = dspy.ChainOfThought(ContentAnalyzer)
-    build = dspy.ChainOfThought(PageBuilder) 
+    def analyze_one(url: str, _) -> 'dspy.Prediction':
+        with timed(metrics, slug, 'extract'):
+            context = load_context([url], token_budget, cache)
+        with timed(metrics, slug, 'analyze'):
+            analysis = analyze(label=slug, sources_context=context)
+        print(f"      -> [{slug}] Analyzed: {url}")
+        return analysis
+
+    unique_urls = list(dict.fromkeys(urls))
+    results = run_concurrently([(url, None) for url in unique_urls], analyze_one,
+                               max_workers=len(unique_urls))
+    failed = [url for url, result in results.items() if isinstance(result, Exception)]
+    if failed:
+        raise RuntimeError(f"analysis failed for {failed}")
+    return merge_analyses([results[url] for url in unique_urls])
+
+def run_content_factory(cache: Optional[HTTPCache] = None, llm_cache: Optional['LLMCache'] = None,
+                        force: bool = False, only: Optional[List[str]] = None,
+                        manifest: Optional[BuildManifest] = None,
+                        concurrency: int = DEFAULT_CONCURRENCY, limiter: Optional[RateLimiter] = None,
+                        token_budget: int = DEFAULT_TOKEN_BUDGET, map_reduce: bool = False,
+                        metrics: Optional[RunMetrics] = None, ground: int = 0,
+                        index: Optional[BlockIndex] = None,
+                        jobs: Optional[JobQueue] = None, run_id: Optional[int] = None,
+                        pages: Optional[Dict[str, List[str]]] = None, output_dir: str = "src/content/pages",
+                        cascade: str = "", models: Optional[Dict[str, 'dspy.LM']] = None):
+    """
+    Build every stale slug. With `jobs`, the run and each slug's step outputs
+    are checkpointed in the job queue; passing the `run_id` of an unfinished
+    run resumes its open jobs (see resume_content_factory). `pages` replaces
+    PAGE_MAPPING (the load test's synthetic slugs). With `cascade` (a
+    MODEL_ROUTES mode), each signature tries its models in order; `models` maps the
+    tier names to LMs (default: 'strong' is the configured LM, 'fast' is
+    built from FAST_LM_SETTINGS).
+    """
+    import dspy
+    from llm_cache import CachedPredictor, lm_identity
+    from model_cascade import ModelCascade, Tier, page_errors
+    from signatures import ContentAnalyzer, PageBuilder
+    if dspy.settings.lm is None:
+        configure_lm()
+    models = dict(models or {})
+    models.setdefault('strong', dspy.settings.lm)
+    if cascade and 'fast' not in models:
+        models['fast'] = build_lm(FAST_LM_SETTINGS)
+
+    # Initialize Predictors: rate-limited + retried against OpenRouter,
+    # memoized on disk so unchanged inputs skip the LM call entirely, and
+    # routed to a model per signature (each tier has its own cache keys)
+    def predictor(signature, check=None) -> ModelCascade:
+        tiers = MODEL_ROUTES[cascade][signature.__name__] if cascade else ('strong',)
+        cached = CachedPredictor(RateLimitedPredictor(dspy.ChainOfThought(signature), limiter),
+                                 signature, llm_cache)
+        return ModelCascade(cached, signature, [Tier(name, models[name]) for name in tiers], check)
+
+    analyze = predictor(ContentAnalyzer)
+    build = predictor(PageBuilder, check=page_errors)
     
     # Ensure output directory exists
-    output_dir = "src/content/pages"
     os.makedirs(output_dir, exist_ok=True)
 
+    manifest = manifest or BuildManifest()
+    schema_v, prompt_v = schema_version(), prompt_version(token_budget, map_reduce, ground, cascade)
+    manifest.remember_prompt(prompt_fingerprint(lm_identity(models['strong']), token_budget, map_reduce, ground,
+                                                cascade), prompt_v)
+    if pages is None:
+        pages = PAGE_MAPPING
+    if only:
+        unknown = [slug for slug in only if slug not in pages]
+        if unknown:
+            print(f"⚠️  Unknown slug(s) ignored: {unknown}")
+        pages = {slug: urls for slug, urls in pages.items() if slug in only}
+
+    if jobs is not None:
+        if run_id is None:
+            options = {'force': force, 'only': only, 'token_budget': token_budget, 'map_reduce': map_reduce,
+                       'ground': ground, 'cascade': cascade, 'schema_version': schema_v, 'prompt_version': prompt_v}
+            run_id = jobs.create_run(options, pages)
+            print(f"🗃️  Run #{run_id} checkpointed in {jobs.path.name} (`python factory.py resume` after a crash)")
+        else:
+            pages = jobs.open_pages(run_id)
+            print(f"🗃️  Resuming run #{run_id}: {len(pages)} open job(s)")
+    failures: Dict[str, str] = {}
+
     print(f"🏭 Starting Content Factory (2-Step Pipeline)...")
-    print(f"📋 Processing {len(PAGE_MAPPING)} pages defined in config.")
+    print(f"📋 Processing {len(pages)} pages defined in config ({concurrency} at a time).")
+    if cascade:
+        print(f"🧭 Model cascade ({cascade}): " + "; ".join(
+            f"{name} {' -> '.join(models[tier].model for tier in tiers)}"
+            for name, tiers in MODEL_ROUTES[cascade].items()))
+    if ground:
+        # PageBuilder sees only the top-k indexed blocks per blueprint section
+        index = index or BlockIndex()
+        index_brand(index)
+        print(f"🔎 Grounding PageBuilder with the top {ground} blocks per section ({index.summary()})")
+
+    def build_slug(slug: str, urls: List[str]) -> str:
+        filename = f"{slug.replace('/', '-')}.json"
+        filepath = os.path.join(output_dir, filename)
+        # Each step resumes from its checkpoint when the job queue has one
+        job = jobs.job(run_id, slug) if jobs is not None else None
+        if job is not None:
+            job.start()
+
+        try:
+            # Skip slugs whose sources, schema and prompt are unchanged
+            fetched = job.get('fetch') if job is not None else None
+            if fetched is None:
+                with timed(metrics, slug, 'fetch'):
+                    sources = source_hashes(urls, cache)
+                if force or only:
+                    reason = "forced"
+                else:
+                    reason = manifest.stale_reason(slug, sources, schema_v, prompt_v, filepath)
+                fetched = {'sources': sources, 'reason': reason}
+                if job is not None:
+                    job.save('fetch', fetched)
+            sources, reason = fetched['sources'], fetched['reason']
+            if reason is None:
+                print(f"\n⏭️  Up to date: '{slug}'")
+                return "skipped"
+        except Exception as e:
+            print(f"\n   ❌ FAILED: {slug} - could not fetch sources: {e}")
+            failures[slug] = f"could not fetch sources: {e}"
+            return "failed"
 
-    for slug, urls in PAGE_MAPPING.items():
-        print(f"\n⚙️  Building: '{slug}'")
+        if job is not None and job.get('write') is not None:
+            print(f"\n✅ Already written in this run: '{slug}'")
+            return "built"
+
+        print(f"\n⚙️  Building: '{slug}' ({reason})")
         print(f"   🔗 Sources: {urls}")
         
         try:
-            # A. SCRAPING
-            clean_urls = [f"{u}" for u in urls]
-            context = Attachments(*clean_urls)
-            
-            # B. ANALYSIS STEP
-            print("   🕵️  Analyzing tone, style, and structure...")
-            analysis = analyze(sources_context=context)
-            print(f"      -> Style Blueprint extracted.")
-            
-            # C. BUILD STEP
-            print("   🏗️  Synthesizing and mapping content...")
-            prediction = build(
-                sources_context=context,
-                exact_terminology=analysis.exact_terminology,
-                key_themes=analysis.key_themes
-            )
-            
-            # D. OUTPUT GENERATION
-            final_data = prediction.merged_page.model_dump()
-            final_data['slug'] = slug
+            context = None
+
+            def source_context():
+                # A. SCRAPING (only when a step that needs it has no checkpoint)
+                nonlocal context
+                if context is None:
+                    with timed(metrics, slug, 'extract'):
+                        context = load_context(urls, token_budget, cache, label=slug, calls=1 if map_reduce else 2)
+                return context
+
+            final_data = job.get('build') if job is not None else None
+            if final_data is None:
+                # B. ANALYSIS STEP
+                saved = job.get('analyze') if job is not None else None
+                if saved is not None:
+                    analysis = dspy.Prediction(**saved)
+                    print(f"      -> [{slug}] Style Blueprint restored from checkpoint.")
+                else:
+                    print(f"   🕵️  [{slug}] Analyzing tone, style, and structure...")
+                    if map_reduce:
+                        # Per-source analyses (memoized by content) merged into one blueprint
+                        analysis = analyze_per_source(analyze, urls, token_budget, cache, slug, metrics)
+                    else:
+                        context = source_context()
+                        with timed(metrics, slug, 'analyze'):
+                            analysis = analyze(label=slug, sources_context=context)
+                    if job is not None:
+                        job.save('analyze', {'exact_terminology': analysis.exact_terminology,
+                                             'key_themes': analysis.key_themes})
+                    print(f"      -> [{slug}] Style Blueprint extracted.")
+
+                grounded = None
+                if ground:
+                    with timed(metrics, slug, 'extract'):
+                        index_sources(index, sources, cache)
+                        grounded = ground_sections(index, urls, slug, ground,
+                                                   key_themes=analysis.key_themes, label=slug)
+
+                # C. BUILD STEP
+                print(f"   🏗️  [{slug}] Synthesizing and mapping content...")
+                with timed(metrics, slug, 'build'):
+                    prediction = build(
+                        label=slug,
+                        sources_context=grounded or source_context(),
+                        exact_terminology=analysis.exact_terminology,
+                        key_themes=analysis.key_themes
+                    )
+
+                # D. OUTPUT GENERATION
+                with timed(metrics, slug, 'validate'):
+                    final_data = prediction.merged_page.model_dump()
+                    final_data['slug'] = slug
+                    # The file must pass the same check as validate_pages.py
+                    errors, _ = validate_page(final_data, strict=True)
+                    if errors:
+                        raise ValueError(f"page JSON failed validation: {'; '.join(errors[:5])}")
+                if job is not None:
+                    job.save('build', final_data)
+            else:
+                print(f"      -> [{slug}] Page JSON restored from checkpoint.")
             
-            filename = f"{slug.replace('/', '-')}.json"
-            filepath = os.path.join(output_dir, filename)
-            
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(final_data, f, indent=2, ensure_ascii=False)
+            with timed(metrics, slug, 'write'):
+                atomic_write_json(filepath, final_data)
+                manifest.record(slug, sources, schema_v, prompt_v, filepath)
+                if job is not None:
+                    job.save('write', manifest.entries[slug]['output'])
                 
             print(f"   ✅ Saved: {filepath}")
+            return "built"
             
         except Exception as e:
             print(f"   ❌ FAILED: {slug} - {str(e)}")
+            failures[slug] = str(e)
+            return "failed"
+
+    def run_slug(slug: str, urls: List[str]) -> str:
+        outcome = build_slug(slug, urls)
+        if jobs is not None:
+            jobs.job(run_id, slug).finish(outcome, failures.get(slug))
+        if metrics is not None:
+            metrics.finish(slug, outcome)
+        return outcome
+
+    results = run_concurrently(pages.items(), run_slug, max_workers=concurrency)
+    if index is not None:
+        index.flush()
+
+    outcomes = list(results.values())
+    print(f"\n📊 {outcomes.count('built')} built, {outcomes.count('skipped')} unchanged, "
+          f"{len(outcomes) - outcomes.count('built') - outcomes.count('skipped')} failed.")
+    if outcomes.count('skipped'):
+        print("⏭️  Unchanged pages were skipped (use --force to rebuild).")
+    escalations = analyze.escalations + build.escalations
+    if escalations:
+        print(f"⤴️  {escalations} LM call(s) escalated to a stronger model.")
+    if limiter is not None and limiter.waited:
+        print(f"🚦 Rate limiter held requests for {limiter.waited:.1f}s in total.")
+    if cache is not None:
+        cache.flush()
+        print(f"\n🗄️  {cache.summary()}")
+    if llm_cache is not None:
+        print(f"🧠 {llm_cache.summary()}")
+    if index is not None:
+        print(f"🔎 {index.summary()}")
+    if jobs is not None:
+        status = jobs.finish_run(run_id)
+        print(f"🗃️  Run #{run_id} {status}" + (" (`python factory.py resume` retries the failed jobs)"
+                                                if status != 'finished' else ""))
+    if metrics is not None and metrics.live:
+        metrics.print_table()
+
+def resume_content_factory(jobs: JobQueue, run_id: Optional[int] = None, **kwargs):
+    """
+    Finish an interrupted run with the options it was started with: every
+    open job starts at its first step without a checkpoint.
+    """
+    run = jobs.run(run_id) if run_id is not None else jobs.latest_run(unfinished=True)
+    if run is None or run['status'] == 'finished':
+        print("🗃️  Nothing to resume" + (f": run #{run_id} is finished." if run else "."))
+        return
+    options = run['options']
+    if options.get('schema_version') != schema_version():
+        print(f"❌ The page schema changed since run #{run['id']} started; start a new build instead.")
+        return
+    import dspy
+    if dspy.settings.lm is None:
+        configure_lm()
+    cascade = options.get('cascade') or ""
+    if options.get('prompt_version') != prompt_version(options['token_budget'], options['map_reduce'],
+                                                       options['ground'], cascade):
+        print(f"❌ Prompts or model changed since run #{run['id']} started; start a new build instead.")
+        return
+    run_content_factory(force=options['force'], only=options['only'], token_budget=options['token_budget'],
+                        map_reduce=options['map_reduce'], ground=options['ground'], cascade=cascade,
+                        jobs=jobs, run_id=run['id'], **kwargs)
+
+def plan_content_factory(cache: Optional[HTTPCache] = None, force: bool = False,
+                         only: Optional[List[str]] = None, manifest: Optional[BuildManifest] = None,
+                         token_budget: int = DEFAULT_TOKEN_BUDGET, map_reduce: bool = False,
+                         check_prompt: bool = False, verbose: bool = False, ground: int = 0,
+                         cascade: str = ""):
+    """What run_content_factory would rebuild, from disk only: no network, no LM, no dspy."""
+    manifest = manifest or BuildManifest()
+    pages = PAGE_MAPPING
+    if only:
+        unknown = [slug for slug in only if slug not in PAGE_MAPPING]
+        if unknown:
+            print(f"⚠️  Unknown slug(s) ignored: {unknown}")
+        pages = {slug: urls for slug, urls in PAGE_MAPPING.items() if slug in only}
+    if check_prompt:
+        # Exact, but loads dspy (seconds)
+        configure_lm()
+        prompt_v = prompt_version(token_budget, map_reduce, ground, cascade)
+    else:
+        fingerprint = prompt_fingerprint(planned_lm_identity(), token_budget, map_reduce, ground, cascade)
+        prompt_v = manifest.prompts.get(fingerprint)
+    plans = plan_slugs(pages, manifest, cache, "src/content/pages", schema_version(), prompt_v,
+                       token_budget=token_budget, map_reduce=bool(map_reduce), force=force or bool(only),
+                       build_cap=max_grounded_tokens(ground) if ground else None)
+    print_plan(plans, verbose=verbose)
+    if prompt_v is None and any(plan.status == 'unknown' for plan in plans):
+        print("❔ Prompt inputs changed since the last build (or none recorded); use --check-prompt to compare exactly.")
+    return plans
+
+def build_parser(resume: bool = False) -> argparse.ArgumentParser:
+    """`build` options; `resume` takes the content options from the run it resumes."""
+    if resume:
+        parser = argparse.ArgumentParser(prog="factory.py resume",
+                                         description="Finish an interrupted build run from its checkpoints")
+        parser.add_argument('--run', type=int, default=None, metavar='ID', help="Run to resume (default: the latest unfinished one)")
+    else:
+        parser = argparse.ArgumentParser(description="Generate page JSON from the sources in migration_map.py",
+                                         epilog="Commands: build (default), plan, resume, status. "
+                                                "`python factory.py plan --help` for the dry run.")
+    parser.add_argument('--no-cache', action='store_true', help="Let Attachments download sources directly")
+    parser.add_argument('--offline', action='store_true', help="Use cached sources only, never the network")
+    parser.add_argument('--no-llm-cache', action='store_true', help="Ignore memoized LM results (fresh results are still stored)")
+    if not resume:
+        parser.add_argument('--force', action='store_true', help="Rebuild every slug, even when its inputs are unchanged")
+        parser.add_argument('--only', nargs='+', metavar='SLUG', help="Rebuild only these slugs (always rebuilt)")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help="Slugs processed at the same time")
+    parser.add_argument('--rpm', type=float, default=DEFAULT_RPM, help="Max LM requests per minute")
+    parser.add_argument('--tpm', type=float, default=DEFAULT_TPM, help="Max estimated LM tokens per minute")
+    parser.add_argument('--adaptive', action='store_true',
+                        help="Adapt each source host's fetch concurrency (AIMD), backing off on 429/503 and slow responses")
+    parser.add_argument('--max-per-host', type=int, default=DEFAULT_MAX_LIMIT, help="Ceiling of the adaptive per-host concurrency")
+    if not resume:
+        parser.add_argument('--token-budget', type=int, default=DEFAULT_TOKEN_BUDGET,
+                            help="Estimated tokens of compacted source content per slug (0 = send raw pages)")
+        parser.add_argument('--map-reduce', action='store_true',
+                            help="Analyze each source separately (memoized per page) and merge the results")
+        parser.add_argument('--ground', type=int, default=0, metavar='K',
+                            help="Give PageBuilder only the top-K indexed blocks per blueprint section (BM25), plus brand passages")
+        parser.add_argument('--cascade', nargs='?', const='analyze', default="", choices=sorted(MODEL_ROUTES),
+                            help=f"Route signatures to models (MODEL_ROUTES): `analyze` (default) runs ContentAnalyzer on "
+                                 f"{FAST_LM_SETTINGS['model']} and PageBuilder on {LM_SETTINGS['model']}; `all` tries pages "
+                                 "on the fast model too. Output that does not parse or fails validation escalates")
+        parser.add_argument('--no-checkpoint', action='store_true', help="Do not record the run in the job queue")
+    parser.add_argument('--report', default=None, metavar='FILE', help="Save per-slug stage timings, tokens and retries as a JSON run report")
+    parser.add_argument('--live', action='store_true', help="Print a metrics row per slug as it completes, then a summary table")
+    parser.add_argument('--record-cassette', default=None, metavar='FILE',
+                        help="Append every LM completion to FILE, for replay by benchmarks/bench_factory.py")
+    return parser
+
+def build_plan_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="factory.py plan",
+                                     description="List stale slugs, their sources and estimated token cost, without network or LM calls")
+    parser.add_argument('--force', action='store_true', help="Plan as if every slug were rebuilt")
+    parser.add_argument('--only', nargs='+', metavar='SLUG', help="Plan only these slugs (always rebuilt)")
+    parser.add_argument('--token-budget', type=int, default=DEFAULT_TOKEN_BUDGET,
+                        help="Estimated tokens of compacted source content per slug (0 = send raw pages)")
+    parser.add_argument('--map-reduce', action='store_true', help="Plan the per-source analysis mode")
+    parser.add_argument('--ground', type=int, default=0, metavar='K', help="Plan the grounded build mode (top-K blocks per section)")
+    parser.add_argument('--cascade', nargs='?', const='analyze', default="", choices=sorted(MODEL_ROUTES),
+                        help="Plan the model cascade mode")
+    parser.add_argument('--check-prompt', action='store_true', help="Compute the exact prompt version (loads dspy)")
+    parser.add_argument('--verbose', action='store_true', help="Also list up-to-date slugs")
+    return parser
 
 if __name__ == "__main__":
-    run_content_factory()
\ No newline at end of file
+    argv = sys.argv[1:]
+    command = argv.pop(0) if argv and argv[0] in ('build', 'plan', 'resume', 'status') else 'build'
+
+    if command == 'plan':
+        args = build_plan_parser().parse_args(argv)
+        plan_content_factory(cache=HTTPCache(offline=True), force=args.force, only=args.only,
+                             token_budget=args.token_budget, map_reduce=args.map_reduce,
+                             check_prompt=args.check_prompt, verbose=args.verbose, ground=args.ground,
+                             cascade=args.cascade)
+        sys.exit(0)
+
+    if command == 'status':
+        parser = argparse.ArgumentParser(prog="factory.py status", description="Show the jobs of a build run")
+        parser.add_argument('--run', type=int, default=None, metavar='ID', help="Run to show (default: the latest)")
+        args = parser.parse_args(argv)
+        if not DEFAULT_JOBS_DB.exists():
+            print(f"🗃️  No factory run recorded yet ({DEFAULT_JOBS_DB.name} does not exist)")
+            sys.exit(0)
+        print_status(JobQueue(), args.run)
+        sys.exit(0)
+
+    args = build_parser(resume=command == 'resume').parse_args(argv)
+    from llm_cache import LLMCache
+    if args.record_cassette:
+        from stand_in_lm import record_cassette
+        record_cassette(args.record_cassette)
+    metrics = RunMetrics('content_factory', live=args.live, stages=FACTORY_STAGES) if args.report or args.live else None
+    # Source fetches (hashes, compaction, indexing) go through the cache's session
+    hosts = HostLimiter(max_limit=args.max_per_host) if args.adaptive and not args.no_cache else None
+    if hosts is not None and metrics is not None:
+        metrics.track_hosts(hosts.snapshot)
+    common = dict(cache=None if args.no_cache else
+                  HTTPCache(offline=args.offline, session=build_session(args.concurrency, limiter=hosts) if hosts else None),
+                  llm_cache=LLMCache(bypass=args.no_llm_cache),
+                  concurrency=args.concurrency, limiter=RateLimiter(args.rpm, args.tpm), metrics=metrics)
+
+    if command == 'resume':
+        resume_content_factory(JobQueue(), args.run, **common)
+    else:
+        run_content_factory(force=args.force, only=args.only,
+                            token_budget=args.token_budget, map_reduce=args.map_reduce, ground=args.ground,
+                            cascade=args.cascade, jobs=None if args.no_checkpoint else JobQueue(), **common)
+    if hosts is not None and not args.live:  # The live table ends with the host limits
+        hosts.print_summary()
+    if args.report:
+        metrics.write_report(args.report)
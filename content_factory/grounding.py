@@ -0,0 +1,115 @@
+"""
+Section-level retrieval for the PageBuilder prompt (`--ground K`).
+
+Instead of every source block, PageBuilder gets, for each section of the
+Service Page Blueprint (see signatures.PageBuilder), the K blocks of the
+slug's sources that best match that section (BM25, block_index.py), plus a
+few passages of the Cogesto brand corpus. A block is used for one section
+only.
+
+The index lives in `.block_index/` and grows across runs: a source is
+(re)indexed only when its page body changed, the brand corpus only when
+get_cogesto_context.py changed a page.
+"""
+
+from dataclasses import dataclass, fields
+from typing import List, Optional, Set
+
+from block_index import BlockIndex, SearchHit, add_corpus
+from source_compaction import MAX_BLOCK_TOKENS, load_source, render_block, text_tokens
+from webpage_to_markdown import ContentBlock
+
+# --- Configuration ---
+BRAND_PASSAGES = 3   # Brand corpus passages added to every grounded prompt
+BLOCK_FIELDS = {f.name for f in fields(ContentBlock)}
+
+
+@dataclass(frozen=True)
+class BlueprintSection:
+    number: int
+    name: str
+    component: str
+    query: str  # French terms the section's source material is searched with
+
+
+# Mirrors the MANDATORY PAGE STRUCTURE of signatures.PageBuilder; the CTA is
+# fixed copy (contact + newsletter) and needs no source material
+BLUEPRINT_SECTIONS = (
+    BlueprintSection(1, "Hero", "HeroMultiTemplate", "transformation performance mission enjeux"),
+    BlueprintSection(2, "Intro - Notre Approche", "BodyCopyImage", "approche méthode démarche accompagnement"),
+    BlueprintSection(3, "Services Overview - Nos Expertises", "CardGrid", "services expertises offre conseil leviers"),
+    BlueprintSection(4, "Value Proposition - Pourquoi nous choisir?", "TextOnlySection",
+                     "pourquoi choisir expérience valeur différence"),
+    BlueprintSection(5, "Benefits - Les Bénéfices", "CardGrid", "bénéfices résultats gains impact avantages"),
+    BlueprintSection(6, "Closing - Prêt à transformer?", "BodyCopyImage", "transformer changement durable ambition"),
+)
+
+
+def max_grounded_tokens(k: int) -> int:
+    """Upper bound of a grounded prompt's source material (for plan estimates)."""
+    return (len(BLUEPRINT_SECTIONS) * k + BRAND_PASSAGES) * MAX_BLOCK_TOKENS
+
+
+def index_sources(index: BlockIndex, sources: dict, cache=None) -> int:
+    """Index the blocks of each url -> body hash not indexed at that version yet; returns pages indexed."""
+    indexed = 0
+    for url, digest in sources.items():
+        version = digest[:16]
+        if index.has(url, version):
+            continue
+        _, blocks = load_source(url, cache)
+        # Indexed even when empty, so an unchanged page is not fetched again
+        indexed += index.add_blocks(url, [block.to_dict() for block in blocks], version=version)
+    return indexed
+
+
+def index_brand(index: BlockIndex, store_dir=None) -> int:
+    try:
+        return add_corpus(index, store_dir)
+    except FileNotFoundError:
+        print("⚠️  No Cogesto corpus store (run get_cogesto_context.py); grounding without brand context.")
+        return 0
+
+
+def render_hit(hit: SearchHit) -> str:
+    if hit.doc['kind'] == 'brand':
+        heading = f"## {hit.doc['heading']}\n" if hit.doc.get('heading') else ""
+        return f"{heading}{hit.doc['text']}"
+    # Blocks indexed from --dedupe output also carry source_urls / duplicate_count
+    block = {name: value for name, value in hit.doc['block'].items() if name in BLOCK_FIELDS}
+    return f"{render_block(ContentBlock(**block))}\n_(Source: {hit.source_url})_"
+
+
+def slug_terms(slug: str) -> str:
+    return slug.replace('/', ' ').replace('-', ' ')
+
+
+def ground_sections(index: BlockIndex, urls: List[str], slug: str, k: int,
+                    key_themes: str = "", label: str = "") -> Optional[str]:
+    """
+    Markdown source material for PageBuilder: top-k blocks per blueprint
+    section, then brand passages. None when no block matched any section.
+    """
+    sources: Set[str] = set(urls)
+    used: Set[int] = set()
+    parts, kept = [], 0
+    for section in BLUEPRINT_SECTIONS:
+        hits = index.search(f"{section.query} {slug_terms(slug)}", k=k, kind='block',
+                            sources=sources, exclude=used)
+        used.update(hit.doc_id for hit in hits)
+        kept += len(hits)
+        body = "\n\n".join(render_hit(hit) for hit in hits) or "_(No matching source material.)_"
+        parts.append(f"# Section {section.number}: {section.name} ({section.component})\n\n{body}")
+
+    brand = index.search(f"{slug_terms(slug)} {key_themes}", k=BRAND_PASSAGES, kind='brand')
+    if brand:
+        parts.append("# Contexte Cogesto (voix de la marque)\n\n" + "\n\n".join(render_hit(hit) for hit in brand))
+
+    prefix = f"[{label}] " if label else ""
+    if not kept:
+        print(f"   ⚠️  {prefix}No indexed block matched the blueprint sections; keeping the full context.")
+        return None
+    text = "\n\n---\n\n".join(parts)
+    print(f"   🔎 {prefix}Grounded {kept} blocks over {len(BLUEPRINT_SECTIONS)} sections "
+          f"+ {len(brand)} brand passages: ~{text_tokens(text):,} tokens")
+    return text
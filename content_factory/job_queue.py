@@ -0,0 +1,194 @@
+"""
+Durable job queue for `run_content_factory` (`factory.py resume` / `status`).
+
+Every build run is recorded in `factory_jobs.sqlite` (next to this file),
+one job per slug, each made of four checkpointed steps:
+    fetch     source hashes, and why the slug is stale (or that it is not)
+    analyze   the merged Style Blueprint (exact_terminology, key_themes)
+    build     the page JSON from PageBuilder, once it passed validation
+    write     path and hash of the written file
+
+A step's output is committed as soon as the step finishes, so a run that
+dies (network drop, killed terminal) loses at most the step in flight.
+`python factory.py resume` reopens the latest unfinished run with the
+options it was started with, and starts every job that is not done at its
+first step without a checkpoint: finished LM steps are never repeated.
+`python factory.py status` shows where each job stands.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# --- Configuration ---
+DEFAULT_JOBS_DB = Path(__file__).resolve().parent / "factory_jobs.sqlite"
+STEPS = ('fetch', 'analyze', 'build', 'write')
+OPEN_STATUSES = ('pending', 'running', 'failed')  # Jobs `resume` picks up
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at  REAL NOT NULL,
+    finished_at REAL,
+    options     TEXT NOT NULL,
+    status      TEXT NOT NULL DEFAULT 'running'   -- running, incomplete, finished
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    run_id      INTEGER NOT NULL REFERENCES runs(id),
+    slug        TEXT NOT NULL,
+    urls        TEXT NOT NULL,
+    status      TEXT NOT NULL DEFAULT 'pending',  -- pending, running, built, skipped, failed
+    error       TEXT,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    updated_at  REAL NOT NULL,
+    PRIMARY KEY (run_id, slug)
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    run_id      INTEGER NOT NULL,
+    slug        TEXT NOT NULL,
+    step        TEXT NOT NULL,
+    output      TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    PRIMARY KEY (run_id, slug, step)
+);
+"""
+
+
+class JobQueue:
+    """One SQLite connection shared by the slug threads; every write is committed at once."""
+
+    def __init__(self, path=DEFAULT_JOBS_DB):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def _execute(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    # --- Runs ------------------------------------------------------------
+
+    def create_run(self, options: Dict[str, Any], pages: Dict[str, List[str]]) -> int:
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute("BEGIN")
+            run_id = self._db.execute("INSERT INTO runs (started_at, options) VALUES (?, ?)",
+                                      (now, json.dumps(options))).lastrowid
+            self._db.executemany("INSERT INTO jobs (run_id, slug, urls, updated_at) VALUES (?, ?, ?, ?)",
+                                 [(run_id, slug, json.dumps(urls), now) for slug, urls in pages.items()])
+        return run_id
+
+    def run(self, run_id: int) -> Optional[Dict[str, Any]]:
+        rows = self._execute("SELECT * FROM runs WHERE id = ?", (run_id,))
+        if not rows:
+            return None
+        run = dict(rows[0])
+        run['options'] = json.loads(run['options'])
+        return run
+
+    def latest_run(self, unfinished: bool = False) -> Optional[Dict[str, Any]]:
+        where = "WHERE status != 'finished'" if unfinished else ""
+        rows = self._execute(f"SELECT id FROM runs {where} ORDER BY id DESC LIMIT 1")
+        return self.run(rows[0]['id']) if rows else None
+
+    def finish_run(self, run_id: int) -> str:
+        """Mark the run finished if every job is built or skipped; returns the new status."""
+        open_jobs = self._execute(
+            f"SELECT COUNT(*) AS n FROM jobs WHERE run_id = ? AND status IN ({','.join('?' * len(OPEN_STATUSES))})",
+            (run_id, *OPEN_STATUSES))[0]['n']
+        status = 'incomplete' if open_jobs else 'finished'
+        self._execute("UPDATE runs SET status = ?, finished_at = ? WHERE id = ?", (status, time.time(), run_id))
+        return status
+
+    # --- Jobs ------------------------------------------------------------
+
+    def jobs(self, run_id: int) -> List[Dict[str, Any]]:
+        """Every job of a run, with the steps it has checkpoints for."""
+        steps: Dict[str, List[str]] = {}
+        for row in self._execute("SELECT slug, step FROM checkpoints WHERE run_id = ?", (run_id,)):
+            steps.setdefault(row['slug'], []).append(row['step'])
+        jobs = []
+        for row in self._execute("SELECT * FROM jobs WHERE run_id = ? ORDER BY rowid", (run_id,)):
+            job = dict(row)
+            job['urls'] = json.loads(job['urls'])
+            job['steps'] = [step for step in STEPS if step in steps.get(job['slug'], [])]
+            jobs.append(job)
+        return jobs
+
+    def open_pages(self, run_id: int) -> Dict[str, List[str]]:
+        """slug -> urls of the jobs `resume` still has to run."""
+        return {job['slug']: job['urls'] for job in self.jobs(run_id) if job['status'] in OPEN_STATUSES}
+
+    def job(self, run_id: int, slug: str) -> 'SlugJob':
+        return SlugJob(self, run_id, slug)
+
+    def set_status(self, run_id: int, slug: str, status: str, error: Optional[str] = None):
+        attempts = ", attempts = attempts + 1" if status == 'running' else ""
+        self._execute(f"UPDATE jobs SET status = ?, error = ?, updated_at = ?{attempts} WHERE run_id = ? AND slug = ?",
+                      (status, error, time.time(), run_id, slug))
+
+    def checkpoint(self, run_id: int, slug: str, step: str) -> Optional[Any]:
+        rows = self._execute("SELECT output FROM checkpoints WHERE run_id = ? AND slug = ? AND step = ?",
+                             (run_id, slug, step))
+        return json.loads(rows[0]['output']) if rows else None
+
+    def save_checkpoint(self, run_id: int, slug: str, step: str, output: Any):
+        self._execute("INSERT OR REPLACE INTO checkpoints (run_id, slug, step, output, created_at) VALUES (?, ?, ?, ?, ?)",
+                      (run_id, slug, step, json.dumps(output, ensure_ascii=False), time.time()))
+
+
+class SlugJob:
+    """The checkpoints of one slug in one run."""
+
+    def __init__(self, queue: JobQueue, run_id: int, slug: str):
+        self.queue, self.run_id, self.slug = queue, run_id, slug
+
+    def start(self):
+        self.queue.set_status(self.run_id, self.slug, 'running')
+
+    def finish(self, outcome: str, error: Optional[str] = None):
+        self.queue.set_status(self.run_id, self.slug, outcome, error)
+
+    def get(self, step: str) -> Optional[Any]:
+        return self.queue.checkpoint(self.run_id, self.slug, step)
+
+    def save(self, step: str, output: Any):
+        self.queue.save_checkpoint(self.run_id, self.slug, step, output)
+
+
+STATUS_ICONS = {'pending': '⏸️ ', 'running': '⏳', 'built': '✅', 'skipped': '⏭️ ', 'failed': '❌'}
+
+
+def print_status(queue: JobQueue, run_id: Optional[int] = None):
+    run = queue.run(run_id) if run_id is not None else queue.latest_run()
+    if run is None:
+        print(f"🗃️  No factory run recorded{f' with id {run_id}' if run_id is not None else ''} in {queue.path}")
+        return None
+    started = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(run['started_at']))
+    options = ", ".join(f"{key}={value}" for key, value in run['options'].items()
+                        if value and not key.endswith('_version'))
+    print(f"🗃️  Run #{run['id']} ({run['status']}), started {started}{f' [{options}]' if options else ''}")
+    jobs = queue.jobs(run['id'])
+    width = max((len(job['slug']) for job in jobs), default=0)
+    for job in jobs:
+        steps = " ".join(f"{'●' if step in job['steps'] else '○'} {step}" for step in STEPS)
+        attempts = f"  ({job['attempts']} attempts)" if job['attempts'] > 1 else ""
+        print(f"   {STATUS_ICONS.get(job['status'], '?')} {job['slug']:<{width}}  {steps}{attempts}")
+        if job['error']:
+            first_line = next((line for line in job['error'].splitlines() if line.strip()), "")
+            print(f"         {first_line[:200]}")
+    counts = {status: sum(1 for job in jobs if job['status'] == status) for status in STATUS_ICONS}
+    print(f"\n📊 {len(jobs)} jobs: " + ", ".join(f"{n} {status}" for status, n in counts.items() if n))
+    if run['status'] != 'finished':
+        print(f"▶️  `python factory.py resume{'' if run_id is None else f' --run {run_id}'}` continues the open jobs.")
+    return run
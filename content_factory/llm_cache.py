@@ -0,0 +1,227 @@
+"""
+Persistent memo cache for the content_factory DSPy predictors.
+
+`CachedPredictor` wraps a `dspy.ChainOfThought` / `dspy.Predict` module. A
+call is looked up by a key made of:
+    - the LM model name, temperature and max tokens,
+    - the signature text: instructions, field descriptions and, for
+      pydantic outputs such as `NewPageStructure`, their JSON schema,
+    - a hash of every input value, with `Attachments` hashed by their
+      extracted text and images.
+Any change to the model, the prompt, the output schema or the sources
+therefore misses; an unchanged re-run is served from disk.
+
+Entries live in `content_factory/.llm_cache/<ab>/<key>.json`. Hits refresh the
+file's mtime and, once the running total passes `max_bytes`, the least
+recently used files are evicted. Every write goes through its own temp file,
+so slugs storing the same key at the same time do not collide.
+`bypass=True` skips lookups but still stores fresh results (to force a
+regeneration).
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import dspy
+from pydantic import BaseModel
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent / ".llm_cache"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+CACHE_FORMAT = 1  # Bump to invalidate every entry after a storage change
+
+
+def _hash(data: str) -> str:
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def fingerprint_value(value: Any) -> str:
+    """Stable hash of a predictor input."""
+    if hasattr(value, 'text') and hasattr(value, 'images'):
+        # attachments.dspy.Attachments: what the LM actually sees
+        images = [img if isinstance(img, str) else repr(img) for img in (value.images or [])]
+        return _hash(json.dumps({'text': value.text, 'images': images}, ensure_ascii=False))
+    if isinstance(value, BaseModel):
+        return _hash(value.model_dump_json(by_alias=True))
+    return _hash(json.dumps(value, ensure_ascii=False, sort_keys=True, default=str))
+
+
+def signature_text(signature) -> str:
+    """Everything about a signature that shapes the prompt or the parsed output."""
+    fields = {}
+    for name, field in signature.fields.items():
+        annotation = field.annotation
+        spec = {'annotation': getattr(annotation, '__name__', str(annotation)),
+                'extra': field.json_schema_extra}
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            spec['schema'] = annotation.model_json_schema()
+        fields[name] = spec
+    return json.dumps({'instructions': signature.instructions, 'fields': fields},
+                      ensure_ascii=False, sort_keys=True, default=str)
+
+
+def lm_identity(lm) -> Dict[str, Any]:
+    kwargs = getattr(lm, 'kwargs', {}) or {}
+    return {
+        'model': getattr(lm, 'model', str(lm)),
+        'temperature': kwargs.get('temperature'),
+        'max_tokens': kwargs.get('max_tokens', kwargs.get('max_completion_tokens')),
+    }
+
+
+class LLMCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+                 bypass: bool = False):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.bypass = bypass
+        self.stats = {'hits': 0, 'misses': 0, 'stored': 0, 'evicted': 0}
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None  # Scanned on the first store, then kept up to date
+
+    def count(self, stat: str, amount: int = 1):
+        with self._lock:
+            self.stats[stat] += amount
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def make_key(self, predictor_name: str, signature, lm, inputs: Dict[str, Any]) -> str:
+        payload = {
+            'format': CACHE_FORMAT,
+            'predictor': predictor_name,
+            'lm': lm_identity(lm),
+            'signature': _hash(signature_text(signature)),
+            'inputs': {name: fingerprint_value(value) for name, value in sorted(inputs.items())},
+        }
+        return _hash(json.dumps(payload, sort_keys=True, default=str))
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        if self.bypass:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        try:
+            os.utime(path)  # LRU: mtime is the last access
+        except FileNotFoundError:
+            pass  # Evicted meanwhile; the entry read is still good
+        return entry
+
+    def store(self, key: str, entry: Dict[str, Any]):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps(entry, ensure_ascii=False).encode('utf-8')
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        with self._lock:
+            self.stats['stored'] += 1
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_total()
+            else:
+                self._total_bytes += len(data)  # Overcounts a replaced entry; the next eviction rescans
+            over = self._total_bytes > self.max_bytes
+        if over:
+            self.evict()
+
+    def _files(self):
+        """(mtime, size, path) of every entry, skipping files removed while scanning."""
+        files = []
+        for path in self.cache_dir.glob('*/*.json'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def _scan_total(self) -> int:
+        return sum(size for _, size, _ in self._files())
+
+    def evict(self):
+        files = self._files()
+        total = sum(size for _, size, _ in files)
+        evicted = 0
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            evicted += 1
+        with self._lock:
+            self.stats['evicted'] += evicted
+            self._total_bytes = total
+
+    def summary(self) -> str:
+        s = self.stats
+        calls = s['hits'] + s['misses']
+        rate = f" ({100 * s['hits'] / calls:.0f}% hit rate)" if calls else ""
+        return f"LLM cache: {s['hits']} hits, {s['misses']} misses{rate}, {s['evicted']} evicted"
+
+
+class CachedPredictor:
+    """Drop-in wrapper: `CachedPredictor(dspy.ChainOfThought(Sig), Sig, cache)(**inputs)`."""
+
+    def __init__(self, predictor, signature, cache: Optional[LLMCache], name: Optional[str] = None):
+        self.predictor = predictor
+        self.signature = signature
+        self.cache = cache
+        # Look through wrappers (e.g. RateLimitedPredictor) so they don't change the key
+        inner = getattr(predictor, 'wrapped', predictor)
+        self.name = name or f"{type(inner).__name__}({signature.__name__})"
+
+    def __call__(self, **inputs) -> dspy.Prediction:
+        if self.cache is None:
+            return self.predictor(**inputs)
+
+        lm = dspy.settings.lm
+        key = self.cache.make_key(self.name, self.signature, lm, inputs)
+        entry = self.cache.load(key)
+        if entry is not None:
+            self.cache.count('hits')
+            return self._restore(entry['outputs'])
+
+        self.cache.count('misses')
+        prediction = self.predictor(**inputs)
+        self.cache.store(key, {
+            'predictor': self.name,
+            'lm': lm_identity(lm),
+            'created_at': time.time(),
+            'outputs': self._serialize(prediction),
+        })
+        return prediction
+
+    def _serialize(self, prediction: dspy.Prediction) -> Dict[str, Any]:
+        outputs = {}
+        for name in prediction.keys():
+            value = prediction[name]
+            if isinstance(value, BaseModel):
+                # by_alias: models such as AccordionItem only validate from their aliases
+                value = value.model_dump(mode='json', by_alias=True)
+            outputs[name] = value
+        return outputs
+
+    def _restore(self, outputs: Dict[str, Any]) -> dspy.Prediction:
+        values = {}
+        for name, value in outputs.items():
+            field = self.signature.fields.get(name)
+            annotation = field.annotation if field is not None else None
+            if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+                value = annotation.model_validate(value)
+            values[name] = value
+        return dspy.Prediction(**values)
@@ -1,17 +1,30 @@
+import argparse
 import json
 import os
-import dspy
-from typing import Literal, List, Optional, Union
-from pydantic import BaseModel, Field
-from attachments.dspy import Attachments
+import sys
+from typing import List, Optional
+# dspy, Attachments, pydantic and llm_cache are imported by run_factory:
+# loading them takes seconds, and --dry-run never does
+# The page models and ContentMerger live in migration_signatures.py
+
+# Shared scraping helpers live at the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from http_cache import HTTPCache
+from run_metrics import RunMetrics, timed
+from scheduler import (DEFAULT_CONCURRENCY, DEFAULT_RPM, DEFAULT_TPM, RateLimitedPredictor,
+                       RateLimiter, run_concurrently)
 
 # -------------------------------------------------------------------------
 # CONFIGURATION
 # -------------------------------------------------------------------------
 
-# Configure OpenAI (GPT-4o is required for high-quality merging and vision)
-lm = dspy.OpenAI(model='gpt-4o', max_tokens=4000)
-dspy.settings.configure(lm=lm)
+def configure_lm():
+    """Build the LM on first use rather than at import (no API key needed until then)."""
+    import dspy
+    # Configure OpenAI (GPT-4o is required for high-quality merging and vision)
+    lm = dspy.OpenAI(model='gpt-4o', max_tokens=4000)
+    dspy.settings.configure(lm=lm, track_usage=True)  # Token usage feeds the run report
+    return lm
 
 # MAPPING: "New_Page_Slug": ["Source_URL_1", "Source_URL_2"]
 # This tells the factory which source pages combine to make a new page.
@@ -28,88 +41,23 @@ PAGE_MAPPING = {
     # Add more pages here...
 }
 
-# -------------------------------------------------------------------------
-# ASTRO COMPONENT PROTOCOL (Pydantic Models)
-# -------------------------------------------------------------------------
-# These models MIRROR the props available in the Astro project.
-
-class HeroMultiTemplate(BaseModel):
-    component: Literal["HeroMultiTemplate"] = "HeroMultiTemplate"
-    title: str = Field(desc="Main hero headline")
-    subtitle: Optional[str] = Field(desc="Subheadline or intro text")
-    theme: Literal["blue", "white", "transparent"] = Field(default="blue")
-    backgroundImage: Optional[str] = Field(desc="URL of background image if present")
-
-class BodyCopyImage(BaseModel):
-    component: Literal["BodyCopyImage"] = "BodyCopyImage"
-    heading: str = Field(desc="Section title")
-    text_content: str = Field(desc="Body paragraph text. Markdown allowed.")
-    imageSrc: Optional[str] = Field(desc="URL of the image")
-    imagePosition: Literal["left", "right"] = Field(default="left")
-
-class TextOnlySection(BaseModel):
-    component: Literal["TextOnlySection"] = "TextOnlySection"
-    title: Optional[str]
-    content: str = Field(desc="The text content")
-    alignment: Literal["center", "left"] = "left"
-
-class CardItem(BaseModel):
-    title: str
-    description: str
-    icon_or_image: Optional[str]
-    link: Optional[str]
-
-class CardGrid(BaseModel):
-    """Maps to 'Card' or 'AdvantageItem' components in a grid layout"""
-    component: Literal["CardGrid"] = "CardGrid"
-    heading: Optional[str]
-    items: List[CardItem]
-
-class AccordionItem(BaseModel):
-    trigger: str
-    content: str
-
-class Accordion(BaseModel):
-    component: Literal["Accordion"] = "Accordion"
-    items: List[AccordionItem]
-
-# The Union of allowed components
-ComponentUnion = Union[
-    HeroMultiTemplate, 
-    BodyCopyImage, 
-    CardGrid, 
-    TextOnlySection, 
-    Accordion
-]
-
-class PageStructure(BaseModel):
-    title: str = Field(desc="SEO Title for the new page")
-    description: str = Field(desc="SEO Meta description")
-    sections: List[ComponentUnion] = Field(desc="Ordered list of page components")
-
-# -------------------------------------------------------------------------
-# DSPY LOGIC
-# -------------------------------------------------------------------------
-
-class ContentMerger(dspy.Signature):
-    """
-    Act as a Content Architect.
-    1. Analyze the text and visual structure from the provided `sources_context`.
-    2. Synthesize content from all sources into a single, cohesive narrative.
-    3. Structure the output into the defined Astro Components.
-    4. Ensure tone is professional and 'Cogesto' style.
-    """
-    sources_context: Attachments = dspy.InputField(desc="Scraped content from source URLs")
-    mapped_page: PageStructure = dspy.OutputField(desc="Structured JSON for Astro")
-
-def run_factory():
-    predictor = dspy.TypedPredictor(ContentMerger)
+def run_factory(cache: Optional[HTTPCache] = None, llm_cache: Optional['LLMCache'] = None,
+                concurrency: int = DEFAULT_CONCURRENCY, limiter: Optional[RateLimiter] = None,
+                metrics: Optional[RunMetrics] = None):
+    import dspy
+    from attachments.dspy import Attachments
+    from llm_cache import CachedPredictor
+    from migration_signatures import ContentMerger
+    if dspy.settings.lm is None:
+        configure_lm()
+    predictor = CachedPredictor(RateLimitedPredictor(dspy.TypedPredictor(ContentMerger), limiter),
+                                ContentMerger, llm_cache)
     output_dir = "src/content/pages"
     os.makedirs(output_dir, exist_ok=True)
     
-    print(f"🏭 Starting Migration Factory for {len(PAGE_MAPPING)} pages...")
+    print(f"🏭 Starting Migration Factory for {len(PAGE_MAPPING)} pages ({concurrency} at a time)...")
 
-    for slug, urls in PAGE_MAPPING.items():
+    def migrate_slug(slug: str, urls: List[str]):
         print(f"\n⚙️  Processing: {slug}")
         
         # [select:main] isolates main content, removing nav/footer noise
@@ -117,24 +65,86 @@ def run_factory():
         clean_urls = [f"{u}[select:main][viewport:1280x800]" for u in urls]
         
         try:
-            # Attachments fetches and merges contexts automatically
-            context = Attachments(*clean_urls)
+            with timed(metrics, slug, 'fetch'):
+                if cache is not None:
+                    # [viewport:...] renders the live page, so those sources stay remote
+                    clean_urls = cache.local_sources(clean_urls)
+
+            with timed(metrics, slug, 'extract'):
+                # Attachments fetches and merges contexts automatically
+                context = Attachments(*clean_urls)
             
-            print("   🧠 DSPy analyzing & mapping...")
-            prediction = predictor(sources_context=context)
+            print(f"   🧠 [{slug}] DSPy analyzing & mapping...")
+            with timed(metrics, slug, 'build'):
+                prediction = predictor(sources_context=context)
             
             # Save to JSON
-            final_data = prediction.mapped_page.model_dump()
-            final_data['slug'] = slug # Add slug for Astro reference
+            with timed(metrics, slug, 'validate'):
+                final_data = prediction.mapped_page.model_dump()
+                final_data['slug'] = slug # Add slug for Astro reference
             
             filepath = os.path.join(output_dir, f"{slug.replace('/', '-')}.json")
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(final_data, f, indent=2, ensure_ascii=False)
+            with timed(metrics, slug, 'write'):
+                with open(filepath, 'w', encoding='utf-8') as f:
+                    json.dump(final_data, f, indent=2, ensure_ascii=False)
                 
             print(f"   ✅ Saved: {filepath}")
+            status = "built"
             
         except Exception as e:
             print(f"   ❌ Error on {slug}: {e}")
+            status = "failed"
+
+        if metrics is not None:
+            metrics.finish(slug, status)
+
+    run_concurrently(PAGE_MAPPING.items(), migrate_slug, max_workers=concurrency)
+
+    if limiter is not None and limiter.waited:
+        print(f"\n🚦 Rate limiter held requests for {limiter.waited:.1f}s in total.")
+    if cache is not None:
+        cache.flush()
+        print(f"\n🗄️  {cache.summary()}")
+    if llm_cache is not None:
+        print(f"🧠 {llm_cache.summary()}")
+    if metrics is not None and metrics.live:
+        metrics.print_table()
 
 if __name__ == "__main__":
-    run_factory()
+    parser = argparse.ArgumentParser(description="Migrate the pages in PAGE_MAPPING")
+    parser.add_argument('--no-cache', action='store_true', help="Let Attachments download sources directly")
+    parser.add_argument('--offline', action='store_true', help="Use cached sources only, never the network")
+    parser.add_argument('--no-llm-cache', action='store_true', help="Ignore memoized LM results (fresh results are still stored)")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help="Slugs processed at the same time")
+    parser.add_argument('--rpm', type=float, default=DEFAULT_RPM, help="Max LM requests per minute")
+    parser.add_argument('--tpm', type=float, default=DEFAULT_TPM, help="Max estimated LM tokens per minute")
+    parser.add_argument('--report', default=None, metavar='FILE', help="Save per-slug stage timings, tokens and retries as a JSON run report")
+    parser.add_argument('--live', action='store_true', help="Print a metrics row per slug as it completes, then a summary table")
+    parser.add_argument('--dry-run', action='store_true', help="List the slugs and whether their sources are cached; no network, no LM")
+    parser.add_argument('--record-cassette', default=None, metavar='FILE',
+                        help="Append every LM completion to FILE, for replay by the LM stand-in (stand_in_lm.py)")
+    args = parser.parse_args()
+
+    if args.dry_run:
+        from build_plan import SOURCE_ICONS, SOURCE_NOTES, source_status
+        cache = None if args.no_cache else HTTPCache(offline=True)
+        for slug, urls in PAGE_MAPPING.items():
+            print(f"⚙️  {slug}: 1 LM call")
+            for status in (source_status(url, cache) for url in urls):
+                print(f"      {SOURCE_ICONS[status.state]} {status.url}{SOURCE_NOTES[status.state]}")
+        sys.exit(0)
+
+    from llm_cache import LLMCache
+    if args.record_cassette:
+        from stand_in_lm import record_cassette
+        record_cassette(args.record_cassette)
+
+    stages = ('fetch', 'extract', 'build', 'validate', 'write')
+    metrics = RunMetrics('migration_factory', live=args.live, stages=stages) if args.report or args.live else None
+
+    run_factory(cache=None if args.no_cache else HTTPCache(offline=args.offline),
+                llm_cache=LLMCache(bypass=args.no_llm_cache),
+                concurrency=args.concurrency, limiter=RateLimiter(args.rpm, args.tpm),
+                metrics=metrics)
+    if args.report:
+        metrics.write_report(args.report)
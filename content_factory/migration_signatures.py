@@ -0,0 +1,86 @@
+"""
+Pydantic models and the DSPy signature for `migration_factory.py`.
+
+Kept out of migration_factory.py so that importing it (or running
+`python migration_factory.py --dry-run`) does not load dspy, Attachments or
+pydantic; they are imported when `run_factory` starts.
+"""
+
+import dspy
+from typing import Literal, List, Optional, Union
+from pydantic import BaseModel, Field
+from attachments.dspy import Attachments
+
+# -------------------------------------------------------------------------
+# ASTRO COMPONENT PROTOCOL (Pydantic Models)
+# -------------------------------------------------------------------------
+# These models MIRROR the props available in the Astro project.
+
+class HeroMultiTemplate(BaseModel):
+    component: Literal["HeroMultiTemplate"] = "HeroMultiTemplate"
+    title: str = Field(desc="Main hero headline")
+    subtitle: Optional[str] = Field(desc="Subheadline or intro text")
+    theme: Literal["blue", "white", "transparent"] = Field(default="blue")
+    backgroundImage: Optional[str] = Field(desc="URL of background image if present")
+
+class BodyCopyImage(BaseModel):
+    component: Literal["BodyCopyImage"] = "BodyCopyImage"
+    heading: str = Field(desc="Section title")
+    text_content: str = Field(desc="Body paragraph text. Markdown allowed.")
+    imageSrc: Optional[str] = Field(desc="URL of the image")
+    imagePosition: Literal["left", "right"] = Field(default="left")
+
+class TextOnlySection(BaseModel):
+    component: Literal["TextOnlySection"] = "TextOnlySection"
+    title: Optional[str]
+    content: str = Field(desc="The text content")
+    alignment: Literal["center", "left"] = "left"
+
+class CardItem(BaseModel):
+    title: str
+    description: str
+    icon_or_image: Optional[str]
+    link: Optional[str]
+
+class CardGrid(BaseModel):
+    """Maps to 'Card' or 'AdvantageItem' components in a grid layout"""
+    component: Literal["CardGrid"] = "CardGrid"
+    heading: Optional[str]
+    items: List[CardItem]
+
+class AccordionItem(BaseModel):
+    trigger: str
+    content: str
+
+class Accordion(BaseModel):
+    component: Literal["Accordion"] = "Accordion"
+    items: List[AccordionItem]
+
+# The Union of allowed components
+ComponentUnion = Union[
+    HeroMultiTemplate, 
+    BodyCopyImage, 
+    CardGrid, 
+    TextOnlySection, 
+    Accordion
+]
+
+class PageStructure(BaseModel):
+    title: str = Field(desc="SEO Title for the new page")
+    description: str = Field(desc="SEO Meta description")
+    sections: List[ComponentUnion] = Field(desc="Ordered list of page components")
+
+# -------------------------------------------------------------------------
+# DSPY LOGIC
+# -------------------------------------------------------------------------
+
+class ContentMerger(dspy.Signature):
+    """
+    Act as a Content Architect.
+    1. Analyze the text and visual structure from the provided `sources_context`.
+    2. Synthesize content from all sources into a single, cohesive narrative.
+    3. Structure the output into the defined Astro Components.
+    4. Ensure tone is professional and 'Cogesto' style.
+    """
+    sources_context: Attachments = dspy.InputField(desc="Scraped content from source URLs")
+    mapped_page: PageStructure = dspy.OutputField(desc="Structured JSON for Astro")
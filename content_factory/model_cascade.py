@@ -0,0 +1,84 @@
+"""
+Per-signature model cascade for the factory predictors (`factory.py --cascade`).
+
+Each signature gets an ordered list of models, cheapest first (see
+MODEL_ROUTES in factory.py). A call goes to the first model and is
+escalated to the next one when the answer does not parse (the adapter
+raises) or fails the signature's check, e.g. a PageBuilder page that fails
+validate_page(strict=True). The last model's answer, or error, is final.
+
+The wrapped predictor runs under `dspy.context(lm=...)`, so the LLM cache
+keys each model's answers separately and a cached cheap answer that failed
+is escalated again without an LM call. Every attempt logs its model,
+latency and tokens; escalations are counted in the run metrics.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional
+
+import dspy
+
+import run_metrics
+from page_schema import validate_page
+
+
+@dataclass
+class Tier:
+    name: str  # 'fast', 'strong'
+    lm: Any    # dspy.LM
+
+
+def model_name(lm) -> str:
+    return getattr(lm, 'model', str(lm))
+
+
+def usage_text(prediction) -> str:
+    get_usage = getattr(prediction, 'get_lm_usage', None)
+    usage = get_usage() if get_usage is not None else None
+    if not usage:
+        return "LLM cache"
+    prompt = sum(u.get('prompt_tokens') or 0 for u in usage.values())
+    completion = sum(u.get('completion_tokens') or 0 for u in usage.values())
+    return f"{prompt:,} prompt + {completion:,} completion tokens"
+
+
+def page_errors(prediction) -> List[str]:
+    """Escalation check for PageBuilder: the factory's own validation."""
+    errors, _ = validate_page(prediction.merged_page.model_dump(), strict=True)
+    return errors
+
+
+class ModelCascade:
+    def __init__(self, predictor: Callable, signature, tiers: List[Tier],
+                 check: Optional[Callable[[Any], List[str]]] = None):
+        self.predictor = predictor
+        self.signature = signature
+        self.tiers = tiers
+        self.check = check
+        self.escalations = 0
+
+    def __call__(self, label: str = "", **inputs) -> dspy.Prediction:
+        name = self.signature.__name__
+        prefix = f"[{label}] " if label else ""
+        for i, tier in enumerate(self.tiers):
+            last = i == len(self.tiers) - 1
+            start = time.perf_counter()
+            prediction, problems = None, []
+            try:
+                with dspy.context(lm=tier.lm):
+                    prediction = self.predictor(**inputs)
+                if self.check is not None and not last:
+                    problems = self.check(prediction)
+            except Exception as e:
+                if last:
+                    raise
+                problems = [f"{type(e).__name__}: {str(e).splitlines()[0] if str(e) else ''}"]
+            elapsed = time.perf_counter() - start
+            outcome = usage_text(prediction) if prediction is not None else "failed"
+            print(f"      🧭 {prefix}{name} -> {model_name(tier.lm)}: {elapsed:.1f}s, {outcome}")
+            if not problems:
+                return prediction
+            self.escalations += 1
+            run_metrics.record('escalations')
+            print(f"      ⤴️  {prefix}{name} escalated to {model_name(self.tiers[i + 1].lm)}: {problems[0][:200]}")
@@ -0,0 +1,267 @@
+"""
+Astro component protocol for generated pages.
+
+The pydantic models below are the schema PageBuilder fills in
+(`NewPageStructure`) and the shape every JSON file in src/content/pages/ is
+checked against. Sections are a discriminated union on their `component`
+field, so pydantic jumps straight to the right model instead of trying all
+16 members in turn, and an error names the component and the field that
+failed.
+
+`PAGE_ADAPTER` is built once at import and reused by `validate_page`,
+which is what validate_pages.py and the factories call.
+"""
+
+from typing import Annotated, Any, List, Literal, Optional, Tuple, Union, get_args
+
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, ValidationError, field_validator
+
+class BreadcrumbItem(BaseModel):
+    text: str
+    href: str
+
+class Breadcrumbs(BaseModel):
+    component: Literal["Breadcrumbs"] = "Breadcrumbs"
+    items: List[BreadcrumbItem]
+
+class NavItem(BaseModel):
+    text: str
+    href: str
+
+class SubNavigation(BaseModel):
+    component: Literal["SubNavigation"] = "SubNavigation"
+    items: List[NavItem]
+    currentPage: str = Field(description="The active path, e.g., '/operations/'")
+
+class BoxCardItem(BaseModel):
+    title: str
+    description: str
+    
+    @field_validator('title')
+    @classmethod
+    def check_title_length(cls, v: str) -> str:
+        words = v.split()
+        if len(words) > 5:
+             return " ".join(words[:5])
+        return v
+
+class BoxCards(BaseModel):
+    component: Literal["BoxCards"] = "BoxCards"
+    title: str
+    description: str
+    cards: List[BoxCardItem]
+
+class HeroMultiTemplate(BaseModel):
+    component: Literal["HeroMultiTemplate"] = "HeroMultiTemplate"
+    title: str
+    introduction: str = Field(description="Subheadline or intro text")
+    ctaText: Optional[str] = "Get in touch"
+    ctaHref: Optional[str] = "/contact/"
+    imageUrl: Optional[str] = Field(description="Background image URL")
+    backgroundColor: Optional[Literal["secondary-color", "cobalt"]] = "secondary-color"
+
+class BodyCopyImage(BaseModel):
+    component: Literal["BodyCopyImage"] = "BodyCopyImage"
+    title: str
+    description: str
+    imageUrl: Optional[str] = Field(description="URL of the image")
+    imageAlt: Optional[str] = Field(description="Alt text for image", default="")
+    buttonText: Optional[str]
+    buttonHref: Optional[str]
+    reverseLayout: bool = False
+
+class CardItem(BaseModel):
+    heading: str
+    text: str
+    link: Optional[str]
+    style: Literal["primary", "light", "image"] = "light"
+    imageUrl: Optional[str] = Field(description="Background image URL for image style cards")
+
+class CardGrid(BaseModel):
+    """Used for lists of services, features, or advantages."""
+    component: Literal["CardGrid"] = "CardGrid"
+    heading: Optional[str]
+    items: List[CardItem]
+
+class LeftTitledIntro(BaseModel):
+    component: Literal["LeftTitledIntro"] = "LeftTitledIntro"
+    title: str
+    content: str = Field(description="The intro text content")
+
+class CenteredTextSection(BaseModel):
+    component: Literal["CenteredTextSection"] = "CenteredTextSection"
+    title: str
+    content: str
+
+class TextOnlySection(BaseModel):
+    component: Literal["TextOnlySection"] = "TextOnlySection"
+    title: str
+    content: str
+
+class AccordionItem(BaseModel):
+    # LM output uses the aliases; page JSON is dumped with the field names
+    model_config = ConfigDict(populate_by_name=True)
+
+    question: str = Field(alias="trigger")
+    answer: str = Field(alias="content")
+
+class Accordion(BaseModel):
+    component: Literal["Accordion"] = "Accordion"
+    title: str
+    description: Optional[str]
+    items: List[AccordionItem]
+
+class QuoteImage(BaseModel):
+    src: str
+    alt: str
+
+class QuoteSection(BaseModel):
+    component: Literal["QuoteSection"] = "QuoteSection"
+    quote: str
+    attribution: str
+    image: QuoteImage
+
+class StatItem(BaseModel):
+    number: str
+    label: str
+
+class StatsSection(BaseModel):
+    component: Literal["StatsSection"] = "StatsSection"
+    intro: Optional[str]
+    stats: List[StatItem]
+
+class CardImageText(BaseModel):
+    component: Literal["CardImageText"] = "CardImageText"
+    title: str
+    description: str
+    buttonText: Optional[str]
+    buttonHref: Optional[str]
+    imageUrl: str = Field(description="URL of the image")
+    imageAlt: str
+    videoPosition: Literal["left", "right"] = "right"
+    backgroundColorClass: Optional[str] = "bg-secondary-color"
+
+class CardQuote(BaseModel):
+    component: Literal["CardQuote"] = "CardQuote"
+    quote: str
+    author: str
+    imageUrl: str = Field(description="URL of the image")
+    imageAlt: str
+    videoPosition: Literal["left", "right"] = "right"
+    backgroundColorClass: Optional[str] = "bg-primary-color"
+
+class TabItem(BaseModel):
+    id: str
+    title: str
+    content: str
+
+    @field_validator('title')
+    @classmethod
+    def check_title_length(cls, v: str) -> str:
+        words = v.split()
+        if len(words) > 3:
+            return " ".join(words[:3])
+        return v
+
+class ValuesTabs(BaseModel):
+    component: Literal["ValuesTabs"] = "ValuesTabs"
+    summaryTitle: str
+    summaryDescription: str
+    tabs: List[TabItem]
+
+class ImageObject(BaseModel):
+    src: str
+    alt: str
+    position: Optional[Literal['left', 'right']] = 'right'
+
+class CtaButton(BaseModel):
+    text: str
+    href: str
+    variant: Optional[Literal['primary', 'secondary']] = 'primary'
+
+class TwoColumnContent(BaseModel):
+    component: Literal["TwoColumnContent"] = "TwoColumnContent"
+    title: str
+    paragraphs: List[str]
+    image: Optional[ImageObject] = None
+    ctaButtons: Optional[List[CtaButton]] = None
+    backgroundColor: Optional[Literal['white', 'light']] = 'white'
+    imagePosition: Optional[Literal['left', 'right']] = 'right'
+
+# The Union of ALL allowed components in your system, tagged by `component`
+ComponentUnion = Annotated[Union[
+    Breadcrumbs,
+    SubNavigation,
+    HeroMultiTemplate, 
+    LeftTitledIntro,
+    BoxCards,
+    ValuesTabs,
+    CardGrid,
+    BodyCopyImage,
+    CardImageText,
+    CardQuote,
+    TwoColumnContent,
+    CenteredTextSection,
+    TextOnlySection, 
+    Accordion,
+    QuoteSection,
+    StatsSection
+], Field(discriminator="component")]
+
+class NewPageStructure(BaseModel):
+    title: str = Field(description="The SEO title for the new merged page")
+    description: str = Field(description="The SEO meta description")
+    breadcrumbs: Optional[Breadcrumbs] = Field(description="Breadcrumbs navigation")
+    subNavigation: Optional[SubNavigation] = Field(description="Sub-navigation for the section")
+    sections: List[ComponentUnion] = Field(description="The ordered list of content sections.")
+
+# -------------------------------------------------------------------------
+# FAST VALIDATION
+# -------------------------------------------------------------------------
+
+PAGE_ADAPTER = TypeAdapter(NewPageStructure)
+COMPONENTS = {model.model_fields['component'].default: model for model in get_args(get_args(ComponentUnion)[0])}
+
+
+def format_errors(error: ValidationError, index_map: Optional[List[int]] = None) -> List[str]:
+    """One line per error: dotted location (original section index) and message."""
+    messages = []
+    for err in error.errors():
+        loc = list(err['loc'])
+        if index_map is not None and len(loc) > 1 and loc[0] == 'sections' and isinstance(loc[1], int):
+            loc[1] = index_map[loc[1]]
+        messages.append(f"{'.'.join(str(part) for part in loc) or '<page>'}: {err['msg']}")
+    return messages
+
+
+def validate_page(data: Any, strict: bool = False) -> Tuple[List[str], List[str]]:
+    """
+    Validate one page dict; returns (errors, warnings).
+
+    Hand-written pages also use components the factory schema does not
+    model (WallLister, HeroService, ...). Those sections are reported as
+    warnings and skipped, unless `strict` is set.
+    """
+    if not isinstance(data, dict):
+        return ["<page>: expected a JSON object"], []
+    sections = data.get('sections')
+    if strict or not isinstance(sections, list):
+        try:
+            PAGE_ADAPTER.validate_python(data)
+            return [], []
+        except ValidationError as e:
+            return format_errors(e), []
+
+    warnings, index_map, known = [], [], []
+    for i, section in enumerate(sections):
+        tag = section.get('component') if isinstance(section, dict) else None
+        if tag is not None and tag not in COMPONENTS:
+            warnings.append(f"sections.{i}: component '{tag}' is not in the factory schema (not checked)")
+            continue
+        index_map.append(i)
+        known.append(section)
+    try:
+        PAGE_ADAPTER.validate_python({**data, 'sections': known})
+        return [], warnings
+    except ValidationError as e:
+        return format_errors(e, index_map), warnings
@@ -0,0 +1,171 @@
+"""
+Concurrent slug scheduler and OpenRouter rate limiting for the factories.
+
+- `run_concurrently` processes several slugs at once on a thread pool
+  (DSPy predictors are synchronous) with a configurable cap. Each slug's
+  worker handles its own failures, exactly as the sequential loop did.
+- `RateLimiter` holds two token buckets, requests per minute and tokens per
+  minute. Every LM-backed predictor call first takes one request plus its
+  estimated token cost.
+- `RateLimitedPredictor` wraps a predictor with the limiter and retries
+  transient errors (HTTP 429 / 5xx, timeouts, dropped connections) with
+  jittered exponential backoff. Calls, retries, rate-limiter waits and
+  token usage are reported to the running stage (see run_metrics.py).
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import run_metrics
+
+# --- Configuration ---
+DEFAULT_CONCURRENCY = 3
+DEFAULT_RPM = 20                 # Requests per minute against the endpoint
+DEFAULT_TPM = 400_000            # Prompt + expected completion tokens per minute
+DEFAULT_COMPLETION_TOKENS = 4000 # Expected completion size used in estimates
+DEFAULT_RETRIES = 4
+DEFAULT_BACKOFF = 2.0            # Seconds, doubled on every retry
+CHARS_PER_TOKEN = 4
+
+TRANSIENT_STATUSES = {429, 500, 502, 503, 504}
+TRANSIENT_ERRORS = {'RateLimitError', 'InternalServerError', 'ServiceUnavailableError',
+                    'APIConnectionError', 'Timeout', 'APITimeoutError', 'BadGatewayError',
+                    # dspy 3.4 wraps provider errors in its own hierarchy
+                    'LMRateLimitError', 'LMServerError', 'LMTimeoutError', 'LMTransportError'}
+
+
+class TokenBucket:
+    """Thread-safe bucket refilled continuously at `rate_per_minute`."""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """Block until `amount` is available; returns the seconds spent waiting."""
+        # A request larger than the bucket would wait forever: clamp it
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                delay = (amount - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class RateLimiter:
+    def __init__(self, rpm: float = DEFAULT_RPM, tpm: float = DEFAULT_TPM):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.waited = 0.0
+
+    def acquire(self, tokens: int) -> float:
+        waited = self.requests.acquire(1) + self.tokens.acquire(tokens)
+        self.waited += waited
+        return waited
+
+
+def estimate_tokens(inputs: Dict[str, Any], completion_tokens: int = DEFAULT_COMPLETION_TOKENS) -> int:
+    """Rough prompt size (4 chars per token) plus the expected completion."""
+    chars = 0
+    for value in inputs.values():
+        text = value.text if hasattr(value, 'text') else str(value)
+        chars += len(text or '')
+    return chars // CHARS_PER_TOKEN + completion_tokens
+
+
+def is_transient(error: Exception) -> bool:
+    status = getattr(error, 'status_code', None) or getattr(error, 'status', None) or \
+        getattr(getattr(error, 'response', None), 'status_code', None)
+    if status in TRANSIENT_STATUSES:
+        return True
+    return any(cls.__name__ in TRANSIENT_ERRORS for cls in type(error).__mro__)
+
+
+def record_usage(prediction):
+    """Report the prompt/completion tokens of an LM call to the running stage."""
+    get_usage = getattr(prediction, 'get_lm_usage', None)
+    usage = get_usage() if get_usage is not None else None
+    for model_usage in (usage or {}).values():
+        run_metrics.record('prompt_tokens', model_usage.get('prompt_tokens') or 0)
+        run_metrics.record('completion_tokens', model_usage.get('completion_tokens') or 0)
+
+
+def backoff_delay(attempt: int, base: float = DEFAULT_BACKOFF) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, base * (2 ** attempt))
+
+
+class RateLimitedPredictor:
+    def __init__(self, predictor: Callable, limiter: Optional[RateLimiter],
+                 retries: int = DEFAULT_RETRIES, backoff: float = DEFAULT_BACKOFF,
+                 completion_tokens: int = DEFAULT_COMPLETION_TOKENS):
+        self.wrapped = predictor
+        self.limiter = limiter
+        self.retries = retries
+        self.backoff = backoff
+        self.completion_tokens = completion_tokens
+        self.retried = 0
+
+    def __call__(self, **inputs):
+        estimate = estimate_tokens(inputs, self.completion_tokens)
+        for attempt in range(self.retries + 1):
+            if self.limiter is not None:
+                run_metrics.record('rate_wait', self.limiter.acquire(estimate))
+            try:
+                prediction = self.wrapped(**inputs)
+                run_metrics.record('lm_calls')
+                record_usage(prediction)
+                return prediction
+            except Exception as e:
+                if attempt == self.retries or not is_transient(e):
+                    raise
+                self.retried += 1
+                run_metrics.record('retries')
+                delay = backoff_delay(attempt, self.backoff)
+                print(f"   ⏳ Transient LM error ({type(e).__name__}), retrying in {delay:.1f}s...")
+                time.sleep(delay)
+
+
+def run_concurrently(items: Iterable[Tuple[str, Any]], worker: Callable[[str, Any], Any],
+                     max_workers: int = DEFAULT_CONCURRENCY) -> Dict[str, Any]:
+    """
+    Run `worker(slug, payload)` for every item with at most `max_workers` in
+    flight. Returns {slug: result}; a worker that raises is recorded as its
+    exception so one slug can never stop the others.
+    """
+    items = list(items)
+    results: Dict[str, Any] = {}
+    if max_workers <= 1:
+        for slug, payload in items:
+            results[slug] = _guarded(worker, slug, payload)
+        return results
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="slug") as pool:
+        futures = {slug: pool.submit(_guarded, worker, slug, payload) for slug, payload in items}
+        for slug, future in futures.items():
+            results[slug] = future.result()
+    return results
+
+
+def _guarded(worker: Callable, slug: str, payload: Any) -> Any:
+    try:
+        return worker(slug, payload)
+    except Exception as e:
+        print(f"   ❌ FAILED: {slug} - {e}")
+        return e
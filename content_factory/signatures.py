@@ -0,0 +1,48 @@
+"""
+DSPy signatures for `run_content_factory`.
+
+Kept out of factory.py so that importing the factory (or running
+`python factory.py plan`) does not load dspy; they are imported on the
+first build. Editing this file changes the prompt version, so every slug is
+rebuilt on the next run.
+"""
+
+import dspy
+from attachments.dspy import Attachments
+
+from page_schema import NewPageStructure
+
+class ContentAnalyzer(dspy.Signature):
+    """
+    Analyze the provided source websites to extract their "Content DNA".
+    1. EXACT TERMINOLOGY: List the exact names of services, phases, and methodologies used in the source.
+    2. KEY THEMES: List the major consulting themes, methodologies, and service offerings found.
+    3. VOCABULARY: Extract specific industry terms used in French.
+    """
+    sources_context: Attachments = dspy.InputField(description="Raw content from source URLs")
+    exact_terminology: str = dspy.OutputField(description="List of specific terms/headers found in the source")
+    key_themes: str = dspy.OutputField(description="List of major themes to cover")
+
+class PageBuilder(dspy.Signature):
+    """
+    Act as a Senior Editor at 'Cogesto Consulting'. 
+    Synthesize a new, high-impact page using the provided Terminology and Key Themes.
+    
+    MANDATORY PAGE STRUCTURE (Service Page Blueprint):
+    1. **Hero:** `HeroMultiTemplate` (Title: 'Transformation & Performance', Theme: 'white').
+    2. **Intro:** `BodyCopyImage` (Heading: 'Notre Approche', Position: 'right').
+    3. **Services Overview:** `CardGrid` (Heading: 'Nos Expertises', Items: 4-6 key services).
+    4. **Value Proposition:** `TextOnlySection` (Title: 'Pourquoi nous choisir?', Content: centered).
+    5. **Benefits:** `CardGrid` (Heading: 'Les Bénéfices', Items: 6-8 benefits with icons/short text).
+    6. **Closing:** `BodyCopyImage` (Heading: 'Prêt à transformer?', Position: 'left').
+    7. **CTA:** `TwoColumnContent` (Left: 'Contact', Right: 'Newsletter').
+    
+    INSTRUCTIONS:
+    1. **Source Grounding:** Use the `exact_terminology` for headers and service names.
+    2. **Merge & Expand:** Combine insights from all sources. Do not summarize; expand into rich, detailed copy (600+ words total).
+    3. **Language:** WRITE ONLY IN FRENCH.
+    """
+    sources_context: Attachments = dspy.InputField()
+    exact_terminology: str = dspy.InputField()
+    key_themes: str = dspy.InputField()
+    merged_page: NewPageStructure = dspy.OutputField(description="The structured JSON for the new Astro page")
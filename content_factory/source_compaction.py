@@ -0,0 +1,159 @@
+"""
+Token-budgeted source compaction for `run_content_factory`.
+
+Instead of handing the raw pages (navigation, footers, cookie banners and
+all) to the LM through `Attachments`, each source goes through the block
+extractor from `webpage_to_markdown.py`:
+
+1. The page is fetched (through the HTTP cache when given), cleaned and
+   split into hero + section blocks.
+2. Blocks repeated across sources (same normalized text, see
+   block_dedupe.py) are kept once.
+3. Each block is scored by how much text it carries, with earlier blocks
+   on a page favoured; very long blocks are truncated to `MAX_BLOCK_TOKENS`.
+4. Blocks are taken round-robin by rank across sources (every source gets
+   its best block before any source gets its second) until the token
+   budget is spent, then rendered as Markdown in page order.
+
+Token counts are estimates (4 characters per token, as in scheduler.py)
+and are reported per source before any LM call is made.
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import run_metrics
+from block_dedupe import block_text, exact_fingerprint
+from scheduler import CHARS_PER_TOKEN
+from webpage_to_markdown import ContentBlock, extract_blocks, fetch_bytes, parse_html
+
+# --- Configuration ---
+DEFAULT_TOKEN_BUDGET = 12000  # Estimated tokens for all sources of one slug
+MAX_BLOCK_TOKENS = 800        # A single block never takes more than this
+MAX_BLOCK_IMAGES = 2          # Image references kept per block
+POSITION_DECAY = 0.05         # Score penalty per block further down the page
+
+
+def text_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+@dataclass
+class CompactedSource:
+    url: str
+    raw_tokens: int = 0          # What the raw page text would cost
+    kept: List[Tuple[int, str]] = field(default_factory=list)  # (page position, markdown)
+    dropped_blocks: int = 0
+    error: Optional[str] = None
+
+    @property
+    def kept_tokens(self) -> int:
+        return sum(text_tokens(text) for _, text in self.kept)
+
+
+@dataclass
+class CompactedContext:
+    sources: List[CompactedSource]
+    budget: int
+
+    @property
+    def raw_tokens(self) -> int:
+        return sum(s.raw_tokens for s in self.sources)
+
+    @property
+    def kept_tokens(self) -> int:
+        return sum(s.kept_tokens for s in self.sources)
+
+    @property
+    def text(self) -> str:
+        parts = []
+        for source in self.sources:
+            if not source.kept:
+                continue
+            body = "\n\n".join(text for _, text in sorted(source.kept))
+            parts.append(f"# Source: {source.url}\n\n{body}")
+        return "\n\n---\n\n".join(parts)
+
+    def report(self, label: str = "", calls: int = 1):
+        prefix = f"[{label}] " if label else ""
+        for source in self.sources:
+            if source.error:
+                print(f"      -> {prefix}{source.url}: ⚠️  {source.error}")
+                continue
+            print(f"      -> {prefix}{source.url}: ~{source.raw_tokens:,} -> ~{source.kept_tokens:,} tokens "
+                  f"({len(source.kept)} blocks kept, {source.dropped_blocks} dropped)")
+        saved = max(0, self.raw_tokens - self.kept_tokens)
+        percent = f" (-{100 * saved / self.raw_tokens:.0f}%)" if self.raw_tokens else ""
+        print(f"   ✂️  {prefix}Compacted sources: ~{self.raw_tokens:,} -> ~{self.kept_tokens:,} tokens{percent}, "
+              f"~{saved * calls:,} tokens saved over {calls} LM call(s)")
+
+
+def render_block(block: ContentBlock, max_tokens: int = MAX_BLOCK_TOKENS) -> str:
+    """Markdown for one block, cut to `max_tokens` (whole lines first, then characters)."""
+    lines = [f"## {block.heading}"] if block.heading else []
+    bullet = "- " if block.type == 'grid_candidate' else ""
+    lines.extend(f"{bullet}{text}" for text in block.content)
+    lines.extend(f"![{img.get('alt', '')}]({img['src']})" for img in block.images[:MAX_BLOCK_IMAGES])
+
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    kept, size = [], 0
+    for line in lines:
+        if size + len(line) > max_chars:
+            room = max_chars - size
+            if room > 40:  # Keep a meaningful prefix rather than a stub
+                kept.append(line[:room].rstrip() + "…")
+            break
+        kept.append(line)
+        size += len(line) + 1
+    return "\n".join(kept)
+
+
+def score_block(block: ContentBlock, position: int) -> float:
+    """Text-rich blocks first; the hero always leads its page."""
+    if block.type == 'hero':
+        return float('inf')
+    return (block.word_count + 10 * len(block.images[:1])) / (1 + POSITION_DECAY * position)
+
+
+def load_source(url: str, cache=None) -> Tuple[CompactedSource, List[ContentBlock]]:
+    source = CompactedSource(url=url)
+    content = fetch_bytes(url, cache)
+    if content is None:
+        source.error = "could not be fetched"
+        return source, []
+    soup = parse_html(content)
+    source.raw_tokens = text_tokens(soup.get_text(" ", strip=True))
+    return source, extract_blocks(soup, url)
+
+
+def compact_sources(urls: List[str], budget: int = DEFAULT_TOKEN_BUDGET, cache=None) -> CompactedContext:
+    sources, ranked = [], []
+    seen = set()
+    for url in urls:
+        source, blocks = load_source(url, cache)
+        candidates = []
+        for position, block in enumerate(blocks):
+            fingerprint = exact_fingerprint(block_text(block.to_dict()))
+            if fingerprint in seen:
+                source.dropped_blocks += 1  # Boilerplate already taken from an earlier source
+                continue
+            seen.add(fingerprint)
+            candidates.append((score_block(block, position), position, render_block(block)))
+        candidates.sort(key=lambda c: (-c[0], c[1]))
+        sources.append(source)
+        ranked.append(candidates)
+
+    remaining = budget
+    for rank in range(max((len(c) for c in ranked), default=0)):
+        for source, candidates in zip(sources, ranked):
+            if rank >= len(candidates):
+                continue
+            _, position, text = candidates[rank]
+            cost = text_tokens(text)
+            if cost <= remaining:
+                source.kept.append((position, text))
+                remaining -= cost
+            else:
+                source.dropped_blocks += 1
+    run_metrics.record('blocks', sum(len(s.kept) for s in sources))
+    return CompactedContext(sources=sources, budget=budget)
@@ -0,0 +1,353 @@
+"""
+Local LM stand-in for offline load tests of the factories
+(benchmarks/bench_factory.py): no network, no API key.
+
+`stand_in_lm(StandInEngine(...))` returns a `dspy.LM` whose engine answers
+ContentAnalyzer, PageBuilder and ContentMerger calls (any ChatAdapter /
+JSONAdapter prompt) from one of two sources:
+    replay     completions recorded in a cassette (JSON lines), matched by the
+               exact prompt, else served round robin among the recordings of
+               the same signature (its output fields). A signature without
+               recordings gets synthetic output.
+    synthetic  made-up output: a bullet list for str fields and, for pydantic
+               outputs, an instance of the JSON schema the prompt embeds. Pages
+               get their sections in Service Page Blueprint order, so a
+               NewPageStructure passes validate_page(strict=True).
+
+Every call can be slowed down and made to fail:
+    latency            seconds per call, plus completion tokens / tokens_per_second
+    jitter             +/- fraction applied to that delay
+    error_rate         share of calls that raise a 429 (the scheduler retries it)
+    invalid_rate       share of calls that return a page missing its sections
+
+Cassettes are recorded from real runs by `CassetteRecorder`
+(`python factory.py --record-cassette cassette.jsonl`).
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import dspy
+from dspy.lm15 import Message, RateLimitError, Response, TextPart, Usage, response_to_events
+from dspy.utils.callback import BaseCallback
+
+from grounding import BLUEPRINT_SECTIONS
+
+# --- Configuration ---
+CHARS_PER_TOKEN = 4
+LIST_ITEMS = 6        # Items in a synthetic list answer (exact_terminology, key_themes)
+ARRAY_ITEMS = 3       # Items in a synthetic JSON array
+WORDS = ("transformation performance stratégie opérations conseil croissance équipe "
+         "méthodologie diagnostic pilotage excellence organisation efficacité données "
+         "clients marché valeur accompagnement projet résultats durable innovation").split()
+
+OUTPUT_FIELDS = re.compile(r"Your output fields are:\n((?:\d+\. `\w+`.*\n?)+)")
+OUTPUT_FIELD = re.compile(r"^\d+\. `(\w+)` \(([^)]*)\)", re.MULTILINE)
+SCHEMA_NOTE = "adhere to the JSON schema: "
+
+
+def prompt_key(texts: List[str]) -> str:
+    """Hash of the full prompt text (system + messages), as recorded and replayed."""
+    return hashlib.sha256("\n\n".join(texts).encode('utf-8')).hexdigest()
+
+
+def output_fields(system: str) -> List[Tuple[str, str]]:
+    """(name, type) of the output fields listed in a DSPy adapter system prompt."""
+    match = OUTPUT_FIELDS.search(system)
+    return OUTPUT_FIELD.findall(match.group(1)) if match else []
+
+
+def signature_key(fields: List[Tuple[str, str]]) -> str:
+    # ChainOfThought adds `reasoning` to any signature
+    return ",".join(name for name, _ in fields if name != 'reasoning')
+
+
+def field_schema(system: str, name: str) -> Optional[Dict[str, Any]]:
+    """The JSON schema the prompt embeds for a pydantic output field, if any."""
+    start = system.find("{" + name + "}")
+    note = system.find(SCHEMA_NOTE, start) if start >= 0 else -1
+    end = system.find("[[ ##", start + 1) if start >= 0 else -1
+    if note < 0 or (0 <= end < note):
+        return None
+    try:
+        schema, _ = json.JSONDecoder().raw_decode(system, note + len(SCHEMA_NOTE))
+        return schema
+    except ValueError:
+        return None
+
+
+# --- Synthetic output ---------------------------------------------------------
+
+def sentence(rng: random.Random, words: int) -> str:
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:]
+
+
+def string_value(rng: random.Random, name: str) -> str:
+    lowered = name.lower()
+    if any(part in lowered for part in ('url', 'href', 'src', 'link')):
+        return f"/{rng.choice(WORDS)}/"
+    if any(part in lowered for part in ('description', 'content', 'text', 'introduction', 'answer', 'quote')):
+        return ". ".join(sentence(rng, 12) for _ in range(2)) + "."
+    return sentence(rng, 4)
+
+
+def union_members(schema: Dict[str, Any], defs: Dict[str, Any]) -> List[Dict[str, Any]]:
+    members = schema.get('oneOf') or schema.get('anyOf') or []
+    return [resolve(member, defs) for member in members if member.get('type') != 'null']
+
+
+def resolve(schema: Dict[str, Any], defs: Dict[str, Any]) -> Dict[str, Any]:
+    while '$ref' in schema:
+        schema = defs[schema['$ref'].rsplit('/', 1)[-1]]
+    return schema
+
+
+def component_of(schema: Dict[str, Any]) -> Optional[str]:
+    return (schema.get('properties', {}).get('component') or {}).get('const')
+
+
+def section_members(members: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Blueprint components present in the union, in blueprint order; else the first members."""
+    by_component = {component_of(member): member for member in members}
+    blueprint = [by_component[s.component] for s in BLUEPRINT_SECTIONS if s.component in by_component]
+    return blueprint or members[:ARRAY_ITEMS]
+
+
+def schema_instance(schema: Dict[str, Any], defs: Dict[str, Any], rng: random.Random, name: str = "") -> Any:
+    """A value matching `schema` (the subset pydantic emits for the page models)."""
+    schema = resolve(schema, defs)
+    if 'const' in schema:
+        return schema['const']
+    if 'enum' in schema:
+        return schema['enum'][0]
+    if 'oneOf' in schema or 'anyOf' in schema:
+        members = union_members(schema, defs)
+        return schema_instance(members[0], defs, rng, name) if members else None
+    kind = schema.get('type')
+    if kind == 'object':
+        return {prop: schema_instance(sub, defs, rng, prop)
+                for prop, sub in schema.get('properties', {}).items()}
+    if kind == 'array':
+        items = schema.get('items', {})
+        members = union_members(resolve(items, defs), defs)
+        if len(members) > 1:
+            return [schema_instance(member, defs, rng, name) for member in section_members(members)]
+        return [schema_instance(items, defs, rng, name) for _ in range(ARRAY_ITEMS)]
+    if kind == 'string':
+        return string_value(rng, name)
+    if kind in ('integer', 'number'):
+        return rng.randint(1, 100)
+    if kind == 'boolean':
+        return False
+    return None
+
+
+def synthetic_value(system: str, name: str, rng: random.Random, invalid: bool = False) -> Any:
+    schema = field_schema(system, name)
+    if schema is not None:
+        value = schema_instance(schema, schema.get('$defs', {}), rng, name)
+        if invalid and isinstance(value, dict):
+            value.pop('sections', None)  # Fails NewPageStructure / PageStructure
+        return value
+    if name == 'reasoning':
+        return ". ".join(sentence(rng, 16) for _ in range(3)) + "."
+    return "\n".join(f"- {sentence(rng, 3)}" for _ in range(LIST_ITEMS))
+
+
+def format_completion(values: Dict[str, Any], chat: bool) -> str:
+    """Answer in the format the adapter asked for: `[[ ## field ## ]]` blocks or a JSON object."""
+    if not chat:
+        return json.dumps(values, ensure_ascii=False)
+    parts = []
+    for name, value in values.items():
+        text = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+        parts.append(f"[[ ## {name} ## ]]\n{text}")
+    return "\n\n".join(parts + ["[[ ## completed ## ]]"])
+
+
+# --- Cassettes -------------------------------------------------------------
+
+def load_cassette(path) -> List[Dict[str, Any]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def message_texts(messages: List[Dict[str, Any]]) -> List[str]:
+    """Text of OpenAI-style messages (the form LM callbacks see); image parts are skipped."""
+    texts = []
+    for message in messages:
+        content = message.get('content')
+        if isinstance(content, list):
+            content = "".join(part.get('text', '') for part in content if isinstance(part, dict))
+        texts.append(content or "")
+    return texts
+
+
+class CassetteRecorder(BaseCallback):
+    """DSPy callback appending every completion of the real LM to a cassette file."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.recorded = 0
+        self._calls: Dict[str, Tuple[str, str, float]] = {}
+        self._lock = threading.Lock()
+
+    def on_lm_start(self, call_id: str, instance: Any, inputs: Dict[str, Any]):
+        texts = message_texts(inputs.get('messages') or [{'content': inputs.get('prompt') or ""}])
+        system = texts[0] if texts else ""
+        self._calls[call_id] = (prompt_key(texts), signature_key(output_fields(system)), time.perf_counter())
+
+    def on_lm_end(self, call_id: str, outputs: Optional[Any], exception: Optional[Exception] = None):
+        key, signature, started = self._calls.pop(call_id, (None, None, 0.0))
+        if exception is not None or not outputs or key is None:
+            return
+        completion = outputs[0]
+        if isinstance(completion, dict):
+            completion = completion.get('text', '')
+        entry = {'signature': signature, 'prompt_sha256': key, 'completion': completion,
+                 'latency': round(time.perf_counter() - started, 3), 'recorded_at': time.time()}
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.recorded += 1
+
+
+def record_cassette(path) -> CassetteRecorder:
+    """Record every LM call of this process into `path` (appended)."""
+    recorder = CassetteRecorder(path)
+    dspy.configure(callbacks=[*(dspy.settings.callbacks or []), recorder])
+    print(f"📼 Recording LM completions to {path}")
+    return recorder
+
+
+# --- Engine ----------------------------------------------------------------
+
+class StandInEngine:
+    """dspy.LM engine: complete(Request) -> Response, answered locally."""
+
+    def __init__(self, mode: str = 'synthetic', cassette=None, latency: float = 0.0,
+                 tokens_per_second: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 invalid_rate: float = 0.0, recorded_latency: bool = False, seed: int = 0):
+        if mode not in ('synthetic', 'replay'):
+            raise ValueError(f"unknown stand-in mode: {mode}")
+        if mode == 'replay' and cassette is None:
+            raise ValueError("replay needs a cassette")
+        self.mode = mode
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.invalid_rate = invalid_rate
+        self.recorded_latency = recorded_latency
+        self.by_prompt: Dict[str, Dict[str, Any]] = {}
+        self.by_signature: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._next: Dict[str, int] = defaultdict(int)
+        for entry in (load_cassette(cassette) if cassette is not None else []):
+            self.by_prompt[entry['prompt_sha256']] = entry
+            self.by_signature[entry['signature']].append(entry)
+        self.stats = {'calls': 0, 'exact': 0, 'replayed': 0, 'synthetic': 0, 'errors': 0, 'invalid': 0}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _replay(self, key: str, signature: str) -> Optional[Dict[str, Any]]:
+        entry = self.by_prompt.get(key)
+        if entry is not None:
+            self.stats['exact'] += 1
+            return entry
+        entries = self.by_signature.get(signature)
+        if not entries:
+            return None
+        entry = entries[self._next[signature] % len(entries)]
+        self._next[signature] += 1
+        self.stats['replayed'] += 1
+        return entry
+
+    def _delay(self, completion_tokens: int, entry: Optional[Dict[str, Any]], spread: float) -> float:
+        if self.recorded_latency and entry is not None:
+            return entry.get('latency', 0.0)
+        delay = self.latency + (completion_tokens / self.tokens_per_second if self.tokens_per_second else 0.0)
+        return max(0.0, delay * spread)
+
+    def complete(self, request) -> Response:
+        system = request.system if isinstance(request.system, str) else \
+            "".join(part.text for part in (request.system or ()))
+        texts = [system] + [message.text or "" for message in request.messages]
+        key = prompt_key(texts)
+        fields = output_fields(system)
+        signature = signature_key(fields)
+
+        with self._lock:
+            self.stats['calls'] += 1
+            fail = self._rng.random() < self.error_rate
+            invalid = not fail and self._rng.random() < self.invalid_rate
+            spread = 1 + self._rng.uniform(-self.jitter, self.jitter)
+            entry = self._replay(key, signature) if self.mode == 'replay' and not fail else None
+            if fail:
+                self.stats['errors'] += 1
+            elif invalid:
+                self.stats['invalid'] += 1
+            elif entry is None:
+                self.stats['synthetic'] += 1
+
+        if fail:
+            time.sleep(self._delay(0, None, spread))
+            raise RateLimitError("stand-in: injected rate limit", status=429)
+        if entry is not None and not invalid:
+            completion = entry['completion']
+        else:
+            rng = random.Random(key)  # Same prompt, same synthetic answer
+            chat = "[[ ## completed ## ]]" in "\n".join(texts)
+            completion = format_completion({name: synthetic_value(system, name, rng, invalid)
+                                            for name, _ in fields}, chat)
+
+        prompt_tokens = sum(len(text) for text in texts) // CHARS_PER_TOKEN
+        completion_tokens = len(completion) // CHARS_PER_TOKEN
+        time.sleep(self._delay(completion_tokens, entry, spread))
+        return Response(id=None, model=f"stand-in/{self.mode}", message=Message.assistant([TextPart(completion)]),
+                        finish_reason="stop", usage=Usage(input_tokens=prompt_tokens, output_tokens=completion_tokens))
+
+    def stream(self, request):
+        return response_to_events(self.complete(request))
+
+    def close(self):
+        pass
+
+    def summary(self) -> str:
+        s = self.stats
+        return (f"stand-in LM ({self.mode}): {s['calls']} calls, {s['exact']} exact + {s['replayed']} "
+                f"signature replays, {s['synthetic']} synthetic, {s['errors']} injected 429s, "
+                f"{s['invalid']} invalid pages")
+
+
+def stand_in_lm(engine: StandInEngine, model: Optional[str] = None) -> dspy.LM:
+    """
+    A dspy.LM answered by `engine`. Retries are left to RateLimitedPredictor.
+    `model` names it apart from another stand-in (the cascade's tiers).
+    """
+    return dspy.LM(model or f"stand-in/{engine.mode}", engine=engine, cache=False, num_retries=0)
+
+
+def add_stand_in_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--replay', default=None, metavar='CASSETTE',
+                        help="Replay completions recorded with `factory.py --record-cassette` (default: synthetic output)")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds per LM call")
+    parser.add_argument('--tokens-per-second', type=float, default=0.0, help="Completion speed added to --latency (0 = instant)")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Random +/- fraction applied to the delay")
+    parser.add_argument('--recorded-latency', action='store_true', help="Replay each completion with its recorded latency")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of LM calls failing with HTTP 429")
+    parser.add_argument('--invalid-rate', type=float, default=0.0, help="Share of LM calls returning a schema-invalid page")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the latency and error draws")
+
+
+def stand_in_options(args: argparse.Namespace) -> Dict[str, Any]:
+    return dict(mode='replay' if args.replay else 'synthetic', cassette=args.replay, latency=args.latency,
+                tokens_per_second=args.tokens_per_second, jitter=args.jitter, error_rate=args.error_rate,
+                invalid_rate=args.invalid_rate, recorded_latency=args.recorded_latency, seed=args.seed)
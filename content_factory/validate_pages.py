@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Page JSON Validator
+-------------------
+Checks every page JSON under src/content/pages/ (or the files / directories
+given) against the Astro component protocol in page_schema.py.
+
+Sections are validated through the discriminated union on `component`, so
+each section is checked against its own model only. Components the factory
+schema does not model are reported as warnings (errors with --strict).
+
+Large trees (PARALLEL_MIN_FILES and up) are validated in a process pool, in
+chunks, to use every core; below that, starting the workers costs more than
+validating in this process. `--workers N` always uses a pool of N processes,
+`--workers 0` always validates in process.
+
+Usage:
+    python content_factory/validate_pages.py [paths ...] [--strict] [--workers 4]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from page_schema import validate_page
+
+# --- Configuration ---
+REPO_ROOT = Path(__file__).resolve().parent.parent
+PAGES_DIR = REPO_ROOT / "src" / "content" / "pages"
+CHUNK_SIZE = 64  # Files per task sent to a worker process
+# Break-even for the pool: a page takes ~0.2 ms to validate in process, a
+# forked worker starts in ~15 ms, a spawned one (macOS, Windows) in ~200 ms
+PARALLEL_MIN_FILES = 200 if multiprocessing.get_start_method() == 'fork' else 2000
+
+
+def find_pages(paths: List[str]) -> List[Path]:
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(path.rglob('*.json')))
+        else:
+            files.append(path)
+    return files
+
+
+def validate_file(path: str, strict: bool = False) -> Dict[str, Any]:
+    result = {'path': path, 'sections': 0, 'errors': [], 'warnings': []}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        result['errors'].append(f"<file>: {e}")
+        return result
+    if isinstance(data, dict) and isinstance(data.get('sections'), list):
+        result['sections'] = len(data['sections'])
+    result['errors'], result['warnings'] = validate_page(data, strict=strict)
+    return result
+
+
+def validate_chunk(paths: List[str], strict: bool) -> List[Dict[str, Any]]:
+    return [validate_file(path, strict) for path in paths]
+
+
+def validate_files(files: List[Path], strict: bool = False,
+                   workers: Optional[int] = 0) -> List[Dict[str, Any]]:
+    """`workers=None` picks: one process per core once the tree is large enough."""
+    paths = [str(f) for f in files]
+    if workers is None:
+        workers = (os.cpu_count() or 1) if len(paths) >= PARALLEL_MIN_FILES else 0
+    if workers <= 0:
+        return validate_chunk(paths, strict)
+    chunks = [paths[i:i + CHUNK_SIZE] for i in range(0, len(paths), CHUNK_SIZE)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(validate_chunk, chunks, [strict] * len(chunks))
+        return [result for chunk in results for result in chunk]
+
+
+def display_path(path: str) -> str:
+    try:
+        return str(Path(path).resolve().relative_to(REPO_ROOT))
+    except ValueError:
+        return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Validate page JSON files against the factory page schema.")
+    parser.add_argument('paths', nargs='*', default=[str(PAGES_DIR)], help="Files or directories (default: src/content/pages)")
+    parser.add_argument('--strict', action='store_true', help="Treat components missing from the schema as errors")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Validator processes (0 = in process; default: one per core for large trees)")
+    parser.add_argument('--quiet', action='store_true', help="Only print files with errors")
+    args = parser.parse_args()
+
+    files = find_pages(args.paths)
+    if not files:
+        print(f"❌ No page JSON found in: {', '.join(args.paths)}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    results = validate_files(files, strict=args.strict, workers=args.workers)
+    elapsed = time.perf_counter() - start
+
+    failed = 0
+    for result in results:
+        name = display_path(result['path'])
+        if result['errors']:
+            failed += 1
+            print(f"❌ {name}: {len(result['errors'])} error(s)")
+            for message in result['errors']:
+                print(f"      {message}")
+        elif not args.quiet:
+            print(f"✅ {name} ({result['sections']} sections)")
+        if not args.quiet:
+            for message in result['warnings']:
+                print(f"   ⚠️  {message}")
+
+    sections = sum(r['sections'] for r in results)
+    rate = f"{len(results) / elapsed:,.0f} files/sec, {sections / elapsed:,.0f} sections/sec" if elapsed else ""
+    print(f"\n📋 {len(results) - failed}/{len(results)} files valid, {failed} with errors "
+          f"({sections} sections in {elapsed:.2f}s; {rate})")
+    sys.exit(1 if failed else 0)
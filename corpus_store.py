@@ -0,0 +1,164 @@
+"""
+Sharded Text Corpus Store
+-------------------------
+On-disk store for extracted page text, one shard per URL, so a refresh only
+rewrites the pages that changed and a reader only maps the pages it needs.
+Used by `get_cogesto_context.py` for the brand context.
+
+Layout (under `.cogesto_corpus/` at the repo root by default):
+    index.json            url -> {shard, sha256, size, source_sha256, fetched_at, checked_at}
+    shards/ab12...ef.md   extracted text of one URL (UTF-8), named by the URL hash
+
+- `sha256` is the hash of the extracted text: a shard is only rewritten when
+  it changes. `source_sha256` is the hash of the raw page it came from, so a
+  caller holding the raw body (e.g. from the HTTP cache) can skip
+  re-extracting an unchanged page altogether.
+- `fetched_at` is when the text last changed, `checked_at` when the page was
+  last looked at.
+- Index order is the corpus order; new URLs are appended.
+
+`CorpusReader` memory-maps shards on first use: `page(url)` decodes one
+shard straight from its map, `corpus_bytes()` joins the maps into the old
+flat `cogesto_context.txt` without decoding them.
+"""
+
+import hashlib
+import json
+import mmap
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from http_cache import atomic_write_bytes, sha256_hex
+
+# --- Configuration ---
+DEFAULT_STORE_DIR = Path(__file__).resolve().parent / ".cogesto_corpus"
+SHARD_SUFFIX = ".md"
+PAGE_SEPARATOR = "\n\n"
+
+
+def shard_name(url: str) -> str:
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()[:32] + SHARD_SUFFIX
+
+
+class CorpusStore:
+    """Writer side: index plus one text shard per URL."""
+
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        self.root = Path(root)
+        self.index_path = self.root / "index.json"
+        self.entries: Dict[str, Dict] = {}
+        self.stats = {"unchanged": 0, "updated": 0, "added": 0, "removed": 0}
+        if self.index_path.exists():
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f).get('pages', {})
+
+    def shard_path(self, url: str) -> Path:
+        return self.root / "shards" / self.entries[url]['shard']
+
+    def has(self, url: str) -> bool:
+        return url in self.entries and self.shard_path(url).exists()
+
+    def source_unchanged(self, url: str, source_sha256: str) -> bool:
+        """True if `url` was last extracted from exactly these raw bytes (and its shard is on disk)."""
+        return self.has(url) and self.entries[url].get('source_sha256') == source_sha256
+
+    def touch(self, url: str):
+        self.entries[url]['checked_at'] = time.time()
+        self.stats["unchanged"] += 1
+
+    def put(self, url: str, text: str, source_sha256: Optional[str] = None) -> bool:
+        """Store the text of `url`; returns True if its shard was (re)written."""
+        data = text.encode('utf-8')
+        digest = sha256_hex(data)
+        now = time.time()
+        entry = self.entries.get(url)
+        if entry is not None and entry['sha256'] == digest and self.has(url):
+            entry.update(source_sha256=source_sha256, checked_at=now)
+            self.stats["unchanged"] += 1
+            return False
+        self.stats["updated" if entry is not None else "added"] += 1
+        entry = self.entries.setdefault(url, {'shard': shard_name(url)})
+        atomic_write_bytes(self.shard_path(url), data)
+        entry.update(sha256=digest, size=len(data), source_sha256=source_sha256,
+                     fetched_at=now, checked_at=now)
+        return True
+
+    def prune(self, keep: List[str]) -> List[str]:
+        """Drop every URL not in `keep`, with its shard; returns the removed URLs."""
+        keep = set(keep)
+        removed = [url for url in self.entries if url not in keep]
+        for url in removed:
+            self.shard_path(url).unlink(missing_ok=True)
+            del self.entries[url]
+        self.stats["removed"] += len(removed)
+        return removed
+
+    def save(self):
+        data = json.dumps({'pages': self.entries}, indent=2, ensure_ascii=False)
+        atomic_write_bytes(self.index_path, data.encode('utf-8'))
+
+    def summary(self) -> str:
+        s = self.stats
+        return (f"corpus: {len(self.entries)} pages, {s['added']} added, {s['updated']} updated, "
+                f"{s['unchanged']} unchanged, {s['removed']} removed")
+
+
+class CorpusReader:
+    """
+    Read side: shards are memory-mapped on first access and stay mapped
+    until `close()` (or the end of a `with` block).
+    """
+
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        self.root = Path(root)
+        with open(self.root / "index.json", 'r', encoding='utf-8') as f:
+            self.entries: Dict[str, Dict] = json.load(f).get('pages', {})
+        self._maps: Dict[str, mmap.mmap] = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for mapped in self._maps.values():
+            mapped.close()
+        self._maps.clear()
+
+    def urls(self) -> List[str]:
+        return list(self.entries)
+
+    def _map(self, url: str) -> Optional[mmap.mmap]:
+        if url not in self._maps:
+            entry = self.entries[url]
+            if not entry['size']:
+                return None  # mmap cannot map an empty file
+            with open(self.root / "shards" / entry['shard'], 'rb') as f:
+                self._maps[url] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._maps[url]
+
+    def page_buffer(self, url: str):
+        """The page's UTF-8 bytes, without a copy: its map, valid until `close()`."""
+        mapped = self._map(url)
+        return mapped if mapped is not None else b""
+
+    def page(self, url: str) -> str:
+        return str(self.page_buffer(url), 'utf-8')
+
+    def pages(self, urls: Optional[List[str]] = None) -> Iterator[Tuple[str, str]]:
+        """(url, text) in corpus order, or in the order of `urls`."""
+        for url in urls if urls is not None else self.entries:
+            yield url, self.page(url)
+
+    def corpus(self, urls: Optional[List[str]] = None) -> str:
+        return PAGE_SEPARATOR.join(text for _, text in self.pages(urls))
+
+    def corpus_bytes(self, urls: Optional[List[str]] = None) -> bytes:
+        """`corpus()` encoded as UTF-8, joined straight from the maps."""
+        separator = PAGE_SEPARATOR.encode('utf-8')
+        return separator.join(self.page_buffer(url) for url in (urls if urls is not None else self.entries))
+
+    def total_bytes(self) -> int:
+        return sum(entry['size'] for entry in self.entries.values())
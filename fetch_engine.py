@@ -0,0 +1,217 @@
+"""
+Concurrent Fetch Engine
+-----------------------
+asyncio front-end used by `webpage_to_markdown.py` to download many pages at
+once instead of one `requests.get` after another.
+
+- One pooled `requests.Session` (keep-alive) shared by every request.
+- A global concurrency cap plus a per-host cap, so a batch that is mostly
+  one site never opens more than a few sockets against it.
+- Retries with exponential backoff + jitter on timeouts, connection errors,
+  429 and 5xx responses.
+- Optional `HTTPCache` (see http_cache.py): fresh hits skip the network and
+  stale entries are revalidated with conditional requests.
+- Optional `max_bytes`: bodies are streamed and cut at that size, so one
+  oversized page cannot blow the memory of a small worker.
+- Optional `limiter` (see host_limiter.py): the per-host cap adapts (AIMD)
+  to how each host responds instead of staying at `per_host`.
+- A 429 / 503 with `Retry-After` is retried no sooner than the server asked.
+
+Results are handed to a callback as soon as each page arrives (completion
+order); callers that need deterministic output keep the `index` and reorder.
+"""
+
+import asyncio
+import contextvars
+import random
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass
+from functools import partial
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from host_limiter import HostLimiter, LimitedAdapter, parse_retry_after
+from http_cache import USER_AGENT, get_capped
+
+# --- Configuration ---
+DEFAULT_CONCURRENCY = 8      # Total in-flight requests
+DEFAULT_PER_HOST = 2         # In-flight requests against a single host
+DEFAULT_RETRIES = 3          # Extra attempts after the first one
+DEFAULT_BACKOFF = 0.5        # Seconds, doubled on every retry
+DEFAULT_TIMEOUT = 15
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+@dataclass
+class FetchResult:
+    index: int  # Position of the URL in the input list
+    url: str
+    status: Optional[int] = None
+    content: Optional[bytes] = None
+    content_type: str = ""
+    error: Optional[str] = None
+    attempts: int = 0
+    elapsed: float = 0.0
+    truncated: bool = False  # Body was cut at max_bytes
+
+    @property
+    def ok(self) -> bool:
+        return self.content is not None and self.error is None
+
+
+def build_session(pool_size: int = DEFAULT_CONCURRENCY, user_agent: Optional[str] = None,
+                  limiter: Optional[HostLimiter] = None) -> requests.Session:
+    """
+    A keep-alive session whose connection pool can serve `pool_size` threads
+    and sends `user_agent` (default: the scraper's browser USER_AGENT); with
+    a `limiter`, every request waits for a slot of its host.
+    """
+    session = requests.Session()
+    if limiter is not None:
+        adapter = LimitedAdapter(limiter, pool_connections=pool_size, pool_maxsize=pool_size)
+    else:
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = user_agent or USER_AGENT
+    return session
+
+
+def host_of(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+def backoff_delay(attempt: int, base: float = DEFAULT_BACKOFF) -> float:
+    """Exponential backoff with full jitter: U(0, base * 2**attempt)."""
+    return random.uniform(0, base * (2 ** attempt))
+
+
+async def acquire_host_slot(limiter: HostLimiter, host: str):
+    """Wait (asynchronously) for an adaptive slot of `host`, Retry-After pauses included."""
+    start = time.monotonic()
+    while True:
+        wait = limiter.try_acquire(host, waited=time.monotonic() - start)
+        if not wait:
+            return
+        await asyncio.sleep(wait)
+
+
+async def _fetch_one(session: requests.Session, index: int, url: str,
+                     global_sem: asyncio.Semaphore, host_sem: asyncio.Semaphore,
+                     retries: int, backoff: float, timeout: float, cache=None,
+                     max_bytes: Optional[int] = None,
+                     limiter: Optional[HostLimiter] = None,
+                     executor: Optional[Executor] = None) -> FetchResult:
+    result = FetchResult(index=index, url=url)
+    started = time.perf_counter()
+    if cache is not None:
+        get = partial(cache.get, url, timeout=timeout, session=session, max_bytes=max_bytes)
+    elif max_bytes is not None:
+        get = partial(get_capped, session, url, max_bytes, timeout=timeout)
+    else:
+        get = partial(session.get, url, timeout=timeout)
+
+    for attempt in range(retries + 1):
+        result.attempts = attempt + 1
+        retryable = False
+        retry_after = None
+        # Host slot first: tasks queued behind a busy host must not sit on
+        # global slots that other hosts could use
+        async with host_sem:
+            if limiter is not None:
+                await acquire_host_slot(limiter, host_of(url))
+            # The adapter's send uses the adaptive slot taken here instead of blocking a thread
+            with limiter.reserved(host_of(url)) if limiter is not None else nullcontext():
+                async with global_sem:
+                    try:
+                        # Like asyncio.to_thread, but on the fetch pool (sized to the concurrency)
+                        # and with the context, so the adapter sees the reserved host slot
+                        response = await asyncio.get_running_loop().run_in_executor(
+                            executor, partial(contextvars.copy_context().run, get))
+                        result.status = response.status_code
+                        if response.status_code in RETRY_STATUSES:
+                            retryable = True
+                            result.error = f"HTTP {response.status_code}"
+                            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                        else:
+                            response.raise_for_status()
+                            result.content = response.content
+                            result.content_type = response.headers.get('Content-Type', '')
+                            result.truncated = getattr(response, 'truncated', False)
+                            result.error = None
+                    except (requests.Timeout, requests.ConnectionError) as e:
+                        retryable = True
+                        result.error = str(e)
+                    except Exception as e:
+                        result.error = str(e)
+
+        if not retryable or attempt == retries:
+            break
+        # Sleep outside the semaphores so the slot is free for other pages
+        await asyncio.sleep(max(backoff_delay(attempt, backoff), retry_after or 0))
+
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+async def fetch_all(urls: List[str],
+                    on_result: Optional[Callable[[FetchResult], None]] = None,
+                    concurrency: int = DEFAULT_CONCURRENCY,
+                    per_host: int = DEFAULT_PER_HOST,
+                    retries: int = DEFAULT_RETRIES,
+                    backoff: float = DEFAULT_BACKOFF,
+                    timeout: float = DEFAULT_TIMEOUT,
+                    session: Optional[requests.Session] = None,
+                    user_agent: Optional[str] = None,
+                    cache=None,
+                    max_bytes: Optional[int] = None,
+                    limiter: Optional[HostLimiter] = None) -> List[FetchResult]:
+    """
+    Fetch every URL concurrently. `on_result` runs (on the event loop thread)
+    as each page completes; the returned list is in input order.
+
+    With a `limiter`, `per_host` is ignored: the limiter's adaptive limit
+    caps each host (a given `session` must be built with the same limiter).
+    """
+    own_session = session is None
+    if own_session:
+        session = build_session(concurrency, user_agent, limiter)
+    if limiter is not None:
+        per_host = int(limiter.max_limit)
+
+    global_sem = asyncio.Semaphore(concurrency)
+    host_sems: Dict[str, asyncio.Semaphore] = {}
+    for url in urls:
+        host_sems.setdefault(host_of(url), asyncio.Semaphore(per_host))
+
+    # The loop's default executor has min(32, cpu + 4) threads: it would cap a higher concurrency
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='fetch')
+    tasks = [
+        asyncio.create_task(_fetch_one(session, i, url, global_sem, host_sems[host_of(url)],
+                                       retries, backoff, timeout, cache, max_bytes, limiter, executor))
+        for i, url in enumerate(urls)
+    ]
+
+    results: List[Optional[FetchResult]] = [None] * len(urls)
+    try:
+        for finished in asyncio.as_completed(tasks):
+            result = await finished
+            results[result.index] = result
+            if on_result:
+                on_result(result)
+    finally:
+        executor.shutdown(wait=False)
+        if own_session:
+            session.close()
+
+    return results
+
+
+def run_fetch_all(urls: List[str], **kwargs) -> List[FetchResult]:
+    """Synchronous entry point for scripts."""
+    return asyncio.run(fetch_all(urls, **kwargs))
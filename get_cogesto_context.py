@@ -1,47 +1,121 @@
+"""
+Cogesto Brand Context
+---------------------
+Refreshes the Cogesto website text used as brand context, one shard per URL
+in the corpus store (see corpus_store.py), then assembles the flat
+cogesto_context.txt from the shards.
+
+- With the HTTP cache (default), a page whose raw HTML hashes the same as
+  the last run is not re-extracted; otherwise its text goes through
+  `Attachments` and its shard is only rewritten if the text changed.
+- URLs dropped from the list are removed from the store.
+- cogesto_context.txt is only rewritten when a shard changed.
+- A page that fails to fetch keeps its previous shard. The failures are
+  listed, and the exit status is still 0 as long as the context file was
+  written; it is 1 only when no page has any text.
+
+Usage:
+    python get_cogesto_context.py [--offline | --no-cache]
+    python get_cogesto_context.py --show https://www.cogestoconsulting.com/a-propos/
+"""
+
+import argparse
 import os
 import sys
 from pathlib import Path
-import dspy
-from attachments.dspy import Attachments
-
-# Set up dspy with a dummy LM as we only need Attachments
-lm = dspy.LM(
-    model='openai/gpt-5-mini', 
-    api_key=os.environ.get("OPENROUTER_API_KEY"),
-    api_base="https://openrouter.ai/api/v1",
-    max_tokens=16000,
-    temperature=1.0
-)
-dspy.configure(lm=lm)
-
-def get_cogesto_context(urls: list[str], output_path: str = "cogesto_context.txt"):
+from typing import List, Optional, Tuple
+
+from corpus_store import DEFAULT_STORE_DIR, CorpusReader, CorpusStore
+from http_cache import HTTPCache, atomic_write_bytes, sha256_hex
+
+# --- Configuration ---
+COGESTO_URLS = [
+    "https://www.cogestoconsulting.com/",
+    "https://www.cogestoconsulting.com/a-propos/",
+    "https://www.cogestoconsulting.com/notre-expertise/",
+    "https://www.cogestoconsulting.com/business-linkage-progam/",
+    # Add any other relevant pages here
+]
+EMPTY_MARKER = "No content extracted"
+
+
+def extract_text(source: str) -> str:
+    # Only the refresh path needs Attachments (and dspy behind it)
+    from attachments.dspy import Attachments
+    context = Attachments(source)
+    return context.text if hasattr(context, 'text') else str(context)
+
+
+def refresh_page(url: str, store: CorpusStore, cache: Optional[HTTPCache] = None) -> bool:
+    """Bring the shard of `url` up to date; returns True if it was rewritten."""
+    source_sha256 = None
+    source = url
+    if cache is not None:
+        response = cache.get(url)
+        response.raise_for_status()
+        source_sha256 = sha256_hex(response.content)
+        if store.source_unchanged(url, source_sha256):
+            store.touch(url)
+            return False
+        source = str(cache.get_path(url, base_href=True))  # Same body, as a file Attachments can read
+
+    text = extract_text(source)
+    if not text or EMPTY_MARKER in text:
+        raise ValueError("no significant content extracted by Attachments")
+    return store.put(url, text, source_sha256)
+
+
+def get_cogesto_context(urls: List[str], output_path: str = "cogesto_context.txt",
+                        cache: HTTPCache = None, store_dir=DEFAULT_STORE_DIR) -> Tuple[Optional[str], List[str]]:
+    """Returns (output_path, or None if no page has text; the URLs that failed to refresh)."""
     print(f"Fetching context from Cogesto website at: {urls}")
-    try:
-        # Attachments will fetch the URLs and process their content
-        context = Attachments(*urls)
-        
-        processed_text = context.text if hasattr(context, 'text') else str(context)
-        
-        if not processed_text or "No content extracted" in processed_text:
-            print("Warning: No significant content was extracted by Attachments. Check the URLs.")
-            processed_text = "No content extracted from Cogesto website."
-
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(processed_text)
+    store = CorpusStore(store_dir)
+    changed = bool(store.prune(urls))
+    failed = []
+    for url in urls:
+        try:
+            if refresh_page(url, store, cache):
+                changed = True
+                print(f"   ✏️  {url}")
+        except Exception as e:
+            failed.append(url)
+            note = " (keeping the previous text)" if store.has(url) else ""
+            print(f"Error fetching Cogesto context from {url}: {e}{note}")
+    store.save()
+    print(store.summary())
+
+    present = [url for url in urls if store.has(url)]
+    if not present:
+        print("Warning: No significant content was extracted by Attachments. Check the URLs.")
+        return None, failed
+    if changed or not os.path.exists(output_path):
+        with CorpusReader(store_dir) as reader:
+            atomic_write_bytes(Path(output_path), reader.corpus_bytes(present))
         print(f"Successfully saved Cogesto context to {output_path}")
-        return output_path
-    except Exception as e:
-        print(f"Error fetching Cogesto context: {e}")
-        return None
+    else:
+        print(f"{output_path} is up to date")
+    if failed:
+        print(f"⚠️  {len(failed)} page(s) not refreshed, previous text kept where there was one: {', '.join(failed)}")
+    return output_path, failed
+
 
 if __name__ == "__main__":
-    # List of Cogesto URLs to scrape for richer context
-    cogesto_urls = [
-        "https://www.cogestoconsulting.com/",
-        "https://www.cogestoconsulting.com/a-propos/",
-        "https://www.cogestoconsulting.com/notre-expertise/",
-        "https://www.cogestoconsulting.com/business-linkage-progam/",
-        # Add any other relevant pages here
-    ]
-    output_file = "cogesto_context.txt"
-    get_cogesto_context(cogesto_urls, output_file)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Refresh cogesto_context.txt from the Cogesto website")
+    parser.add_argument('--no-cache', action='store_true', help="Let Attachments download pages directly")
+    parser.add_argument('--offline', action='store_true', help="Use cached pages only, never the network")
+    parser.add_argument('--store', default=str(DEFAULT_STORE_DIR), help="Corpus store directory")
+    parser.add_argument('--output', default="cogesto_context.txt", help="Assembled context file")
+    parser.add_argument('--show', metavar='URL', help="Print one stored page and exit (no fetching)")
+    args = parser.parse_args()
+
+    if args.show:
+        with CorpusReader(args.store) as reader:
+            if args.show not in reader.entries:
+                print(f"❌ Not in the corpus: {args.show}")
+                sys.exit(1)
+            print(reader.page(args.show))
+        sys.exit(0)
+
+    result, _ = get_cogesto_context(COGESTO_URLS, args.output, store_dir=args.store,
+                                    cache=None if args.no_cache else HTTPCache(offline=args.offline))
+    sys.exit(0 if result else 1)
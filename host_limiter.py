@@ -0,0 +1,289 @@
+"""
+Adaptive Per-Host Concurrency
+-----------------------------
+AIMD controller for how many requests may be in flight against each host,
+so each competitor site is fetched as fast as it tolerates.
+
+- Every host starts at `initial` concurrent requests.
+- Additive increase: each healthy response adds 1/limit, i.e. about one
+  more slot per round of requests, up to `max_limit`.
+- Multiplicative decrease: a 429 / 503, a timeout or connection error
+  halves the limit. A latency EWMA above LATENCY_TOLERANCE x the host's
+  best EWMA cuts it by LATENCY_BACKOFF. At most one cut per round trip, so
+  a burst of throttled responses counts once.
+- `Retry-After` (seconds or HTTP date) pauses the whole host until then.
+
+`LimitedAdapter` applies the controller to a `requests.Session` (see
+`fetch_engine.build_session(limiter=...)`), so every network request made
+through that session, including HTTPCache revalidations, holds a host slot
+while it waits for the response and its body; cache hits never do. A
+`stream=True` response keeps its slot until it is closed (`get_capped`
+closes it once the capped body is read).
+Latency is measured to the response headers, so it does not grow with the
+page size.
+
+Async callers (fetch_engine) take the slot with `try_acquire` before they
+hold any other slot, and mark it `reserved` for the request that follows:
+the adapter then uses it instead of blocking a worker thread in `acquire`.
+
+`snapshot()` reports per-host limits and counters for the run metrics.
+"""
+
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterator, Optional, Set
+from urllib.parse import urlsplit
+
+from requests.adapters import HTTPAdapter
+
+# --- Configuration ---
+DEFAULT_INITIAL = 2          # Starting in-flight requests per host
+DEFAULT_MAX_LIMIT = 8        # Never more than this against one host
+MIN_LIMIT = 1.0
+THROTTLE_BACKOFF = 0.5       # Limit multiplier on 429 / 503 / timeouts
+LATENCY_BACKOFF = 0.75       # Limit multiplier when latency climbs
+LATENCY_TOLERANCE = 2.0      # EWMA above this x the best EWMA counts as congestion
+LATENCY_ALPHA = 0.3          # EWMA weight of the newest sample
+MAX_RETRY_AFTER = 120.0      # Seconds; longer requests are capped
+THROTTLE_STATUSES = {429, 503}
+SLOT_POLL = 0.05             # Seconds between try_acquire attempts on a full host
+
+# Hosts whose slot the current task already holds; the adapter's next send to
+# that host uses it (fetch_engine runs the request in a copy of the context)
+_reserved: ContextVar[Optional[Set[str]]] = ContextVar('host_limiter_reserved', default=None)
+
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), capped."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - (now or time.time())
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+@dataclass
+class HostState:
+    limit: float
+    in_flight: int = 0
+    latency: Optional[float] = None       # EWMA seconds to response headers
+    best_latency: Optional[float] = None  # Lowest EWMA seen
+    cooldown_until: float = 0.0           # time.monotonic() before which nothing is sent
+    last_cut: float = 0.0
+    requests: int = 0
+    throttled: int = 0                    # 429 / 503 responses
+    errors: int = 0                       # Timeouts and connection errors
+    cuts: int = 0
+    peak_limit: float = 0.0
+    low_limit: float = 0.0
+    waited: float = 0.0                   # Seconds requests spent waiting for a slot
+
+
+class HostLimiter:
+    def __init__(self, initial: int = DEFAULT_INITIAL, max_limit: int = DEFAULT_MAX_LIMIT):
+        self.initial = float(max(MIN_LIMIT, min(initial, max_limit)))
+        self.max_limit = float(max_limit)
+        self.hosts: Dict[str, HostState] = {}
+        self._cond = threading.Condition()
+
+    def _state(self, host: str) -> HostState:
+        state = self.hosts.get(host)
+        if state is None:
+            state = self.hosts[host] = HostState(limit=self.initial, peak_limit=self.initial,
+                                                 low_limit=self.initial)
+        return state
+
+    def cooldown_remaining(self, host: str) -> float:
+        with self._cond:
+            state = self.hosts.get(host)
+            return max(0.0, state.cooldown_until - time.monotonic()) if state else 0.0
+
+    def acquire(self, host: str):
+        """Block until `host` has a free slot and no Retry-After pause is running."""
+        start = time.monotonic()
+        with self._cond:
+            state = self._state(host)
+            while True:
+                now = time.monotonic()
+                if now < state.cooldown_until:
+                    self._cond.wait(state.cooldown_until - now)
+                elif state.in_flight < int(state.limit):
+                    break
+                else:
+                    self._cond.wait()
+            state.in_flight += 1
+            state.requests += 1
+            state.waited += time.monotonic() - start
+
+    def try_acquire(self, host: str, waited: float = 0.0) -> float:
+        """
+        Take a slot without blocking: 0.0 when taken, else the seconds to wait
+        before trying again. `waited` is added to the host's wait time on success.
+        """
+        with self._cond:
+            state = self._state(host)
+            remaining = state.cooldown_until - time.monotonic()
+            if remaining > 0:
+                return remaining
+            if state.in_flight >= int(state.limit):
+                return SLOT_POLL
+            state.in_flight += 1
+            state.requests += 1
+            state.waited += waited
+            return 0.0
+
+    def free(self, host: str):
+        """Return a slot without feedback (the limit is unchanged)."""
+        with self._cond:
+            self._state(host).in_flight -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def reserved(self, host: str) -> Iterator[None]:
+        """
+        Hand a slot taken with try_acquire to the next request to `host` made
+        in this context; freed here if no request used it (e.g. a cache hit).
+        """
+        hosts = _reserved.get()
+        if hosts is None:
+            hosts = set()
+            _reserved.set(hosts)
+        hosts.add(host)
+        try:
+            yield
+        finally:
+            if host in hosts:
+                hosts.discard(host)
+                self.free(host)
+
+    def release(self, host: str, status: Optional[int] = None, latency: Optional[float] = None,
+                retry_after: Optional[float] = None, failed: bool = False):
+        """
+        Return a slot and adapt the limit. `status` None with `failed` means a
+        timeout or connection error; `latency` is seconds to the headers.
+        """
+        with self._cond:
+            state = self._state(host)
+            state.in_flight -= 1
+            now = time.monotonic()
+            if latency is not None and not failed:
+                state.latency = latency if state.latency is None else \
+                    LATENCY_ALPHA * latency + (1 - LATENCY_ALPHA) * state.latency
+                state.best_latency = min(state.best_latency or state.latency, state.latency)
+
+            if retry_after:
+                state.cooldown_until = max(state.cooldown_until, now + retry_after)
+            if failed or status in THROTTLE_STATUSES:
+                if failed:
+                    state.errors += 1
+                else:
+                    state.throttled += 1
+                self._cut(state, THROTTLE_BACKOFF, now)
+            elif state.latency is not None and state.latency > LATENCY_TOLERANCE * state.best_latency:
+                self._cut(state, LATENCY_BACKOFF, now)
+            elif status is not None and status < 500:
+                state.limit = min(self.max_limit, state.limit + 1 / state.limit)
+            state.peak_limit = max(state.peak_limit, state.limit)
+            self._cond.notify_all()
+
+    def _cut(self, state: HostState, factor: float, now: float):
+        # One cut per round trip: responses already in flight saw the old limit
+        if now - state.last_cut < (state.latency or 1.0):
+            return
+        state.limit = max(MIN_LIMIT, state.limit * factor)
+        state.low_limit = min(state.low_limit, state.limit)
+        state.last_cut = now
+        state.cuts += 1
+
+    @contextmanager
+    def slot(self, host: str) -> Iterator[None]:
+        """Hold a slot without feedback (the limit is unchanged)."""
+        self.acquire(host)
+        try:
+            yield
+        finally:
+            self.free(host)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._cond:
+            snapshot = {}
+            for host, state in sorted(self.hosts.items()):
+                data = asdict(state)
+                for key in ('cooldown_until', 'last_cut', 'in_flight'):
+                    data.pop(key)
+                for key in ('limit', 'peak_limit', 'low_limit', 'latency', 'best_latency', 'waited'):
+                    if data[key] is not None:
+                        data[key] = round(data[key], 3)
+                snapshot[host] = data
+            return snapshot
+
+    def print_summary(self):
+        for host, data in self.snapshot().items():
+            latency = f", ~{1000 * data['latency']:.0f} ms" if data['latency'] is not None else ""
+            print(f"🚦 {host}: limit {data['limit']:.1f} (range {data['low_limit']:.1f}-{data['peak_limit']:.1f}), "
+                  f"{data['requests']} requests, {data['throttled']} throttled, {data['errors']} errors{latency}")
+
+
+class LimitedAdapter(HTTPAdapter):
+    """HTTPAdapter that sends through a HostLimiter and feeds it status, latency and Retry-After."""
+
+    def __init__(self, limiter: HostLimiter, **kwargs):
+        self.limiter = limiter
+        super().__init__(**kwargs)
+
+    def send(self, request, stream=False, **kwargs):
+        host = urlsplit(request.url).netloc.lower()
+        reserved = _reserved.get()
+        if reserved is not None and host in reserved:
+            reserved.discard(host)  # Taken ahead by the caller
+        else:
+            self.limiter.acquire(host)
+        start = time.monotonic()
+        try:
+            response = super().send(request, stream=stream, **kwargs)
+        except Exception:
+            self.limiter.release(host, failed=True)
+            raise
+        latency = time.monotonic() - start
+        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+        if stream:
+            # The body is read by the caller: keep the slot until the response is closed
+            self._release_on_close(response, host, latency, retry_after)
+            return response
+        try:
+            response.content  # Keep the slot until the body is in (Session.send would read it next)
+        except Exception:
+            self.limiter.release(host, failed=True)
+            raise
+        self.limiter.release(host, response.status_code, latency, retry_after)
+        return response
+
+    def _release_on_close(self, response, host: str, latency: float, retry_after: Optional[float]):
+        limiter, status, released = self.limiter, response.status_code, []
+
+        def release():
+            if not released:
+                released.append(True)
+                limiter.release(host, status, latency, retry_after)
+
+        close = response.close
+
+        def close_and_release():
+            try:
+                close()
+            finally:
+                release()
+
+        response.close = close_and_release
+        weakref.finalize(response, release)  # A response dropped unclosed still frees its slot
@@ -0,0 +1,351 @@
+"""
+Persistent HTTP Response Cache
+------------------------------
+Shared on-disk cache for every script that downloads source pages
+(`webpage_to_markdown.py`, `content_factory/factory.py`, `get_cogesto_context.py`).
+
+Layout (under `.http_cache/` at the repo root by default):
+    index.json            url -> {sha256, etag, last_modified, fetched_at, accessed_at, size, ...}
+    objects/ab/abcdef...  response bodies, stored once per content hash
+    files/abcdef....html  body copies with a file extension, for tools that want a path
+
+Behaviour:
+- Fresh entries (younger than `ttl`) are served without touching the network.
+- Stale entries are revalidated with If-None-Match / If-Modified-Since; a 304
+  refreshes the entry and reuses the stored body.
+- When the total body size exceeds `max_bytes`, least recently used entries
+  are evicted and unreferenced bodies are deleted.
+- `offline=True` is cache-only: entries are served regardless of age and a
+  miss raises `CacheMiss` instead of going to the network.
+- `get(..., max_bytes=N)` streams the body and stops reading after N bytes
+  (large-document mode); a cut body is returned with `truncated=True` and
+  never stored.
+- The default session sends the scraper's browser `USER_AGENT`: some sites
+  reject `python-requests`.
+"""
+
+import atexit
+import hashlib
+import html
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# --- Configuration ---
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent / ".http_cache"
+DEFAULT_TTL = 24 * 3600             # Seconds before an entry needs revalidation
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_TIMEOUT = 15
+STREAM_CHUNK_SIZE = 64 * 1024
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36"
+# Attachments DSL commands that render the live page: a cached file has no layout
+LIVE_PAGE_COMMANDS = ('viewport', 'screenshot', 'fullpage', 'wait', 'click', 'scroll')
+HEAD_TAG = re.compile(rb'<head(?:\s[^>]*)?>', re.I)
+BASE_TAG = re.compile(rb'<base[\s>]', re.I)
+
+
+class CacheMiss(Exception):
+    """Raised in offline mode when a URL has never been cached."""
+
+
+@dataclass
+class CachedResponse:
+    url: str
+    status_code: int
+    content: bytes = b""
+    headers: Dict[str, str] = field(default_factory=dict)
+    from_cache: bool = False   # Body came from disk (fresh hit, 304 or offline)
+    revalidated: bool = False  # A conditional request was answered with 304
+    truncated: bool = False    # Body was cut at `max_bytes`
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}")
+
+
+def default_session() -> requests.Session:
+    session = requests.Session()
+    session.headers['User-Agent'] = USER_AGENT
+    return session
+
+
+def with_base_href(body: bytes, url: str) -> bytes:
+    """HTML with a <base href> to `url`, so relative links and images still resolve from a local copy."""
+    if BASE_TAG.search(body):
+        return body
+    tag = f'<base href="{html.escape(url)}">'.encode('utf-8')
+    head = HEAD_TAG.search(body)
+    if head is None:
+        return tag + body
+    return body[:head.end()] + tag + body[head.end():]
+
+
+def sha256_hex(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def read_capped(response: requests.Response, max_bytes: int) -> Tuple[bytes, bool]:
+    """Read a `stream=True` response up to `max_bytes`; returns (body, truncated)."""
+    body = bytearray()
+    try:
+        for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+            room = max_bytes - len(body)
+            if len(chunk) > room:
+                body += chunk[:room]
+                return bytes(body), True
+            body += chunk
+        return bytes(body), False
+    finally:
+        response.close()  # The rest of an oversized body is never downloaded
+
+
+def get_capped(session: requests.Session, url: str, max_bytes: int,
+               **kwargs) -> CachedResponse:
+    """`session.get(url, **kwargs)` that never holds more than `max_bytes` of body."""
+    response = session.get(url, stream=True, **kwargs)
+    body, truncated = read_capped(response, max_bytes)
+    return CachedResponse(url=url, status_code=response.status_code, content=body,
+                          headers=CaseInsensitiveDict(response.headers), truncated=truncated)
+
+
+def atomic_write_bytes(path: Path, data: bytes):
+    """Write to a temp file in the same directory, then rename over `path`."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+class HTTPCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, ttl: float = DEFAULT_TTL,
+                 max_bytes: int = DEFAULT_MAX_BYTES, offline: bool = False,
+                 session: Optional[requests.Session] = None):
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.session = session or default_session()
+        self._lock = threading.Lock()
+        self._index_path = self.cache_dir / "index.json"
+        self._index: Dict[str, Dict] = self._load_index()
+        self._dirty = False
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "evicted": 0}
+        # Access times are only persisted in batches; make sure they land
+        atexit.register(self.flush)
+
+    # --- Index ---------------------------------------------------------
+
+    def _load_index(self) -> Dict[str, Dict]:
+        try:
+            with open(self._index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_index(self):
+        data = json.dumps(self._index, ensure_ascii=False).encode('utf-8')
+        atomic_write_bytes(self._index_path, data)
+
+    def _object_path(self, digest: str) -> Path:
+        return self.cache_dir / "objects" / digest[:2] / digest
+
+    def _read_body(self, entry: Dict) -> Optional[bytes]:
+        try:
+            return self._object_path(entry["sha256"]).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def _store(self, url: str, response, body: bytes) -> Dict:
+        digest = sha256_hex(body)
+        obj = self._object_path(digest)
+        if not obj.exists():
+            atomic_write_bytes(obj, body)
+        now = time.time()
+        entry = {
+            "sha256": digest,
+            "size": len(body),
+            "status": response.status_code,
+            "content_type": response.headers.get("Content-Type", ""),
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "fetched_at": now,
+            "accessed_at": now,
+        }
+        with self._lock:
+            self._index[url] = entry
+            self._evict_locked()
+            self._save_index()
+            self._dirty = False
+        return entry
+
+    def _touch(self, url: str, revalidated: bool = False):
+        with self._lock:
+            entry = self._index.get(url)
+            if entry is None:
+                return
+            entry["accessed_at"] = time.time()
+            if revalidated:
+                entry["fetched_at"] = entry["accessed_at"]
+            self._dirty = True
+
+    def flush(self):
+        """Persist pending access-time updates."""
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+                self._dirty = False
+
+    def _evict_locked(self):
+        total = sum(e["size"] for e in self._index.values())
+        if total <= self.max_bytes:
+            return
+        for url, entry in sorted(self._index.items(), key=lambda kv: kv[1]["accessed_at"]):
+            if total <= self.max_bytes:
+                break
+            del self._index[url]
+            total -= entry["size"]
+            self.stats["evicted"] += 1
+        self._collect_garbage_locked()
+
+    def _collect_garbage_locked(self):
+        live = {e["sha256"] for e in self._index.values()}
+        objects = self.cache_dir / "objects"
+        if not objects.exists():
+            return
+        for path in objects.glob("*/*"):
+            if path.name not in live:
+                path.unlink(missing_ok=True)
+        files = self.cache_dir / "files"
+        if files.exists():
+            for path in files.iterdir():
+                if path.stem not in live:
+                    path.unlink(missing_ok=True)
+
+    # --- Public API ------------------------------------------------------
+
+    def lookup(self, url: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._index.get(url)
+            return dict(entry) if entry else None
+
+    def peek(self, url: str) -> Optional[bytes]:
+        """The stored body, whatever its age; never touches the network or access times."""
+        entry = self.lookup(url)
+        return self._read_body(entry) if entry else None
+
+    def is_fresh(self, entry: Dict) -> bool:
+        return (time.time() - entry["fetched_at"]) < self.ttl
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None,
+            timeout: float = DEFAULT_TIMEOUT,
+            session: Optional[requests.Session] = None,
+            max_bytes: Optional[int] = None) -> CachedResponse:
+        """
+        Return the page body, from disk when possible. Non-2xx responses are
+        returned as-is and never stored, so callers keep their own retry logic.
+        `session` overrides the cache's own session (e.g. a pooled one).
+        `max_bytes` caps the body read from the network or disk.
+        """
+        entry = self.lookup(url)
+        body = self._read_body(entry) if entry else None
+        if entry and body is None:
+            entry = None  # Index points at a body that was deleted by hand
+
+        if entry and (self.offline or self.is_fresh(entry)):
+            self._touch(url)
+            self.stats["hits"] += 1
+            return self._cached_response(url, entry, body, max_bytes)
+
+        if self.offline:
+            raise CacheMiss(f"Not in cache (offline mode): {url}")
+
+        request_headers = dict(headers or {})
+        if entry:
+            if entry.get("etag"):
+                request_headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                request_headers["If-Modified-Since"] = entry["last_modified"]
+
+        if max_bytes is None:
+            response = (session or self.session).get(url, headers=request_headers, timeout=timeout)
+            response = CachedResponse(url=url, status_code=response.status_code, content=response.content,
+                                      headers=CaseInsensitiveDict(response.headers))
+        else:
+            response = get_capped(session or self.session, url, max_bytes,
+                                  headers=request_headers, timeout=timeout)
+
+        if response.status_code == 304 and entry:
+            self._touch(url, revalidated=True)
+            self.stats["revalidated"] += 1
+            cached = self._cached_response(url, entry, body, max_bytes)
+            cached.revalidated = True
+            return cached
+
+        self.stats["misses"] += 1
+        if 200 <= response.status_code < 300 and not response.truncated:
+            self._store(url, response, response.content)
+        return response
+
+    def get_path(self, url: str, suffix: str = ".html", base_href: bool = False, **kwargs) -> Path:
+        """
+        Fetch through the cache and return a local file holding the body, for
+        tools that take paths rather than bytes (e.g. `Attachments`). With
+        `base_href`, an HTML copy points its relative URLs back at `url`.
+        """
+        response = self.get(url, **kwargs)
+        response.raise_for_status()
+        body, name = response.content, sha256_hex(response.content)
+        if base_href and 'html' in response.headers.get('Content-Type', 'html'):
+            body, name = with_base_href(body, url), f"{name}-{sha256_hex(url.encode('utf-8'))[:8]}"
+        path = self.cache_dir / "files" / f"{name}{suffix}"
+        if not path.exists():
+            atomic_write_bytes(path, body)
+        return path
+
+    def local_sources(self, sources: List[str]) -> List[str]:
+        """
+        Map `Attachments`-style sources to cached local files. Any DSL suffix
+        such as `[select:main]` is kept on the returned path; sources with a
+        command that renders the live page (LIVE_PAGE_COMMANDS) stay remote.
+        """
+        local = []
+        for source in sources:
+            url, bracket, dsl = source.partition('[')
+            commands = re.findall(r'\[(\w+)', bracket + dsl)
+            if not url.startswith('http') or any(command in LIVE_PAGE_COMMANDS for command in commands):
+                local.append(source)
+                continue
+            path = self.get_path(url, base_href=True)
+            local.append(f"{path}{bracket}{dsl}")
+        return local
+
+    def _cached_response(self, url: str, entry: Dict, body: bytes,
+                         max_bytes: Optional[int] = None) -> CachedResponse:
+        truncated = max_bytes is not None and len(body) > max_bytes
+        return CachedResponse(
+            url=url,
+            status_code=entry.get("status", 200),
+            content=body[:max_bytes] if truncated else body,
+            headers={"Content-Type": entry.get("content_type", "")},
+            from_cache=True,
+            truncated=truncated,
+        )
+
+    def summary(self) -> str:
+        s = self.stats
+        return f"cache: {s['hits']} hits, {s['revalidated']} revalidated, {s['misses']} misses, {s['evicted']} evicted"
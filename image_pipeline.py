@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Responsive Image Pipeline
+-------------------------
+Generates resized WebP / AVIF variants of the source images in
+public/assets and public/Media so components can serve a `srcset` instead
+of the full-size originals.
+
+- Every JPEG / PNG / WebP is encoded at each breakpoint width below its own
+  width (never upscaled), plus one variant at its original width when that
+  is below the largest breakpoint.
+- Variants go to public/optimized/<same relative path>/<name>-<hash8>-<w>w.<fmt>;
+  the short source hash in the name busts browser caches when a source is
+  replaced.
+- Encoding runs in a process pool (Pillow is CPU bound).
+- image_manifest.json records each source's SHA-256, the encoder settings
+  and its variants: only new or changed files are re-encoded, variants of
+  changed or deleted sources are removed.
+- src/lib/responsive_images.json maps each original public URL to its
+  width, height and per-format srcset strings:
+
+    {"/assets/hero.jpg": {"width": 2400, "height": 1600,
+                          "srcset": {"avif": "/optimized/assets/hero-1a2b3c4d-480w.avif 480w, ...",
+                                     "webp": "..."}}}
+
+Requires Pillow (`pip install pillow`); AVIF needs a Pillow build with AVIF
+support, otherwise only WebP is produced.
+
+Usage:
+    python image_pipeline.py [--workers 8] [--formats webp avif] [--widths 480 768 1024 1440 1920]
+    python image_pipeline.py --force       # Re-encode everything
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # Only needed when there is something to encode
+    Image = ImageOps = features = None
+
+from http_cache import atomic_write_bytes
+
+# --- Configuration ---
+REPO_ROOT = Path(__file__).resolve().parent
+PUBLIC_DIR = REPO_ROOT / "public"
+SOURCE_DIRS = ("assets", "Media")                 # Relative to public/
+OUTPUT_DIR = "optimized"                          # Relative to public/
+MANIFEST_FILE = REPO_ROOT / "image_manifest.json"
+SRCSET_FILE = REPO_ROOT / "src" / "lib" / "responsive_images.json"
+DEFAULT_WIDTHS = (480, 768, 1024, 1440, 1920)
+DEFAULT_FORMATS = ("webp", "avif")
+QUALITY = {"webp": 78, "avif": 55}
+SOURCE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+
+Job = Tuple[str, str, str, Tuple[int, ...], Tuple[str, ...]]  # (source, rel path, sha256, widths, formats)
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def format_supported(fmt: str) -> bool:
+    try:
+        return bool(features.check(fmt))
+    except (ValueError, AttributeError):
+        return False
+
+
+def settings_version(widths: Tuple[int, ...], formats: Tuple[str, ...]) -> str:
+    settings = {'widths': list(widths), 'formats': list(formats),
+                'quality': {fmt: QUALITY[fmt] for fmt in formats}}
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+def target_widths(width: int, widths: Tuple[int, ...]) -> List[int]:
+    """Breakpoints below the source width, plus the source width itself if it is smaller than the largest."""
+    targets = [w for w in widths if w < width]
+    if width <= max(widths):
+        targets.append(width)
+    return sorted(set(targets))
+
+
+def variant_rel(rel: str, sha: str, width: int, fmt: str) -> str:
+    stem, _ = os.path.splitext(rel)
+    return f"{OUTPUT_DIR}/{stem}-{sha[:8]}-{width}w.{fmt}"
+
+
+def encode_image(job: Job) -> Dict[str, Any]:
+    """Worker: every (width, format) variant of one source image."""
+    source, rel, sha, widths, formats = job
+    with Image.open(source) as opened:
+        width, height = opened.size
+        if opened.getexif().get(0x0112) in (5, 6, 7, 8):  # EXIF orientation rotates by 90 degrees
+            width, height = height, width
+        if opened.format == 'JPEG':
+            # Let libjpeg decode at a reduced scale that still covers the largest variant
+            opened.draft('RGB', (max(widths), max(widths)))
+        img = ImageOps.exif_transpose(opened)
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA' if 'transparency' in img.info or img.mode in ('LA', 'PA', 'P') else 'RGB')
+        variants = []
+        # Largest first, each step resized from the previous one: cheaper than from the original every time
+        current = img
+        for w in sorted(target_widths(width, widths), reverse=True):
+            if w != current.width:
+                current = current.resize((w, max(1, round(height * w / width))), Image.LANCZOS, reducing_gap=3.0)
+            for fmt in formats:
+                out_rel = variant_rel(rel, sha, w, fmt)
+                out_path = PUBLIC_DIR / out_rel
+                out_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = out_path.with_name(f".tmp-{os.getpid()}-{out_path.name}")
+                current.save(tmp, format=fmt.upper(), quality=QUALITY[fmt])
+                os.replace(tmp, out_path)
+                variants.append({'path': out_rel, 'width': w, 'format': fmt, 'bytes': out_path.stat().st_size})
+    return {'rel': rel, 'sha256': sha, 'width': width, 'height': height,
+            'bytes': os.path.getsize(source), 'variants': variants}
+
+
+def find_sources(source_dirs=SOURCE_DIRS) -> Dict[str, Path]:
+    sources = {}
+    for directory in source_dirs:
+        for path in sorted((PUBLIC_DIR / directory).rglob('*')):
+            if path.is_file() and path.suffix.lower() in SOURCE_EXTENSIONS:
+                sources[path.relative_to(PUBLIC_DIR).as_posix()] = path
+    return sources
+
+
+def load_manifest(path: Optional[Path] = None) -> Dict[str, Any]:
+    path = path or MANIFEST_FILE
+    if not path.exists():
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f).get('images', {})
+
+
+def remove_variants(entry: Dict[str, Any]):
+    for variant in entry.get('variants', []):
+        (PUBLIC_DIR / variant['path']).unlink(missing_ok=True)
+
+
+def srcset_map(manifest: Dict[str, Any]) -> Dict[str, Any]:
+    result = {}
+    for rel, entry in sorted(manifest.items()):
+        by_format: Dict[str, List[str]] = {}
+        for variant in sorted(entry['variants'], key=lambda v: v['width']):
+            by_format.setdefault(variant['format'], []).append(f"/{variant['path']} {variant['width']}w")
+        result[f"/{rel}"] = {'width': entry['width'], 'height': entry['height'],
+                             'srcset': {fmt: ", ".join(items) for fmt, items in by_format.items()}}
+    return result
+
+
+def write_json(path: Path, data: Any):
+    atomic_write_bytes(path, json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8'))
+
+
+def run_pipeline(widths: Tuple[int, ...] = DEFAULT_WIDTHS, formats: Tuple[str, ...] = DEFAULT_FORMATS,
+                 workers: Optional[int] = None, force: bool = False) -> Dict[str, Any]:
+    if Image is None:
+        print("❌ Pillow is required: pip install pillow")
+        sys.exit(1)
+    unsupported = [fmt for fmt in formats if not format_supported(fmt)]
+    if unsupported:
+        print(f"⚠️  This Pillow build cannot encode {', '.join(unsupported)}; skipping.")
+        formats = tuple(fmt for fmt in formats if fmt not in unsupported)
+    version = settings_version(widths, formats)
+
+    manifest = load_manifest()
+    sources = find_sources()
+
+    # Sources that disappeared: drop their variants
+    for rel in [rel for rel in manifest if rel not in sources]:
+        remove_variants(manifest.pop(rel))
+        print(f"🗑️  Removed variants of deleted {rel}")
+
+    jobs: List[Job] = []
+    for rel, path in sources.items():
+        sha = file_sha256(path)
+        entry = manifest.get(rel)
+        up_to_date = (entry is not None and not force and entry['sha256'] == sha
+                      and entry.get('settings') == version
+                      and all((PUBLIC_DIR / v['path']).exists() for v in entry['variants']))
+        if not up_to_date:
+            jobs.append((str(path), rel, sha, tuple(widths), tuple(formats)))
+
+    print(f"🖼️  {len(sources)} source images, {len(sources) - len(jobs)} up to date, {len(jobs)} to encode "
+          f"({', '.join(formats)} at {', '.join(map(str, widths))}px)")
+
+    start = time.perf_counter()
+    failed = 0
+    source_bytes = variant_bytes = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(encode_image, job): job[1] for job in jobs}
+            for future in as_completed(futures):
+                rel = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    failed += 1
+                    print(f"❌ {rel}: {e}")
+                    continue
+                old = manifest.get(rel)
+                if old is not None:
+                    fresh = {v['path'] for v in result['variants']}
+                    remove_variants({'variants': [v for v in old['variants'] if v['path'] not in fresh]})
+                result['settings'] = version
+                manifest[rel] = {k: v for k, v in result.items() if k != 'rel'}
+                if result['variants']:
+                    top = max(v['width'] for v in result['variants'])
+                    source_bytes += result['bytes']
+                    variant_bytes += min(v['bytes'] for v in result['variants'] if v['width'] == top)
+                print(f"   ✅ {rel} -> {len(result['variants'])} variants")
+    finally:
+        # Keep what was encoded even if the run is interrupted
+        write_json(MANIFEST_FILE, {'images': dict(sorted(manifest.items()))})
+        write_json(SRCSET_FILE, srcset_map(manifest))
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ Encoded {len(jobs) - failed}/{len(jobs)} images in {elapsed:.1f}s, {failed} failed.")
+    if source_bytes:
+        print(f"📉 Largest variant vs original: {variant_bytes / 2**20:.1f} MB vs {source_bytes / 2**20:.1f} MB "
+              f"(-{100 * (1 - variant_bytes / source_bytes):.0f}%)")
+    print(f"📄 Srcset map saved to: {SRCSET_FILE.relative_to(REPO_ROOT)}")
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate responsive WebP/AVIF variants of public images.")
+    parser.add_argument('--widths', type=int, nargs='+', default=list(DEFAULT_WIDTHS), help="Breakpoint widths in px")
+    parser.add_argument('--formats', nargs='+', choices=sorted(QUALITY), default=list(DEFAULT_FORMATS))
+    parser.add_argument('--workers', type=int, default=None, help="Encoder processes (default: one per core)")
+    parser.add_argument('--force', action='store_true', help="Re-encode every image")
+    args = parser.parse_args()
+
+    run_pipeline(tuple(sorted(set(args.widths))), tuple(args.formats), workers=args.workers, force=args.force)
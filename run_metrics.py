@@ -0,0 +1,235 @@
+"""
+Run Metrics
+-----------
+Per-stage instrumentation shared by the scraper (`process_urls`) and the
+content factories (`run_content_factory`, `run_factory`).
+
+Every item (a URL for the scraper, a slug for the factories) accumulates:
+    - stages:   seconds spent in fetch, parse, clean, extract, analyze,
+                build, validate and write (summed over calls, so parallel
+                per-source analyses add up),
+    - counters: bytes fetched, blocks produced, prompt/completion tokens,
+                retries, seconds held by the rate limiter, ...
+                Peak counters (`peak_rss_mb`) keep the largest value seen
+                instead of a sum, in items and in totals.
+
+Code running inside `metrics.stage(key, name)` can call the module-level
+`record(counter, amount)` without being handed the metrics object; this is
+how the LM wrappers report tokens and retries for the slug they serve.
+
+`write_report(path)` saves a machine-readable JSON run report; `live=True`
+prints one table row per item as it finishes, and `print_table()` prints
+the full summary with totals. With `track_hosts(limiter.snapshot)` the
+report and the table also show the adaptive per-host fetch limits (see
+host_limiter.py).
+
+Usage:
+    python webpage_to_markdown.py <URL1> <URL2> ... --report run.json --live
+    python run_metrics.py run.json     # Re-print the table of a saved report
+"""
+
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+STAGES = ('fetch', 'parse', 'clean', 'extract', 'analyze', 'build', 'validate', 'write')
+TABLE_COUNTERS = ('bytes', 'blocks', 'prompt_tokens', 'completion_tokens', 'retries')
+PEAK_COUNTERS = ('peak_rss_mb',)
+
+# (metrics, item key) of the stage running in the current thread / task
+_current: ContextVar[Optional[Tuple['RunMetrics', str]]] = ContextVar('run_metrics_current', default=None)
+
+
+def record(counter: str, amount: float = 1):
+    """Add to a counter of the item whose stage is currently running (no-op outside one)."""
+    current = _current.get()
+    if current is not None:
+        metrics, key = current
+        metrics.add(key, counter, amount)
+
+
+def timed(metrics: Optional['RunMetrics'], key: str, stage: str):
+    """`metrics.stage(key, stage)`, or a no-op when no metrics are being collected."""
+    return metrics.stage(key, stage) if metrics is not None else nullcontext()
+
+
+def reset_peak_rss() -> bool:
+    """
+    Reset this process's resident-memory high-water mark (Linux); False where
+    unsupported. Process-wide: call it once at the start of a run.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb() -> float:
+    """Peak resident memory since the last `reset_peak_rss()` (or process start), in MB."""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource  # No /proc: lifetime peak only (KB on Linux, bytes on macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (2**20 if sys.platform == 'darwin' else 1024)
+
+
+def _empty_item() -> Dict[str, Dict[str, float]]:
+    return {'stages': {}, 'counters': {}}
+
+
+class RunMetrics:
+    def __init__(self, run: str, live: bool = False, stages: Tuple[str, ...] = STAGES,
+                 counters: Tuple[str, ...] = TABLE_COUNTERS):
+        self.run = run
+        self.live = live
+        self.stages = stages  # Table columns
+        self.counters = counters
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.items: Dict[str, Dict[str, Dict[str, float]]] = {}
+        self._lock = threading.Lock()
+        self._header_printed = False
+        self._hosts: Optional[Callable[[], Dict[str, Dict[str, Any]]]] = None
+
+    def track_hosts(self, snapshot: Callable[[], Dict[str, Dict[str, Any]]]):
+        """Report per-host fetch limits from `snapshot()` (HostLimiter.snapshot)."""
+        self._hosts = snapshot
+
+    def hosts(self) -> Dict[str, Dict[str, Any]]:
+        return self._hosts() if self._hosts is not None else {}
+
+    def _item(self, key: str) -> Dict[str, Dict[str, float]]:
+        if key not in self.items:
+            self.items[key] = _empty_item()
+        return self.items[key]
+
+    def add_time(self, key: str, stage: str, seconds: float):
+        with self._lock:
+            stages = self._item(key)['stages']
+            stages[stage] = stages.get(stage, 0.0) + seconds
+
+    def add(self, key: str, counter: str, amount: float = 1):
+        with self._lock:
+            counters = self._item(key)['counters']
+            counters[counter] = counters.get(counter, 0) + amount
+
+    def peak(self, key: str, counter: str, value: float):
+        """Keep the largest `value` reported for `counter` (see PEAK_COUNTERS)."""
+        with self._lock:
+            counters = self._item(key)['counters']
+            counters[counter] = max(counters.get(counter, value), value)
+
+    @contextmanager
+    def stage(self, key: str, stage: str) -> Iterator[None]:
+        token = _current.set((self, key))
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(key, stage, time.perf_counter() - start)
+            _current.reset(token)
+
+    def finish(self, key: str, status: str = "ok"):
+        """Mark an item done; prints its row when running live."""
+        with self._lock:
+            self._item(key)['status'] = status
+        if self.live:
+            if not self._header_printed:
+                print(self._header())
+                self._header_printed = True
+            print(self._row(key, self.items[key]))
+
+    def totals(self) -> Dict[str, Dict[str, float]]:
+        totals = _empty_item()
+        with self._lock:
+            for item in self.items.values():
+                for group in ('stages', 'counters'):
+                    for name, value in item[group].items():
+                        if name in PEAK_COUNTERS:
+                            totals[group][name] = max(totals[group].get(name, value), value)
+                        else:
+                            totals[group][name] = totals[group].get(name, 0) + value
+        return totals
+
+    def report(self) -> Dict[str, Any]:
+        totals = self.totals()
+        stage_total = sum(totals['stages'].values())
+        return {
+            'run': self.run,
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started_at)),
+            'wall_time': round(time.perf_counter() - self._start, 4),
+            'totals': totals,
+            # Where the time went: tells network-, parse- and LLM-bound runs apart
+            'stage_share': {name: round(seconds / stage_total, 4)
+                            for name, seconds in totals['stages'].items()} if stage_total else {},
+            'items': self.items,
+            **({'hosts': self.hosts()} if self._hosts is not None else {}),
+        }
+
+    def write_report(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2, ensure_ascii=False)
+        print(f"📈 Run report saved to: {path}")
+
+    def _header(self) -> str:
+        return f"{'item':<48} " + " ".join(f"{s:>8}" for s in self.stages) + " " + \
+            " ".join(f"{c[:10]:>10}" for c in self.counters)
+
+    def _row(self, key: str, item: Dict[str, Any]) -> str:
+        label = key if len(key) <= 48 else "…" + key[-47:]
+        return f"{label:<48} " + " ".join(f"{item['stages'].get(s, 0):>7.2f}s" for s in self.stages) + " " + \
+            " ".join(f"{int(item['counters'].get(c, 0)):>10}" for c in self.counters)
+
+    def print_table(self, wall_time: Optional[float] = None):
+        if not self.items:
+            return
+        print(self._header())
+        for key, item in self.items.items():
+            print(self._row(key, item))
+        print(self._row("TOTAL", self.totals()))
+        if wall_time is None:
+            wall_time = time.perf_counter() - self._start
+        print(f"⏱️  Wall time: {wall_time:.2f}s")
+        print_hosts(self.hosts())
+
+
+def print_hosts(hosts: Dict[str, Dict[str, Any]]):
+    """Per-host adaptive limits: final, lowest and highest, and what moved them."""
+    if not hosts:
+        return
+    print(f"{'host':<40} {'limit':>6} {'low':>6} {'peak':>6} {'requests':>9} {'throttled':>9} {'errors':>7} {'latency':>9}")
+    for host, data in hosts.items():
+        latency = f"{1000 * data['latency']:.0f}ms" if data.get('latency') is not None else "-"
+        print(f"{host[:40]:<40} {data['limit']:>6.1f} {data['low_limit']:>6.1f} {data['peak_limit']:>6.1f} "
+              f"{data['requests']:>9} {data['throttled']:>9} {data['errors']:>7} {latency:>9}")
+
+
+def print_report(path: str):
+    with open(path, 'r', encoding='utf-8') as f:
+        report = json.load(f)
+    seen = {stage for item in report['items'].values() for stage in item['stages']}
+    counters = {name for item in report['items'].values() for name in item['counters']}
+    metrics = RunMetrics(report['run'], stages=tuple(s for s in STAGES if s in seen),
+                         counters=TABLE_COUNTERS + tuple(c for c in PEAK_COUNTERS if c in counters))
+    metrics.items = report['items']
+    if 'hosts' in report:
+        metrics.track_hosts(lambda: report['hosts'])
+    metrics.print_table(wall_time=report['wall_time'])
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python run_metrics.py <run_report.json>")
+        sys.exit(1)
+    print_report(sys.argv[1])
@@ -0,0 +1,375 @@
+"""
+Site Crawler
+------------
+Discovers the pages of one site and feeds them straight into the block
+extractor of `webpage_to_markdown.py`, instead of listing every URL by hand.
+
+- Seeds from `sitemap.xml` (and any `Sitemap:` lines in robots.txt, including
+  sitemap indexes) when present, plus the start URL itself.
+- Follows same-site `<a href>` links breadth-first through a deduplicating
+  frontier, with URL normalization, a depth limit and a page limit.
+- Obeys robots.txt (Disallow rules for our user agent).
+- Fetches each frontier batch concurrently through `fetch_engine` and the
+  shared HTTP cache; with --adaptive the host's concurrency adapts to how
+  it responds, carried over from batch to batch (see host_limiter.py).
+- Persists crawl state (seen URLs, frontier, crawled pages) next to the
+  output so a large site can be crawled incrementally: re-running picks up
+  the frontier where the last run stopped. Blocks are appended to a JSONL
+  file (see block_stream.py), cut back to its size at the last checkpoint
+  first, so pages written after it are not left orphaned.
+- Failed fetches are recorded with their attempt count and re-queued by
+  the next run, up to MAX_FETCH_ATTEMPTS.
+
+Usage:
+    python site_crawler.py <ROOT_URL> [--max-pages 200] [--max-depth 3] [--output site.jsonl]
+    python webpage_to_markdown.py --crawl <ROOT_URL> ...
+"""
+
+import argparse
+import json
+import re
+import time
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+from urllib.robotparser import RobotFileParser
+from xml.etree import ElementTree
+
+import requests
+
+import fetch_engine
+from host_limiter import DEFAULT_MAX_LIMIT, HostLimiter
+from block_stream import BlockStreamWriter
+from http_cache import HTTPCache, atomic_write_bytes
+import webpage_to_markdown as scraper
+
+# --- Configuration ---
+DEFAULT_MAX_PAGES = 200
+DEFAULT_MAX_DEPTH = 3
+MAX_SITEMAPS = 50  # Upper bound on sitemap documents followed from an index
+MAX_FETCH_ATTEMPTS = 3  # Runs that may try a failing page before it is given up
+SKIP_EXTENSIONS = ('.pdf', '.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.zip',
+                   '.mp4', '.mp3', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx')
+TRACKING_PARAMS = re.compile(r'^(utm_|fbclid$|gclid$|mc_|_hs)')
+SITEMAP_NS = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form used for deduplication: lowercase scheme and host, no
+    default port, no fragment, no tracking parameters, sorted query, and
+    '/' for an empty path.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    port = parts.port
+    if port and not ((scheme == 'http' and port == 80) or (scheme == 'https' and port == 443)):
+        host = f"{host}:{port}"
+    path = re.sub(r'/{2,}', '/', parts.path) or '/'
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                             if not TRACKING_PARAMS.match(k)))
+    return urlunsplit((scheme, host, path, query, ''))
+
+
+def site_key(url: str) -> str:
+    """Host without a leading 'www.', so www/non-www count as one site."""
+    host = (urlsplit(url).hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def is_crawlable(url: str) -> bool:
+    parts = urlsplit(url)
+    return parts.scheme in ('http', 'https') and not parts.path.lower().endswith(SKIP_EXTENSIONS)
+
+
+def extract_links(soup, base_url: str) -> List[str]:
+    """Normalized absolute links of a parsed page, in document order."""
+    links = []
+    for a in soup.find_all('a', href=True):
+        href = a['href'].strip()
+        if not href or href.startswith(('#', 'mailto:', 'tel:', 'javascript:')):
+            continue
+        links.append(normalize_url(urljoin(base_url, href)))
+    return links
+
+
+def parse_sitemap(content: bytes) -> Tuple[List[str], List[str]]:
+    """Return (page urls, nested sitemap urls) from a sitemap or sitemap index."""
+    try:
+        root = ElementTree.fromstring(content)
+    except ElementTree.ParseError:
+        return [], []
+    locs = [el.text.strip() for el in root.iter(f'{SITEMAP_NS}loc') if el.text]
+    if root.tag == f'{SITEMAP_NS}sitemapindex':
+        return [], locs
+    return locs, []
+
+
+class CrawlState:
+    """Everything needed to resume a crawl, stored as one JSON file."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.seen: Set[str] = set()
+        self.frontier: Deque[Tuple[str, int]] = deque()
+        self.pages: Dict[str, Dict] = {}  # url -> {"page", "depth", "blocks", "crawled_at"}
+        self.failed: Dict[str, Dict] = {}  # url -> {"depth", "attempts", "error", "failed_at"}
+        self.next_page = 0
+        self.seeded = False
+        self.output_bytes: Optional[int] = None  # Size of the JSONL output at this checkpoint
+
+    @classmethod
+    def load(cls, path: Path) -> 'CrawlState':
+        state = cls(path)
+        if path.exists():
+            data = json.loads(path.read_text(encoding='utf-8'))
+            state.seen = set(data.get('seen', []))
+            state.frontier = deque((url, depth) for url, depth in data.get('frontier', []))
+            state.pages = data.get('pages', {})
+            state.failed = data.get('failed', {})
+            state.output_bytes = data.get('output_bytes')
+            state.next_page = data.get('next_page', 0)
+            state.seeded = data.get('seeded', False)
+        return state
+
+    def save(self):
+        data = {
+            'seen': sorted(self.seen),
+            'frontier': [list(item) for item in self.frontier],
+            'pages': self.pages,
+            'failed': self.failed,
+            'next_page': self.next_page,
+            'seeded': self.seeded,
+            'output_bytes': self.output_bytes,
+        }
+        atomic_write_bytes(self.path, json.dumps(data, ensure_ascii=False, indent=1).encode('utf-8'))
+
+    def enqueue(self, url: str, depth: int) -> bool:
+        if url in self.seen:
+            return False
+        self.seen.add(url)
+        self.frontier.append((url, depth))
+        return True
+
+    def record_failure(self, url: str, depth: int, error: Optional[str]):
+        attempts = self.failed.get(url, {}).get('attempts', 0) + 1
+        self.failed[url] = {'depth': depth, 'attempts': attempts, 'error': error, 'failed_at': time.time()}
+
+    def requeue_failed(self, max_attempts: int) -> int:
+        """Put the URLs that failed in earlier runs back in the frontier."""
+        queued = {url for url, _ in self.frontier}
+        retry = [(url, entry['depth']) for url, entry in self.failed.items()
+                 if entry['attempts'] < max_attempts and url not in queued]
+        for url, depth in retry:
+            self.seen.add(url)
+            self.frontier.append((url, depth))
+        return len(retry)
+
+
+class SiteCrawler:
+    def __init__(self, root_url: str, output_file: str, state_file: Optional[str] = None,
+                 max_pages: int = DEFAULT_MAX_PAGES, max_depth: int = DEFAULT_MAX_DEPTH,
+                 use_sitemap: bool = True, recrawl: bool = False,
+                 concurrency: int = fetch_engine.DEFAULT_CONCURRENCY,
+                 per_host: int = fetch_engine.DEFAULT_PER_HOST,
+                 cache: Optional[HTTPCache] = None,
+                 limiter: Optional[HostLimiter] = None):
+        self.root_url = normalize_url(root_url)
+        self.site = site_key(self.root_url)
+        self.output_file = output_file
+        self.state = CrawlState.load(Path(state_file or f"{output_file}.state.json"))
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.use_sitemap = use_sitemap
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.cache = cache
+        self.limiter = limiter
+        self.robots = RobotFileParser()
+        self.robots.allow_all = True  # Until robots.txt has been read
+        if recrawl:
+            # Keep the crawled-page record, rebuild the frontier from the root
+            self.state.frontier.clear()
+            self.state.seen = set()
+            self.state.seeded = False
+
+    # --- Fetching ------------------------------------------------------
+
+    def _get(self, url: str) -> Optional[bytes]:
+        headers = {'User-Agent': scraper.USER_AGENT}
+        try:
+            if self.cache is not None:
+                response = self.cache.get(url, headers=headers)
+            else:
+                response = requests.get(url, headers=headers, timeout=fetch_engine.DEFAULT_TIMEOUT)
+            if response.status_code >= 400:
+                return None
+            return response.content
+        except Exception as e:
+            print(f"⚠️  Could not fetch {url}: {e}")
+            return None
+
+    def _load_robots(self):
+        robots_url = urljoin(self.root_url, '/robots.txt')
+        content = self._get(robots_url)
+        self.robots = RobotFileParser(robots_url)
+        if content is None:
+            self.robots.allow_all = True
+            return
+        self.robots.parse(content.decode('utf-8', errors='replace').splitlines())
+
+    def allowed(self, url: str) -> bool:
+        return (is_crawlable(url) and site_key(url) == self.site
+                and self.robots.can_fetch(scraper.USER_AGENT, url))
+
+    def _sitemap_urls(self) -> List[str]:
+        queue = list(self.robots.site_maps() or []) or [urljoin(self.root_url, '/sitemap.xml')]
+        pages, visited = [], set()
+        while queue and len(visited) < MAX_SITEMAPS:
+            sitemap = queue.pop(0)
+            if sitemap in visited:
+                continue
+            visited.add(sitemap)
+            content = self._get(sitemap)
+            if content is None:
+                continue
+            found, nested = parse_sitemap(content)
+            pages.extend(found)
+            queue.extend(nested)
+        return [normalize_url(u) for u in pages]
+
+    # --- Crawl loop ----------------------------------------------------
+
+    def _seed(self):
+        self.state.enqueue(self.root_url, 0)
+        if self.use_sitemap:
+            sitemap_urls = self._sitemap_urls()
+            added = sum(self.state.enqueue(u, 1) for u in sitemap_urls if self.allowed(u))
+            print(f"🗺️  Sitemap: {len(sitemap_urls)} URLs, {added} queued")
+        self.state.seeded = True
+
+    def _next_batch(self, budget: int) -> List[Tuple[str, int]]:
+        batch = []
+        while self.state.frontier and len(batch) < budget:
+            url, depth = self.state.frontier.popleft()
+            if url in self.state.pages and not self._is_stale(url):
+                continue
+            if not self.allowed(url):
+                continue
+            batch.append((url, depth))
+        return batch
+
+    def _is_stale(self, url: str) -> bool:
+        # Only pages re-queued by --recrawl get visited twice
+        return self.state.pages[url].get('crawled_at', 0) < self._started
+
+    def crawl(self) -> int:
+        self._started = time.time()
+        self._load_robots()
+        if not self.state.seeded:
+            self._seed()
+        retried = self.state.requeue_failed(MAX_FETCH_ATTEMPTS)
+        if retried:
+            print(f"🔁 Retrying {retried} page(s) that failed in earlier runs")
+
+        crawled = 0
+        batch_size = max(1, self.concurrency * 2)
+        print(f"🕸️  Crawling {self.site} (max {self.max_pages} pages, depth {self.max_depth}, "
+              f"{len(self.state.frontier)} queued, {len(self.state.pages)} already crawled)")
+
+        with BlockStreamWriter(self.output_file, append=True, truncate_at=self.state.output_bytes) as writer:
+            while crawled < self.max_pages:
+                batch = self._next_batch(min(batch_size, self.max_pages - crawled))
+                if not batch:
+                    break
+                depths = dict(batch)
+                results = fetch_engine.run_fetch_all(
+                    [url for url, _ in batch], concurrency=self.concurrency, per_host=self.per_host,
+                    user_agent=scraper.USER_AGENT, cache=self.cache, limiter=self.limiter)
+
+                for result in results:
+                    if not result.ok:
+                        print(f"❌ {result.url}: {result.error}")
+                        self.state.record_failure(result.url, depths[result.url], result.error)
+                        continue
+                    self.state.failed.pop(result.url, None)
+                    if result.content_type and 'html' not in result.content_type.lower():
+                        continue
+                    depth = depths[result.url]
+                    soup = scraper.parse_html(result.content)
+                    # Links first: extract_blocks strips nav/header/footer
+                    if depth < self.max_depth:
+                        for link in extract_links(soup, result.url):
+                            if self.allowed(link):
+                                self.state.enqueue(link, depth + 1)
+                    blocks = scraper.extract_blocks(soup, result.url)
+
+                    page = self.state.next_page
+                    self.state.next_page += 1
+                    writer.write_page(page, [b.to_dict() for b in blocks], url=result.url)
+                    self.state.pages[result.url] = {'page': page, 'depth': depth, 'blocks': len(blocks),
+                                                    'crawled_at': time.time()}
+                    crawled += 1
+                    print(f"🔍 [{crawled}] {result.url} (depth {depth}, {len(blocks)} blocks)")
+
+                # Checkpoint after every batch so an interrupted crawl resumes here
+                self.state.output_bytes = writer.tell()
+                self.state.save()
+
+            self.state.output_bytes = writer.tell()
+        self.state.save()
+        print(f"✅ Crawled {crawled} pages this run ({len(self.state.pages)} total, "
+              f"{len(self.state.frontier)} still queued, {len(self.state.failed)} failed).")
+        print(f"📄 Blocks appended to: {self.output_file}")
+        if self.cache is not None:
+            self.cache.flush()
+            print(f"🗄️  {self.cache.summary()}")
+        if self.limiter is not None:
+            self.limiter.print_summary()
+        return crawled
+
+
+def default_crawl_output(root_url: str) -> str:
+    slug = re.sub(r'[^a-z0-9]+', '-', site_key(root_url)).strip('-') or 'site'
+    return f"crawl_{slug}.jsonl"
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Crawl a site into structured content blocks.")
+    parser.add_argument('root_url', help="Site root to start from")
+    add_crawl_arguments(parser)
+    parser.add_argument('--output', default=None, help="JSONL output (default: crawl_<host>.jsonl)")
+    parser.add_argument('--concurrency', type=int, default=fetch_engine.DEFAULT_CONCURRENCY)
+    parser.add_argument('--per-host', type=int, default=fetch_engine.DEFAULT_PER_HOST)
+    parser.add_argument('--adaptive', action='store_true', help="Adapt the per-host concurrency (AIMD), up to --max-per-host")
+    parser.add_argument('--max-per-host', type=int, default=DEFAULT_MAX_LIMIT)
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--offline', action='store_true')
+    return parser.parse_args(argv)
+
+
+def add_crawl_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--max-pages', type=int, default=DEFAULT_MAX_PAGES, help="Pages to crawl in this run")
+    parser.add_argument('--max-depth', type=int, default=DEFAULT_MAX_DEPTH, help="Link hops from the root")
+    parser.add_argument('--no-sitemap', action='store_true', help="Do not seed from sitemap.xml")
+    parser.add_argument('--state', default=None, help="Crawl state file (default: <output>.state.json)")
+    parser.add_argument('--recrawl', action='store_true', help="Revisit pages crawled in earlier runs")
+
+
+if __name__ == "__main__":
+    opts = parse_args()
+    SiteCrawler(
+        opts.root_url,
+        opts.output or default_crawl_output(opts.root_url),
+        state_file=opts.state,
+        max_pages=opts.max_pages,
+        max_depth=opts.max_depth,
+        use_sitemap=not opts.no_sitemap,
+        recrawl=opts.recrawl,
+        concurrency=opts.concurrency,
+        per_host=opts.per_host,
+        cache=None if opts.no_cache else HTTPCache(offline=opts.offline),
+        limiter=HostLimiter(opts.per_host, opts.max_per_host) if opts.adaptive else None,
+    ).crawl()
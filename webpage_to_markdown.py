@@ -13,25 +13,91 @@ It groups content by "Sections" (Headings) and attempts to identify:
 
 Usage:
     python webpage_to_markdown.py <URL1> <URL2> ... [output_filename]
+    python webpage_to_markdown.py --async --concurrency 16 --per-host 4 <URL1> <URL2> ...
+
+    python webpage_to_markdown.py --jsonl <URL1> <URL2> ... [output.jsonl]
+    python webpage_to_markdown.py --crawl <ROOT_URL> [--max-pages 200] [--max-depth 3] [output.jsonl]
+
+    --async fetches all pages concurrently (see fetch_engine.py) and parses
+    each page as soon as it arrives. Block order in the output is always the
+    order of the URLs on the command line.
+
+    Pages go through the shared on-disk cache (see http_cache.py) unless
+    --no-cache is given. --offline only reads from the cache, so extraction
+    heuristics can be iterated on without touching the source sites.
+
+    --parse-workers N parses pages in N worker processes (raw HTML in, compact
+    block records out) so large batches use every core; --chunk-size sets how
+    many pages go to a worker per task.
+
+    --jsonl streams each page's blocks to a JSON-lines file as soon as they
+    are extracted (see block_stream.py, which also rebuilds the merged JSON).
+
+    --dedupe collapses blocks repeated across pages (CTA, cookie, newsletter
+    sections...) into one block listing all its source URLs (see
+    block_dedupe.py). It is rejected with --jsonl / --crawl: dedupe when
+    merging instead (`python block_stream.py <blocks.jsonl> --dedupe`).
+
+    --crawl discovers pages from the site's sitemap.xml and same-site links
+    (see site_crawler.py) and appends their blocks to a JSONL file. Crawl
+    state is saved next to it, so re-running continues the crawl.
+
+    --report run.json saves per-URL stage timings (fetch, parse, clean,
+    extract, write), bytes, blocks, retries and the peak RSS while parsing
+    as a JSON run report (see run_metrics.py); --live prints a row per page
+    as it completes.
+
+    --adaptive lets each host's concurrency follow how it responds: from
+    --per-host it grows while responses stay fast and healthy, up to
+    --max-per-host (8), and is cut on 429 / 503, errors or climbing
+    latency; Retry-After pauses the host (see host_limiter.py). The
+    per-host limits are printed at the end and saved in --report.
+
+    --large-docs bounds the memory a heavy page can take: bodies are
+    streamed and cut at --max-bytes (5 MB by default), only <main> (and a
+    top-level <h1>) is parsed when the page has one, and scripts, styles,
+    SVGs, nav, header, footer, forms and hidden elements are dropped while
+    the tree is built instead of decomposed afterwards.
 
 Output:
     A JSON file containing structured content blocks from ALL pages, merged.
 """
 
 import sys
+import os
 import json
+import importlib.util
 import re
+import time
+import argparse
 import requests
-from bs4 import BeautifulSoup, Tag, NavigableString
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from bs4 import BeautifulSoup, SoupStrainer, Tag, NavigableString
+from bs4.element import CData
 from urllib.parse import urljoin
-from dataclasses import dataclass, field, asdict
-from typing import List, Optional, Dict, Any
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Dict, Any, Tuple
+
+import fetch_engine
+from host_limiter import DEFAULT_MAX_LIMIT, HostLimiter
+from block_dedupe import dedupe_document
+from block_stream import BlockStreamWriter
+from http_cache import USER_AGENT, HTTPCache, get_capped
+from run_metrics import PEAK_COUNTERS, TABLE_COUNTERS, RunMetrics, peak_rss_mb, reset_peak_rss, timed
 
 # --- Configuration ---
 MIN_SECTION_WORDS = 20  # Skip sections with less than this words
-USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36"
+PARSE_CHUNK_SIZE = 4    # Pages handed to a parser worker per task
+SECTION_STOP_TAGS = ('h1', 'h2', 'header', 'footer')
+SCRAPE_STAGES = ('fetch', 'parse', 'clean', 'extract', 'write')
+NOISE_TAGS = ('script', 'style', 'noscript', 'iframe', 'svg', 'header', 'footer', 'nav', 'form')
+HIDDEN_STYLE = re.compile(r'display:\s*none')
+LARGE_DOC_MAX_BYTES = 5 * 1024 * 1024  # Default body cap in --large-docs mode
+MAIN_REGION = re.compile(rb'<main[\s>]', re.I)
+
+HTML_PARSER = 'lxml' if importlib.util.find_spec('lxml') else 'html.parser'
 
-@dataclass
+@dataclass(slots=True)
 class ContentBlock:
     type: str  # 'hero', 'section', 'grid', 'text', 'image'
     heading: Optional[str] = None
@@ -42,23 +108,115 @@ class ContentBlock:
     word_count: int = 0
     source_url: Optional[str] = None # Track where this block came from
 
-def fetch_html(url: str) -> BeautifulSoup:
+    def to_dict(self) -> Dict[str, Any]:
+        """Same result as dataclasses.asdict, without its recursive deep copy."""
+        return {
+            'type': self.type,
+            'heading': self.heading,
+            'content': list(self.content),
+            'images': [dict(img) for img in self.images],
+            'links': [dict(link) for link in self.links],
+            'suggested_component': self.suggested_component,
+            'word_count': self.word_count,
+            'source_url': self.source_url,
+        }
+
+    def to_record(self) -> tuple:
+        """Compact positional form, cheap to pickle between processes."""
+        return (self.type, self.heading, self.content, self.images, self.links,
+                self.suggested_component, self.word_count, self.source_url)
+
+    @classmethod
+    def from_record(cls, record: tuple) -> 'ContentBlock':
+        return cls(*record)
+
+# Called with (url index, url, blocks) once per successfully scraped page
+PageCallback = Callable[[int, str, List[ContentBlock]], None]
+
+def fetch_html(url: str, cache: Optional[HTTPCache] = None, large: bool = False,
+               session: Optional[requests.Session] = None) -> BeautifulSoup:
+    content = fetch_bytes(url, cache, max_bytes=LARGE_DOC_MAX_BYTES if large else None, session=session)
+    if content is None:
+        return None
+    return parse_large(content) if large else parse_html(content)
+
+def fetch_bytes(url: str, cache: Optional[HTTPCache] = None,
+                max_bytes: Optional[int] = None,
+                session: Optional[requests.Session] = None) -> Optional[bytes]:
+    """`session` (e.g. one built with a HostLimiter) replaces the default one for network requests."""
     try:
         headers = {'User-Agent': USER_AGENT}
-        response = requests.get(url, headers=headers, timeout=15)
+        if cache is not None:
+            response = cache.get(url, headers=headers, timeout=15, max_bytes=max_bytes, session=session)
+        elif max_bytes is not None:
+            response = get_capped(session or requests, url, max_bytes, headers=headers, timeout=15)
+        else:
+            response = (session or requests).get(url, headers=headers, timeout=15)
         response.raise_for_status()
-        return BeautifulSoup(response.content, 'html.parser')
+        if getattr(response, 'truncated', False):
+            print(f"⚠️  {url}: body cut at {max_bytes} bytes")
+        return response.content
     except Exception as e:
         print(f"❌ Error fetching URL {url}: {e}")
         return None
 
+def parse_html(content: bytes) -> BeautifulSoup:
+    return BeautifulSoup(content, HTML_PARSER)
+
+class PrunedSoup(BeautifulSoup):
+    """
+    BeautifulSoup that never builds what `clean_soup` would remove: NOISE_TAGS
+    and inline-hidden elements are skipped, with everything inside them, as
+    the tree builder reports them. Text on either side of a skipped element
+    stays in separate strings, so extraction sees the same tree as after
+    `clean_soup`.
+
+    html.parser does not close elements implicitly (`<p>a<p>b`, `<li>x<li>y`),
+    so a skipped element may never see its end tag. Like the tree it would
+    have been built into, it is closed by the end tag of any element open
+    around it.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._skipped: List[str] = []  # Open elements being skipped, outermost first
+        super().__init__(*args, **kwargs)
+
+    def handle_starttag(self, name, namespace, nsprefix, attrs, *args, **kwargs):
+        if not self._skipped:
+            if name not in NOISE_TAGS and not HIDDEN_STYLE.search(attrs.get('style') or ''):
+                return super().handle_starttag(name, namespace, nsprefix, attrs, *args, **kwargs)
+            self.endData()
+        if not self.builder.can_be_empty_element(name):
+            # A void element (<img style="display: none">) has no content to skip
+            self._skipped.append(name)
+        return None
+
+    def handle_endtag(self, name, nsprefix=None):
+        if not self._skipped:
+            return super().handle_endtag(name, nsprefix)
+        if name in self._skipped:
+            # Closes the innermost open element of that name and whatever is still open in it
+            del self._skipped[len(self._skipped) - 1 - self._skipped[::-1].index(name):]
+        elif any(tag.name == name for tag in self.tagStack):
+            self._skipped.clear()
+            super().handle_endtag(name, nsprefix)
+
+    def handle_data(self, data):
+        if not self._skipped:
+            super().handle_data(data)
+
+def parse_large(content: bytes) -> BeautifulSoup:
+    """Bounded-memory parse: only <main> (plus a top-level <h1>) when present, noise pruned while parsing."""
+    strainer = SoupStrainer(['main', 'h1']) if MAIN_REGION.search(content) else None
+    return PrunedSoup(content, HTML_PARSER, parse_only=strainer)
+
 def clean_soup(soup: BeautifulSoup):
     """Remove clutter (nav, footer, ads, scripts)."""
-    for tag in soup(['script', 'style', 'noscript', 'iframe', 'svg', 'header', 'footer', 'nav', 'form']):
+    for tag in soup(list(NOISE_TAGS)):
         tag.decompose()
     
     # Remove hidden elements
-    for tag in soup.find_all(style=re.compile(r'display:\s*none')):
+    for tag in soup.find_all(style=HIDDEN_STYLE):
         tag.decompose()
 
 def extract_hero(soup: BeautifulSoup, url: str) -> Optional[ContentBlock]:
@@ -95,7 +253,7 @@ def get_section_content(start_node: Tag, url: str) -> ContentBlock:
     while current:
         if isinstance(current, Tag):
             # Stop at next major heading
-            if current.name in ['h1', 'h2', 'header', 'footer']:
+            if current.name in SECTION_STOP_TAGS:
                 break
             
             # Identify Content
@@ -125,7 +283,10 @@ def get_section_content(start_node: Tag, url: str) -> ContentBlock:
             
         current = current.next_sibling
     
-    # Heuristics for Component Suggestion
+    return suggest_component(block)
+
+def suggest_component(block: ContentBlock) -> ContentBlock:
+    """Heuristics for Component Suggestion."""
     text_length = sum(len(s) for s in block.content)
     block.word_count = text_length // 5
     
@@ -138,79 +299,471 @@ def get_section_content(start_node: Tag, url: str) -> ContentBlock:
         
     return block
 
-def process_urls(urls: List[str], output_file: Optional[str] = None):
-    all_blocks = []
-    processed_count = 0
+class SectionExtractor:
+    """
+    Single-pass replacement for calling `get_section_content` once per heading.
 
-    print(f"🚀 Starting multi-page scrape for {len(urls)} URLs...")
+    One iterative traversal of the cleaned tree flattens it into document-order
+    arrays (stripped text fragments, <img> tags, <li> tags) and records, for
+    every element, the slice of each array that its subtree covers. A
+    sibling's `get_text(strip=True)`, `find_all('img')` and `find_all('li')`
+    then become slice lookups instead of fresh subtree walks, and each
+    sibling's contribution is computed once even when headings share it.
+    Output is identical to `get_section_content`.
+    """
+
+    def __init__(self, root: Tag):
+        self.strings: List[str] = []
+        self.images: List[Tag] = []
+        self.items: List[Tag] = []
+        self.spans: Dict[int, tuple] = {}
+        self._texts: Dict[int, str] = {}
+        self._parts: Dict[int, tuple] = {}
+        self._index(root)
+
+    def _index(self, root: Tag):
+        # Explicit stack instead of recursion: deep nesting must not hit the recursion limit
+        stack = [(root, iter(root.contents), len(self.strings), len(self.images), len(self.items))]
+        while stack:
+            node, children, s0, i0, l0 = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                self.spans[id(node)] = (s0, len(self.strings), i0, len(self.images), l0, len(self.items))
+                continue
+            if isinstance(child, Tag):
+                if child.name == 'img':
+                    self.images.append(child)
+                elif child.name == 'li':
+                    self.items.append(child)
+                stack.append((child, iter(child.contents), len(self.strings), len(self.images), len(self.items)))
+            elif type(child) in (NavigableString, CData):
+                # Same string types (and stripping) as Tag.get_text(strip=True)
+                text = child.strip()
+                if text:
+                    self.strings.append(text)
+
+    def text(self, node: Tag) -> str:
+        key = id(node)
+        if key not in self._texts:
+            s0, s1 = self.spans[key][:2]
+            self._texts[key] = ''.join(self.strings[s0:s1])
+        return self._texts[key]
+
+    def _contribution(self, node: Tag, url: str) -> tuple:
+        """(texts, images, list_items) one sibling adds to its section."""
+        key = id(node)
+        if key in self._parts:
+            return self._parts[key]
+
+        texts, images, items = [], [], []
+        if node.name in ['p', 'div', 'span']:
+            text = self.text(node)
+            if len(text) > 10: # Filter noise
+                texts.append(text)
+
+        _, _, i0, i1, l0, l1 = self.spans[key]
+        candidates = ([node] if node.name == 'img' else []) + self.images[i0:i1]
+        for img in candidates:
+            src = img.get('src')
+            if src:
+                images.append({'src': resolve_image_url(url, src), 'alt': img.get('alt', '')})
+
+        if node.name in ['ul', 'ol']:
+            items = [t for t in (self.text(li) for li in self.items[l0:l1]) if t]
+
+        self._parts[key] = (texts, images, items)
+        return self._parts[key]
+
+    def section(self, start_node: Tag, url: str) -> ContentBlock:
+        block = ContentBlock(type='section', heading=self.text(start_node), source_url=url)
+
+        for current in start_node.next_siblings:
+            if not isinstance(current, Tag):
+                continue
+            if current.name in SECTION_STOP_TAGS:
+                break
+            texts, images, items = self._contribution(current, url)
+            block.content.extend(texts)
+            # Copy so blocks never share image dicts
+            block.images.extend(dict(img) for img in images)
+            if len(items) > 2:
+                block.type = 'grid_candidate'
+                block.content.extend(items)
+
+        return suggest_component(block)
+
+def extract_blocks(soup: BeautifulSoup, url: str) -> List[ContentBlock]:
+    """Clean a parsed page and return its hero + section blocks in page order."""
+    clean_soup(soup)
+    return extract_sections(soup, url)
+
+def extract_sections(soup: BeautifulSoup, url: str) -> List[ContentBlock]:
+    """Hero + section blocks of an already cleaned page."""
+    blocks = []
+
+    # 1. Extract Hero
+    hero = extract_hero(soup, url)
+    if hero:
+        blocks.append(hero)
+
+    # 2. Extract Sections by Headings (H2)
+    headings = soup.find_all('h2')
+    if not headings:
+        # Fallback to H3 if no H2s
+        headings = soup.find_all('h3')
+
+    extractor = SectionExtractor(soup)
+    for h2 in headings:
+        block = extractor.section(h2, url)
+        if block.word_count >= MIN_SECTION_WORDS: # Filter empty/tiny sections
+            blocks.append(block)
+
+    return blocks
+
+def extract_page(content: bytes, url: str, large: bool = False) -> Tuple[List[ContentBlock], Dict[str, float]]:
+    """
+    Parse, clean and extract one page; also returns seconds spent per stage
+    and the process's peak RSS (MB) so far in the run (process_urls resets
+    it once at the start).
+    """
+    t0 = time.perf_counter()
+    soup = parse_large(content) if large else parse_html(content)
+    t1 = time.perf_counter()
+    clean_soup(soup)  # Finds nothing left to remove after parse_large
+    t2 = time.perf_counter()
+    blocks = extract_sections(soup, url)
+    t3 = time.perf_counter()
+    return blocks, {'parse': t1 - t0, 'clean': t2 - t1, 'extract': t3 - t2, 'peak_rss_mb': peak_rss_mb()}
+
+def record_parse(metrics: Optional[RunMetrics], url: str, timings: Dict[str, float]):
+    if metrics is not None:
+        for stage, value in timings.items():
+            if stage in PEAK_COUNTERS:
+                metrics.peak(url, stage, value)
+            else:
+                metrics.add_time(url, stage, value)
+
+RawPage = Tuple[int, str, bytes]
 
-    for url in urls:
+def parse_pages(pages: List[RawPage], large: bool = False) -> List[Tuple[int, str, List[tuple], Dict[str, float]]]:
+    """Parser worker: raw HTML in, compact block records (and stage timings) out."""
+    results = []
+    for index, url, content in pages:
+        blocks, timings = extract_page(content, url, large)
+        results.append((index, url, [block.to_record() for block in blocks], timings))
+    return results
+
+class ParserPool:
+    """
+    Process pool for the CPU-bound half of scraping (parse, clean_soup,
+    section extraction). Pages are batched into chunks of `chunk_size`;
+    finished chunks are delivered to `on_page` in the calling thread.
+    At most `2 * workers` chunks are in flight, so raw HTML never piles up
+    faster than the workers can parse it.
+    """
+
+    def __init__(self, on_page: PageCallback, workers: Optional[int] = None,
+                 chunk_size: int = PARSE_CHUNK_SIZE, metrics: Optional[RunMetrics] = None,
+                 large: bool = False):
+        self.on_page = on_page
+        self.metrics = metrics
+        self.large = large
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = max(1, chunk_size)
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._chunk: List[RawPage] = []
+        self._pending: set = set()
+
+    def submit(self, index: int, url: str, content: bytes):
+        self._chunk.append((index, url, content))
+        if len(self._chunk) >= self.chunk_size:
+            self._submit_chunk()
+        self._deliver(block=len(self._pending) >= 2 * self.workers)
+
+    def _submit_chunk(self):
+        if self._chunk:
+            self._pending.add(self._executor.submit(parse_pages, self._chunk, self.large))
+            self._chunk = []
+
+    def _deliver(self, block: bool = False, all_pending: bool = False):
+        if not self._pending:
+            return
+        if all_pending:
+            done, self._pending = wait(self._pending)
+        else:
+            done, self._pending = wait(self._pending, timeout=None if block else 0,
+                                       return_when=FIRST_COMPLETED)
+        for future in done:
+            self._emit(future)
+
+    def _emit(self, future: Future):
+        for index, url, records, timings in future.result():
+            record_parse(self.metrics, url, timings)
+            self.on_page(index, url, [ContentBlock.from_record(r) for r in records])
+
+    def close(self):
+        """Flush the partial chunk and wait for every page to be delivered."""
+        try:
+            self._submit_chunk()
+            self._deliver(all_pending=True)
+        finally:
+            self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is None:
+            self.close()
+        else:
+            self._executor.shutdown(cancel_futures=True)
+
+def scrape_serial(urls: List[str], on_page: PageCallback, cache: Optional[HTTPCache] = None,
+                  pool: Optional[ParserPool] = None, metrics: Optional[RunMetrics] = None,
+                  max_bytes: Optional[int] = None, large: bool = False,
+                  session: Optional[requests.Session] = None) -> int:
+    """One page at a time; returns the number of pages fetched."""
+    processed = 0
+    for index, url in enumerate(urls):
         print(f"🔍 Scraping: {url}")
-        soup = fetch_html(url)
-        if not soup:
+        with timed(metrics, url, 'fetch'):
+            content = fetch_bytes(url, cache, max_bytes, session)
+        if content is None:
             continue
-            
-        clean_soup(soup)
-        
-        # 1. Extract Hero
-        hero = extract_hero(soup, url)
-        if hero:
-            all_blocks.append(asdict(hero))
-        
-        # 2. Extract Sections by Headings (H2)
-        headings = soup.find_all('h2')
-        if not headings:
-            # Fallback to H3 if no H2s
-            headings = soup.find_all('h3')
-            
-        for h2 in headings:
-            block = get_section_content(h2, url)
-            if block.word_count >= MIN_SECTION_WORDS: # Filter empty/tiny sections
-                all_blocks.append(asdict(block))
-        
-        processed_count += 1
-
-    # 3. Output
-    result = {
-        "source_urls": urls,
-        "total_blocks": len(all_blocks),
-        "blocks": all_blocks
-    }
-    
-    if not output_file:
-        if len(urls) == 1:
-             # Generate filename from first URL if only one
-            slug = re.sub(r'[^a-z0-9]', '-', urls[0].split('//')[1].split('/')[1].lower())
-            if not slug: slug = "scraped_content"
-            output_file = f"{slug}.json"
+        if metrics is not None:
+            metrics.add(url, 'bytes', len(content))
+        if pool is not None:
+            pool.submit(index, url, content)
         else:
-            output_file = "merged_scraped_content.json"
-        
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(result, f, indent=2, ensure_ascii=False)
+            blocks, timings = extract_page(content, url, large)
+            record_parse(metrics, url, timings)
+            on_page(index, url, blocks)
+        processed += 1
+    return processed
+
+def scrape_async(urls: List[str], on_page: PageCallback,
+                 concurrency: int = fetch_engine.DEFAULT_CONCURRENCY,
+                 per_host: int = fetch_engine.DEFAULT_PER_HOST,
+                 cache: Optional[HTTPCache] = None,
+                 pool: Optional[ParserPool] = None,
+                 metrics: Optional[RunMetrics] = None,
+                 max_bytes: Optional[int] = None, large: bool = False,
+                 session: Optional[requests.Session] = None,
+                 limiter: Optional[HostLimiter] = None) -> int:
+    """Fetch concurrently and parse each page as it lands (completion order)."""
+    processed = 0
+
+    def on_result(result: fetch_engine.FetchResult):
+        nonlocal processed
+        if metrics is not None:
+            metrics.add_time(result.url, 'fetch', result.elapsed)
+            metrics.add(result.url, 'retries', max(0, result.attempts - 1))
+            metrics.add(result.url, 'bytes', len(result.content or b''))
+        if not result.ok:
+            print(f"❌ Error fetching URL {result.url}: {result.error} (attempts: {result.attempts})")
+            return
+        if result.truncated:
+            print(f"⚠️  {result.url}: body cut at {max_bytes} bytes")
+        processed += 1
+        if pool is not None:
+            pool.submit(result.index, result.url, result.content)
+            print(f"🔍 Fetched: {result.url} ({len(result.content)} bytes, {result.elapsed:.1f}s)")
+            return
+        blocks, timings = extract_page(result.content, result.url, large)
+        record_parse(metrics, result.url, timings)
+        on_page(result.index, result.url, blocks)
+        print(f"🔍 Scraped: {result.url} ({len(blocks)} blocks, {result.elapsed:.1f}s)")
+
+    fetch_engine.run_fetch_all(urls, on_result=on_result, concurrency=concurrency,
+                               per_host=per_host, user_agent=USER_AGENT, cache=cache,
+                               max_bytes=max_bytes, session=session, limiter=limiter)
+    return processed
+
+def default_output_file(urls: List[str], extension: str = "json") -> str:
+    if len(urls) == 1:
+        # Generate filename from first URL if only one
+        slug = re.sub(r'[^a-z0-9]', '-', urls[0].split('//')[1].split('/')[1].lower())
+        if not slug: slug = "scraped_content"
+        return f"{slug}.{extension}"
+    return f"merged_scraped_content.{extension}"
+
+def process_urls(urls: List[str], output_file: Optional[str] = None, use_async: bool = False,
+                 concurrency: int = fetch_engine.DEFAULT_CONCURRENCY,
+                 per_host: int = fetch_engine.DEFAULT_PER_HOST,
+                 cache: Optional[HTTPCache] = None, stream: bool = False,
+                 parse_workers: int = 0, chunk_size: int = PARSE_CHUNK_SIZE,
+                 dedupe: bool = False, metrics: Optional[RunMetrics] = None,
+                 large_docs: bool = False, max_bytes: Optional[int] = None,
+                 limiter: Optional[HostLimiter] = None):
+    if dedupe and stream:
+        raise ValueError("dedupe needs the merged JSON output; dedupe JSON-lines output when merging it (block_stream.py --dedupe)")
+    print(f"🚀 Starting multi-page scrape for {len(urls)} URLs...")
+    reset_peak_rss()  # peak_rss_mb is the high-water mark of this run
+    if large_docs:
+        max_bytes = max_bytes or LARGE_DOC_MAX_BYTES
+        print(f"🪶 Large-document mode: bodies capped at {max_bytes:,} bytes, noise pruned while parsing")
+    session = None
+    if limiter is not None:
+        session = fetch_engine.build_session(concurrency, USER_AGENT, limiter)
+        print(f"🚦 Adaptive per-host concurrency: start at {limiter.initial:.0f}, up to {limiter.max_limit:.0f}")
+        if metrics is not None:
+            metrics.track_hosts(limiter.snapshot)
+
+    def scrape(on_page: PageCallback) -> int:
+        if metrics is not None:
+            on_page = instrumented(on_page)
+        if not parse_workers:
+            return run_scrape(on_page, None)
+        print(f"🧵 Parsing in {parse_workers} worker processes (chunk size {chunk_size})")
+        with ParserPool(on_page, workers=parse_workers, chunk_size=chunk_size, metrics=metrics,
+                        large=large_docs) as pool:
+            return run_scrape(on_page, pool)
+
+    def run_scrape(on_page: PageCallback, pool: Optional[ParserPool]) -> int:
+        if use_async:
+            return scrape_async(urls, on_page, concurrency=concurrency, per_host=per_host,
+                                cache=cache, pool=pool, metrics=metrics,
+                                max_bytes=max_bytes, large=large_docs,
+                                session=session, limiter=limiter)
+        return scrape_serial(urls, on_page, cache, pool=pool, metrics=metrics,
+                             max_bytes=max_bytes, large=large_docs, session=session)
+
+    def instrumented(on_page: PageCallback) -> PageCallback:
+        def on_page_timed(index: int, url: str, blocks: List[ContentBlock]):
+            with metrics.stage(url, 'write'):
+                on_page(index, url, blocks)
+            metrics.add(url, 'blocks', len(blocks))
+            metrics.finish(url)
+        return on_page_timed
+
+    if not output_file:
+        output_file = default_output_file(urls, "jsonl" if stream else "json")
+
+    if stream:
+        # Each page is on disk as soon as it is extracted; nothing is kept in memory
+        with BlockStreamWriter(output_file, urls) as writer:
+            processed_count = scrape(lambda index, url, blocks: writer.write_page(index, [b.to_dict() for b in blocks]))
+        total_blocks = writer.total_blocks
+    else:
+        pages: List[List[Dict[str, Any]]] = [[] for _ in urls]
+
+        def collect(index: int, url: str, blocks: List[ContentBlock]):
+            pages[index] = [block.to_dict() for block in blocks]
+
+        processed_count = scrape(collect)
+        all_blocks = [block for blocks in pages for block in blocks]
+        total_blocks = len(all_blocks)
+
+        # 3. Output
+        result = {
+            "source_urls": urls,
+            "total_blocks": total_blocks,
+            "blocks": all_blocks
+        }
+        if dedupe:
+            dedupe_document(result)
+            total_blocks = result["total_blocks"]
+
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
         
     print(f"✅ Successfully processed {processed_count}/{len(urls)} URLs.")
-    print(f"📦 Extracted {len(all_blocks)} total content blocks.")
+    print(f"📦 Extracted {total_blocks} total content blocks.")
     print(f"📄 Saved to: {output_file}")
+    if cache is not None:
+        cache.flush()
+        print(f"🗄️  {cache.summary()}")
+    if limiter is not None:
+        session.close()
+        if metrics is None or not metrics.live:  # The live table ends with the host limits
+            limiter.print_summary()
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    import site_crawler  # Imports this module; only needed for the CLI
+    parser = argparse.ArgumentParser(description="Scrape pages into structured content blocks.")
+    parser.add_argument('args', nargs='+', metavar='URL', help="URLs to scrape, optionally followed by an output filename")
+    parser.add_argument('--async', dest='use_async', action='store_true', help="Fetch pages concurrently")
+    parser.add_argument('--concurrency', type=int, default=fetch_engine.DEFAULT_CONCURRENCY, help="Max in-flight requests (--async)")
+    parser.add_argument('--per-host', type=int, default=fetch_engine.DEFAULT_PER_HOST, help="Max in-flight requests per host (--async)")
+    parser.add_argument('--adaptive', action='store_true', help="Adapt each host's concurrency (AIMD) from --per-host up to --max-per-host, backing off on 429/503 and slow responses")
+    parser.add_argument('--max-per-host', type=int, default=DEFAULT_MAX_LIMIT, help="Ceiling of the adaptive per-host concurrency (--adaptive)")
+    parser.add_argument('--jsonl', dest='stream', action='store_true', help="Stream blocks to a JSON-lines file page by page")
+    parser.add_argument('--parse-workers', type=int, default=0, help="Parse pages in N worker processes (0 = in-process)")
+    parser.add_argument('--chunk-size', type=int, default=PARSE_CHUNK_SIZE, help="Pages per parser worker task (--parse-workers)")
+    parser.add_argument('--dedupe', action='store_true', help="Collapse exact and near-duplicate blocks across pages")
+    parser.add_argument('--report', default=None, metavar='FILE', help="Save per-URL stage timings and counters as a JSON run report")
+    parser.add_argument('--live', action='store_true', help="Print a metrics row per page as it completes, then a summary table")
+    parser.add_argument('--large-docs', action='store_true', help="Bounded-memory mode: capped streamed bodies, <main> only, noise pruned while parsing")
+    parser.add_argument('--max-bytes', type=int, default=None, help=f"Cut page bodies at this size (default with --large-docs: {LARGE_DOC_MAX_BYTES})")
+    parser.add_argument('--crawl', action='store_true', help="Crawl the site rooted at the (single) URL")
+    site_crawler.add_crawl_arguments(parser)
+    parser.add_argument('--no-cache', action='store_true', help="Always download, bypassing the on-disk HTTP cache")
+    parser.add_argument('--offline', action='store_true', help="Serve pages from the HTTP cache only, never the network")
+    parser.add_argument('--cache-dir', default=None, help="HTTP cache directory (default: .http_cache/ at the repo root)")
+    parser.add_argument('--cache-ttl', type=float, default=None, help="Seconds before a cached page is revalidated")
+    opts = parser.parse_intermixed_args(argv)
+    if opts.dedupe and (opts.stream or opts.crawl):
+        parser.error("--dedupe needs the merged JSON output; for --jsonl / --crawl output, "
+                     "dedupe when merging: python block_stream.py <blocks.jsonl> --dedupe")
+
+    # Simple arg parsing: last arg is filename if it doesn't look like a URL, otherwise default
+    opts.outfile = None
+    opts.urls = opts.args
+    if not opts.args[-1].startswith('http'):
+        opts.outfile = opts.args[-1]
+        opts.urls = opts.args[:-1]
+    return opts
+
+def build_cache(opts: argparse.Namespace) -> Optional[HTTPCache]:
+    if opts.no_cache:
+        return None
+    kwargs = {'offline': opts.offline}
+    if opts.cache_dir:
+        kwargs['cache_dir'] = opts.cache_dir
+    if opts.cache_ttl is not None:
+        kwargs['ttl'] = opts.cache_ttl
+    return HTTPCache(**kwargs)
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: python webpage_to_markdown.py <URL1> [URL2] ... [output_filename]")
+        print("Usage: python webpage_to_markdown.py [--async] <URL1> [URL2] ... [output_filename]")
         sys.exit(1)
-    
-    # Simple arg parsing: last arg is filename if it doesn't look like a URL, otherwise default
-    args = sys.argv[1:]
-    urls = []
-    outfile = None
-    
-    if not args[-1].startswith('http'):
-        outfile = args[-1]
-        urls = args[:-1]
-    else:
-        urls = args
-        
-    if not urls:
+
+    opts = parse_args(sys.argv[1:])
+    import site_crawler
+
+    if not opts.urls:
         print("❌ No URLs provided.")
         sys.exit(1)
 
-    process_urls(urls, outfile)
\ No newline at end of file
+    if opts.crawl:
+        site_crawler.SiteCrawler(
+            opts.urls[0],
+            opts.outfile or site_crawler.default_crawl_output(opts.urls[0]),
+            state_file=opts.state,
+            max_pages=opts.max_pages,
+            max_depth=opts.max_depth,
+            use_sitemap=not opts.no_sitemap,
+            recrawl=opts.recrawl,
+            concurrency=opts.concurrency,
+            per_host=opts.per_host,
+            cache=build_cache(opts),
+            limiter=HostLimiter(opts.per_host, opts.max_per_host) if opts.adaptive else None,
+        ).crawl()
+        sys.exit(0)
+
+    metrics = RunMetrics('scrape', live=opts.live, stages=SCRAPE_STAGES,
+                         counters=TABLE_COUNTERS + PEAK_COUNTERS) if opts.report or opts.live else None
+    process_urls(opts.urls, opts.outfile, use_async=opts.use_async,
+                 concurrency=opts.concurrency, per_host=opts.per_host,
+                 cache=build_cache(opts), stream=opts.stream,
+                 parse_workers=opts.parse_workers, chunk_size=opts.chunk_size,
+                 dedupe=opts.dedupe, metrics=metrics,
+                 large_docs=opts.large_docs, max_bytes=opts.max_bytes,
+                 limiter=HostLimiter(opts.per_host, opts.max_per_host) if opts.adaptive else None)
+    if metrics is not None:
+        if opts.live:
+            metrics.print_table()
+        if opts.report:
+            metrics.write_report(opts.report)